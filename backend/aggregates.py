@@ -0,0 +1,97 @@
+# arquivo: backend/aggregates.py
+#
+# Contagens do painel (status x faixa de valor) mantidas numa tabela pequena (processo_aggregates).
+# Cada escrita que cria processos, muda status ou muda o valor da causa soma os seus deltas
+# na mesma transação; GET /processos/summary lê no máximo status x faixas linhas, qualquer
+# que seja o tamanho da tabela de processos. `python -m backend.manage rebuild-aggregates`
+# recalcula tudo a partir de processos (carga inicial ou correção de desvios).
+
+from collections import Counter
+from decimal import Decimal
+from typing import Optional
+
+from sqlalchemy import case, delete, func, insert, select, text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from . import models
+from .dialects import upsert_add
+
+# Faixas de valor das abas do frontend: (nome, mínimo inclusivo, máximo exclusivo).
+# Processos sem valor numérico ficam em FAIXA_SEM_VALOR.
+FAIXAS_VALOR = (
+    ("ate_100k", None, Decimal("100000")),
+    ("100k_300k", Decimal("100000"), Decimal("300000")),
+    ("300k_500k", Decimal("300000"), Decimal("500000")),
+    ("acima_500k", Decimal("500000"), None),
+)
+FAIXA_SEM_VALOR = "sem_valor"
+
+
+def faixa_valor(valor: Optional[Decimal]) -> str:
+    if valor is None:
+        return FAIXA_SEM_VALOR
+    for nome, minimo, maximo in FAIXAS_VALOR:
+        if (minimo is None or valor >= minimo) and (maximo is None or valor < maximo):
+            return nome
+    return FAIXA_SEM_VALOR
+
+
+def faixa_valor_sql(coluna):
+    """A mesma classificação de faixa_valor, como expressão SQL (para a reconstrução)."""
+    casos = [(coluna.is_(None), FAIXA_SEM_VALOR)]
+    for nome, _, maximo in FAIXAS_VALOR:
+        if maximo is not None:
+            casos.append((coluna < maximo, nome))
+    return case(*casos, else_=FAIXAS_VALOR[-1][0])
+
+
+def aggregate_key(status: str, valor: Optional[Decimal]) -> tuple:
+    return (status, faixa_valor(valor))
+
+
+async def apply_deltas(db: AsyncSession, deltas: Counter):
+    """Soma os deltas {(status, faixa): n} na tabela de agregados. Chame antes de release_change_seq.
+
+    Junte os deltas da requisição inteira num Counter só: é um comando por transação.
+    """
+    deltas = {k: v for k, v in deltas.items() if v}
+    if not deltas:
+        return
+    # Um INSERT ... ON DUPLICATE KEY UPDATE total = total + n cria as células que faltam e soma
+    # nas demais. As linhas vão na ordem da chave primária, então duas transações que mexem
+    # em células em comum não se travam mutuamente
+    await db.execute(
+        upsert_add(models.ProcessoAggregate.__table__, db.bind.dialect.name, ["status", "faixa"], ["total"])
+        .values([{"status": s, "faixa": f, "total": deltas[(s, f)]} for s, f in sorted(deltas)])
+    )
+
+
+async def read_summary(db: AsyncSession) -> dict:
+    tabela = models.ProcessoAggregate
+    linhas = (await db.execute(
+        select(tabela.status, tabela.faixa, tabela.total).where(tabela.total != 0).order_by(tabela.status, tabela.faixa)
+    )).all()
+    por_status, por_faixa = Counter(), Counter()
+    for linha in linhas:
+        por_status[linha.status] += linha.total
+        por_faixa[linha.faixa] += linha.total
+    return {
+        "total": sum(por_status.values()),
+        "by_status": dict(por_status),
+        "by_band": dict(por_faixa),
+        "cells": [dict(linha._mapping) for linha in linhas],
+    }
+
+
+def rebuild(conn):
+    """Recalcula a tabela inteira a partir de processos, numa transação (conexão síncrona)."""
+    faixa = faixa_valor_sql(models.Processo.valor_causa_num).label("faixa")
+    conn.execute(delete(models.ProcessoAggregate))
+    conn.execute(
+        insert(models.ProcessoAggregate).from_select(
+            ["status", "faixa", "total"],
+            # Agrupa pelo rótulo: repetir o CASE no GROUP BY geraria parâmetros diferentes
+            # e o MariaDB (ONLY_FULL_GROUP_BY) não o reconheceria como a mesma expressão
+            select(models.Processo.status, faixa, func.count()).group_by(models.Processo.status, text("faixa")),
+        )
+    )
@@ -1,33 +1,196 @@
 # arquivo: backend/database.py
 
-from sqlalchemy import create_engine
+import os
+import threading
+import time
+
+from sqlalchemy import create_engine, event, exc, make_url
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker, DeclarativeBase
-from sqlalchemy.pool import NullPool  # Importa o NullPool para desativar o pool de conexões
+from sqlalchemy.pool import AsyncAdaptedQueuePool, NullPool, QueuePool
+
+from .dialects import check_dialect
+from .instrumentation import instrument_engine
+
+# --- CONFIGURAÇÃO VIA VARIÁVEIS DE AMBIENTE ---
+# Os valores padrão mantêm o banco local de desenvolvimento funcionando sem nenhum .env
+DATABASE_URL = os.getenv("DATABASE_URL", "mysql+pymysql://root:@localhost:3307/leads")
+
+# Drivers assíncronos equivalentes aos síncronos (a API usa o engine assíncrono;
+# scripts de manutenção e benchmarks continuam no síncrono).
+_ASYNC_DRIVERS = {
+    "mysql+pymysql": "mysql+aiomysql",
+    "mysql": "mysql+aiomysql",
+    "sqlite": "sqlite+aiosqlite",
+}
+
+def _async_url(url: str) -> str:
+    scheme, sep, rest = url.partition("://")
+    return _ASYNC_DRIVERS.get(scheme, scheme) + sep + rest
+
+ASYNC_DATABASE_URL = os.getenv("ASYNC_DATABASE_URL") or _async_url(DATABASE_URL)
+
+# "queue" (padrão) reaproveita conexões; "null" volta ao comportamento antigo (uma conexão por sessão)
+DB_POOL = os.getenv("DB_POOL", "queue").lower()
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "10"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "20"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "10"))
+# Recicla conexões antes do wait_timeout do MariaDB derrubá-las pelo lado do servidor
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+# Testa a conexão (ping) ao retirá-la do pool, descartando as que morreram
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "true").lower() in ("1", "true", "yes")
+DB_CONNECT_TIMEOUT = int(os.getenv("DB_CONNECT_TIMEOUT", "10"))
+
+
+# --- MÉTRICAS DO POOL ---
+class PoolStats:
+    """Contadores acumulados do pool: retiradas, conexões novas, timeouts e tempo de espera."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.checkouts = 0
+        self.connects = 0
+        self.timeouts = 0
+        self.wait_seconds_total = 0.0
+        self.wait_seconds_max = 0.0
+
+    def record_wait(self, seconds: float, timed_out: bool = False):
+        with self._lock:
+            if timed_out:
+                self.timeouts += 1
+            else:
+                self.checkouts += 1
+            self.wait_seconds_total += seconds
+            self.wait_seconds_max = max(self.wait_seconds_max, seconds)
+
+    def record_connect(self):
+        with self._lock:
+            self.connects += 1
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "checkouts": self.checkouts,
+                "connects": self.connects,
+                "timeouts": self.timeouts,
+                "wait_ms_total": round(self.wait_seconds_total * 1000, 3),
+                "wait_ms_avg": round(self.wait_seconds_total * 1000 / self.checkouts, 3) if self.checkouts else 0.0,
+                "wait_ms_max": round(self.wait_seconds_max * 1000, 3),
+            }
+
+
+pool_stats = PoolStats()
+async_pool_stats = PoolStats()
+
+
+class _WaitTimingMixin:
+    # Mede quanto tempo cada requisição esperou para conseguir uma conexão do pool
+    # (inclui a abertura de conexões novas quando o pool ainda está crescendo).
+    # As estatísticas ficam num atributo de classe porque o SQLAlchemy recria o pool em dispose().
+    stats: PoolStats
 
-# Sua string de conexão (verifique se continua correta)
-DATABASE_URL = "mysql+pymysql://root:@localhost:3307/leads"
+    def _do_get(self):
+        inicio = time.perf_counter()
+        try:
+            conn = super()._do_get()
+        except exc.TimeoutError:
+            self.stats.record_wait(time.perf_counter() - inicio, timed_out=True)
+            raise
+        self.stats.record_wait(time.perf_counter() - inicio)
+        return conn
 
-# --- CONFIGURAÇÃO ROBUSTA DO ENGINE ---
-engine = create_engine(
-    DATABASE_URL, 
 
-    # 1. Desativa o pool de conexões, que é a causa mais provável do travamento.
-    poolclass=NullPool,
+class MonitoredQueuePool(_WaitTimingMixin, QueuePool):
+    stats = pool_stats
 
-    # 2. Adiciona um tempo limite explícito de 10 segundos para a conexão.
-    connect_args={"connect_timeout": 10}
+
+class MonitoredAsyncQueuePool(_WaitTimingMixin, AsyncAdaptedQueuePool):
+    stats = async_pool_stats
+
+
+def _engine_options(url: str, poolclass=MonitoredQueuePool) -> dict:
+    options = {}
+    if url.startswith("sqlite"):
+        options["connect_args"] = {"check_same_thread": False}
+    else:
+        options["connect_args"] = {"connect_timeout": DB_CONNECT_TIMEOUT}
+
+    if DB_POOL == "null":
+        options["poolclass"] = NullPool
+    else:
+        options.update(
+            poolclass=poolclass,
+            pool_size=DB_POOL_SIZE,
+            max_overflow=DB_MAX_OVERFLOW,
+            pool_timeout=DB_POOL_TIMEOUT,
+            pool_recycle=DB_POOL_RECYCLE,
+            pool_pre_ping=DB_POOL_PRE_PING,
+        )
+    return options
+
+
+# Os INSERTs com tratamento de duplicados (dialects.py) só existem para MariaDB/MySQL e SQLite
+check_dialect(make_url(DATABASE_URL).get_dialect().name)
+check_dialect(make_url(ASYNC_DATABASE_URL).get_dialect().name)
+
+engine = create_engine(DATABASE_URL, **_engine_options(DATABASE_URL))
+async_engine = create_async_engine(
+    ASYNC_DATABASE_URL, **_engine_options(ASYNC_DATABASE_URL, poolclass=MonitoredAsyncQueuePool)
 )
 
+# Medição de cada comando SQL (contagem por requisição, consultas lentas, N+1)
+instrument_engine(engine)
+instrument_engine(async_engine.sync_engine)
+
+@event.listens_for(engine, "connect")
+def _on_connect(dbapi_connection, connection_record):
+    pool_stats.record_connect()
+
+@event.listens_for(async_engine.sync_engine, "connect")
+def _on_async_connect(dbapi_connection, connection_record):
+    async_pool_stats.record_connect()
+
+
+def _pool_status(pool, stats: PoolStats) -> dict:
+    status = {"pool_class": type(pool).__name__, **stats.snapshot()}
+    if isinstance(pool, QueuePool):
+        status.update(
+            size=pool.size(),
+            checked_out=pool.checkedout(),
+            checked_in=pool.checkedin(),
+            overflow=max(pool.overflow(), 0),
+            max_overflow=DB_MAX_OVERFLOW,
+            timeout_s=pool.timeout(),
+        )
+    return status
+
+
+def pool_status() -> dict:
+    # "async" é o pool que atende a API; "sync" é usado por scripts e pelo create_all na subida
+    return {
+        "async": _pool_status(async_engine.pool, async_pool_stats),
+        "sync": _pool_status(engine.pool, pool_stats),
+    }
+
+
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+# expire_on_commit=False: depois do commit os objetos continuam utilizáveis na resposta,
+# sem recarregar atributos (o que no modo assíncrono exigiria outro await)
+AsyncSessionLocal = async_sessionmaker(async_engine, expire_on_commit=False, autoflush=False)
 
 # Base para os nossos modelos SQLAlchemy
 class Base(DeclarativeBase):
     pass
 
-# Função de dependência centralizada para obter a sessão do banco
+# Função de dependência centralizada para obter a sessão do banco (síncrona)
 def get_db():
     db = SessionLocal()
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+
+# Dependência usada pelos endpoints da API (assíncrona)
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
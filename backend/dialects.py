@@ -0,0 +1,54 @@
+# arquivo: backend/dialects.py
+#
+# INSERTs com tratamento de duplicados, escritos para o dialeto em uso.
+# Produção roda em MariaDB (INSERT IGNORE / ON DUPLICATE KEY UPDATE); o SQLite dos
+# benchmarks e do desenvolvimento usa o equivalente ON CONFLICT. Só esses dois são
+# suportados: database.py chama check_dialect ao criar os engines, então outro banco
+# falha na inicialização, e não no meio de uma requisição.
+
+from sqlalchemy.dialects.mysql import insert as mysql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+
+DIALETOS_SUPORTADOS = ("mysql", "sqlite")
+
+
+def check_dialect(dialect_name: str):
+    if dialect_name not in DIALETOS_SUPORTADOS:
+        raise RuntimeError(
+            f"Banco '{dialect_name}' não suportado. Use uma URL mysql+<driver>:// (MariaDB/MySQL) ou sqlite://."
+        )
+
+
+def insert_ignore(table, dialect_name: str):
+    """INSERT que ignora linhas que violariam uma chave única/primária."""
+    if dialect_name == "mysql":
+        return mysql_insert(table).prefix_with("IGNORE")
+    return sqlite_insert(table).on_conflict_do_nothing()
+
+
+def upsert(table, dialect_name: str, conflict_columns: list, update_columns: list, extra_set: dict = None):
+    """INSERT que, em caso de chave duplicada, atualiza `update_columns` com os valores novos.
+
+    `extra_set` ({coluna: expressão}) entra no mesmo SET; ex.: {"updated_at": func.now()}, já que
+    o onupdate do ORM não roda num INSERT do Core.
+    """
+    if dialect_name == "mysql":
+        stmt = mysql_insert(table)
+        return stmt.on_duplicate_key_update({**{c: stmt.inserted[c] for c in update_columns}, **(extra_set or {})})
+    stmt = sqlite_insert(table)
+    return stmt.on_conflict_do_update(
+        index_elements=conflict_columns,
+        set_={**{c: stmt.excluded[c] for c in update_columns}, **(extra_set or {})},
+    )
+
+
+def upsert_add(table, dialect_name: str, conflict_columns: list, sum_columns: list):
+    """INSERT que, em caso de chave duplicada, soma os valores novos a `sum_columns` (contadores)."""
+    if dialect_name == "mysql":
+        stmt = mysql_insert(table)
+        return stmt.on_duplicate_key_update({c: table.c[c] + stmt.inserted[c] for c in sum_columns})
+    stmt = sqlite_insert(table)
+    return stmt.on_conflict_do_update(
+        index_elements=conflict_columns,
+        set_={c: table.c[c] + stmt.excluded[c] for c in sum_columns},
+    )
@@ -0,0 +1,78 @@
+# arquivo: backend/events.py
+#
+# Canal de eventos em tempo real (Server-Sent Events) para a tela de processos.
+# Um broker em memória distribui (fan-out) cada evento para a fila de cada cliente conectado:
+# publicar não consulta o banco e custa o mesmo com 1 ou 100 telas abertas.
+# Os eventos são publicados pelos endpoints depois do commit e são compactos (ids, não linhas);
+# o cliente decide se recarrega a página visível.
+# Observação: o broker é por processo. Com vários workers do uvicorn, cada cliente só recebe
+# os eventos das escritas atendidas pelo mesmo worker.
+
+import asyncio
+import itertools
+import json
+import os
+from typing import Optional
+
+# Eventos pendentes por cliente. Um cliente lento que enche a fila recebe um "resync"
+# (recarregar tudo) em vez de segurar memória indefinidamente.
+EVENT_QUEUE_SIZE = int(os.getenv("EVENT_QUEUE_SIZE", "1000"))
+# Comentário SSE periódico para manter a conexão viva através de proxies
+EVENT_HEARTBEAT_SECONDS = float(os.getenv("EVENT_HEARTBEAT_SECONDS", "15"))
+
+
+class _Assinatura:
+    def __init__(self, user_id: int):
+        self.user_id = user_id
+        self.fila = asyncio.Queue(maxsize=EVENT_QUEUE_SIZE)
+
+
+class EventBroker:
+    def __init__(self):
+        self._assinaturas = set()
+        self._sequencia = itertools.count(1)
+
+    @property
+    def subscribers(self) -> int:
+        return len(self._assinaturas)
+
+    def subscribe(self, user_id: int) -> _Assinatura:
+        assinatura = _Assinatura(user_id)
+        self._assinaturas.add(assinatura)
+        return assinatura
+
+    def unsubscribe(self, assinatura: _Assinatura):
+        self._assinaturas.discard(assinatura)
+
+    def publish(self, tipo: str, dados: dict, user_id: Optional[int] = None):
+        """Entrega o evento a todos os clientes (ou só aos do `user_id`, para eventos de pastas)."""
+        evento = (next(self._sequencia), tipo, json.dumps(dados, separators=(",", ":"), default=str))
+        for assinatura in list(self._assinaturas):
+            if user_id is not None and assinatura.user_id != user_id:
+                continue
+            try:
+                assinatura.fila.put_nowait(evento)
+            except asyncio.QueueFull:
+                # Descarta o atraso acumulado e pede ao cliente que recarregue do zero
+                while not assinatura.fila.empty():
+                    assinatura.fila.get_nowait()
+                assinatura.fila.put_nowait((evento[0], "resync", "{}"))
+
+    async def stream(self, user_id: int):
+        """Gerador do corpo text/event-stream de uma conexão."""
+        assinatura = self.subscribe(user_id)
+        try:
+            # Primeiro evento: confirma a conexão (o EventSource dispara "open" só com o primeiro byte)
+            yield "event: ready\ndata: {}\n\n"
+            while True:
+                try:
+                    sequencia, tipo, dados = await asyncio.wait_for(assinatura.fila.get(), EVENT_HEARTBEAT_SECONDS)
+                except asyncio.TimeoutError:
+                    yield ": keepalive\n\n"
+                    continue
+                yield f"id: {sequencia}\nevent: {tipo}\ndata: {dados}\n\n"
+        finally:
+            self.unsubscribe(assinatura)
+
+
+broker = EventBroker()
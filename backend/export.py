@@ -0,0 +1,53 @@
+# arquivo: backend/export.py
+#
+# Exportação em streaming (CSV e NDJSON) com memória constante.
+# A consulta roda com cursor no servidor (stream_results / yield_per): as linhas chegam
+# do banco em lotes e cada lote é formatado e enviado antes de o próximo ser lido.
+
+import csv
+import io
+import json
+
+from .database import AsyncSessionLocal
+
+EXPORT_BATCH_SIZE = 1000
+
+FORMATOS_EXPORTACAO = {
+    "csv": "text/csv; charset=utf-8",
+    "ndjson": "application/x-ndjson",
+}
+
+
+def _linhas_csv(colunas: list, linhas, cabecalho: bool) -> str:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    if cabecalho:
+        writer.writerow(colunas)
+    writer.writerows(linhas)
+    return buffer.getvalue()
+
+
+def _linhas_ndjson(colunas: list, linhas) -> str:
+    return "".join(
+        json.dumps(dict(zip(colunas, linha)), ensure_ascii=False, default=str) + "\n"
+        for linha in linhas
+    )
+
+
+async def stream_export(consulta, formato: str):
+    """Gera o arquivo em pedaços (bytes), um por lote de linhas da consulta.
+
+    Abre a própria sessão: o StreamingResponse é consumido depois que as dependências
+    do endpoint (inclusive a sessão do get_async_db) já foram finalizadas.
+    """
+    colunas = [coluna.key for coluna in consulta.selected_columns]
+    async with AsyncSessionLocal() as db:
+        resultado = await db.stream(consulta.execution_options(yield_per=EXPORT_BATCH_SIZE))
+        if formato == "csv":
+            # BOM para o Excel reconhecer o arquivo como UTF-8 (acentos nos nomes)
+            yield ("\ufeff" + _linhas_csv(colunas, [], cabecalho=True)).encode("utf-8")
+        async for lote in resultado.partitions():
+            if formato == "csv":
+                yield _linhas_csv(colunas, lote, cabecalho=False).encode("utf-8")
+            else:
+                yield _linhas_ndjson(colunas, lote).encode("utf-8")
@@ -0,0 +1,218 @@
+# arquivo: backend/instrumentation.py
+#
+# Instrumentação de SQL por requisição.
+#   - Eventos do SQLAlchemy (before/after_cursor_execute) medem cada comando enviado ao banco.
+#   - Um middleware ASGI abre um "contexto de requisição" (contextvar) e, ao final, registra:
+#     quantidade de comandos, tempo total no banco, comando mais lento e padrões repetidos
+#     (suspeitas de N+1: o mesmo SQL executado várias vezes na mesma requisição).
+#   - Os números viram histogramas por rota no formato de texto do Prometheus (GET /metrics).
+#   - Comandos acima de SLOW_QUERY_MS vão para o log de consultas lentas.
+# O contextvar chega aos eventos porque o SQLAlchemy assíncrono roda o driver em greenlets
+# da própria task da requisição (e o run_in_threadpool copia o contexto).
+
+import bisect
+import contextvars
+import logging
+import os
+import re
+import threading
+import time
+from collections import Counter
+
+from sqlalchemy import event
+
+SLOW_QUERY_MS = float(os.getenv("SLOW_QUERY_MS", "200"))
+# Quantas execuções do mesmo SQL numa requisição caracterizam uma suspeita de N+1
+N_PLUS_ONE_THRESHOLD = int(os.getenv("N_PLUS_ONE_THRESHOLD", "5"))
+
+slow_query_logger = logging.getLogger("sgpj.sql.slow")
+request_logger = logging.getLogger("sgpj.sql.request")
+
+_estatisticas_requisicao = contextvars.ContextVar("estatisticas_requisicao", default=None)
+
+
+class RequestSQLStats:
+    """Comandos SQL emitidos durante uma requisição."""
+
+    def __init__(self):
+        self.statements = 0
+        self.db_seconds = 0.0
+        self.slowest_seconds = 0.0
+        self.slowest_statement = None
+        self.patterns = Counter()
+
+    def record(self, statement: str, seconds: float):
+        self.statements += 1
+        self.db_seconds += seconds
+        if seconds > self.slowest_seconds:
+            self.slowest_seconds = seconds
+            self.slowest_statement = statement
+        self.patterns[normalize_statement(statement)] += 1
+
+    def n_plus_one_suspects(self) -> list:
+        return [(padrao, vezes) for padrao, vezes in self.patterns.items() if vezes >= N_PLUS_ONE_THRESHOLD]
+
+
+_ESPACOS = re.compile(r"\s+")
+# Listas de placeholders de IN (...) / VALUES (...) variam de tamanho: viram um só "(?)"
+_LISTA_PLACEHOLDERS = re.compile(r"\(\s*(?:\?|%s|%\(\w+\)s)(?:\s*,\s*(?:\?|%s|%\(\w+\)s))*\s*\)")
+
+
+def normalize_statement(statement: str) -> str:
+    return _LISTA_PLACEHOLDERS.sub("(?)", _ESPACOS.sub(" ", statement).strip())
+
+
+# --- EVENTOS DO ENGINE ---
+def instrument_engine(engine):
+    """Liga os eventos de medição num engine síncrono (ou no sync_engine de um assíncrono)."""
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _antes(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("sgpj_query_start", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _depois(conn, cursor, statement, parameters, context, executemany):
+        inicio = conn.info["sgpj_query_start"].pop()
+        decorrido = time.perf_counter() - inicio
+        estatisticas = _estatisticas_requisicao.get()
+        if estatisticas is not None:
+            estatisticas.record(statement, decorrido)
+        if decorrido * 1000 >= SLOW_QUERY_MS:
+            metrics.slow_queries += 1
+            slow_query_logger.warning(
+                "Consulta lenta (%.1f ms): %s", decorrido * 1000, _ESPACOS.sub(" ", statement)[:1000]
+            )
+
+    @event.listens_for(engine, "handle_error")
+    def _erro(context):
+        # Comando que falhou não passa pelo after_cursor_execute: descarta o início pendente
+        if context.connection is not None:
+            pendentes = context.connection.info.get("sgpj_query_start")
+            if pendentes:
+                pendentes.pop()
+
+
+# --- HISTOGRAMAS NO FORMATO DO PROMETHEUS ---
+class Histogram:
+    def __init__(self, name: str, help_text: str, buckets: tuple):
+        self.name = name
+        self.help_text = help_text
+        self.buckets = buckets
+        self._series = {}   # labels -> [contagens por bucket..., soma, total]
+
+    def observe(self, labels: tuple, value: float):
+        serie = self._series.get(labels)
+        if serie is None:
+            serie = self._series[labels] = [0] * len(self.buckets) + [0.0, 0]
+        posicao = bisect.bisect_left(self.buckets, value)
+        for i in range(posicao, len(self.buckets)):
+            serie[i] += 1
+        serie[-2] += value
+        serie[-1] += 1
+
+    def render(self, label_names: tuple) -> list:
+        linhas = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        for labels, serie in sorted(self._series.items()):
+            base = ",".join(f'{nome}="{_escape_label(valor)}"' for nome, valor in zip(label_names, labels))
+            for limite, contagem in zip(self.buckets, serie):
+                linhas.append(f'{self.name}_bucket{{{base},le="{limite:g}"}} {contagem}')
+            linhas.append(f'{self.name}_bucket{{{base},le="+Inf"}} {serie[-1]}')
+            linhas.append(f"{self.name}_sum{{{base}}} {serie[-2]:.6f}")
+            linhas.append(f"{self.name}_count{{{base}}} {serie[-1]}")
+        return linhas
+
+
+def _escape_label(valor: str) -> str:
+    return str(valor).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+class SQLMetrics:
+    LABELS = ("method", "route")
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.request_seconds = Histogram(
+            "sgpj_http_request_duration_seconds", "Duração das requisições HTTP.",
+            (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10),
+        )
+        self.statements = Histogram(
+            "sgpj_db_statements_per_request", "Comandos SQL emitidos por requisição.",
+            (0, 1, 2, 3, 5, 8, 13, 21, 50, 100, 500),
+        )
+        self.db_seconds = Histogram(
+            "sgpj_db_time_per_request_seconds", "Tempo total no banco por requisição.",
+            (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5),
+        )
+        self.n_plus_one = Counter()
+        self.slow_queries = 0
+
+    def observe_request(self, method: str, route: str, seconds: float, stats: RequestSQLStats):
+        labels = (method, route)
+        suspeitas = stats.n_plus_one_suspects()
+        with self._lock:
+            self.request_seconds.observe(labels, seconds)
+            self.statements.observe(labels, stats.statements)
+            self.db_seconds.observe(labels, stats.db_seconds)
+            if suspeitas:
+                self.n_plus_one[labels] += 1
+        for padrao, vezes in suspeitas:
+            request_logger.warning("Possível N+1 em %s %s: %d execuções de %s", method, route, vezes, padrao[:500])
+
+    def render(self, extra_lines: list = ()) -> str:
+        with self._lock:
+            linhas = []
+            for histograma in (self.request_seconds, self.statements, self.db_seconds):
+                linhas.extend(histograma.render(self.LABELS))
+            linhas.append("# HELP sgpj_db_n_plus_one_requests_total Requisições com suspeita de N+1.")
+            linhas.append("# TYPE sgpj_db_n_plus_one_requests_total counter")
+            for (method, route), total in sorted(self.n_plus_one.items()):
+                linhas.append(f'sgpj_db_n_plus_one_requests_total{{method="{method}",route="{_escape_label(route)}"}} {total}')
+            linhas.append("# HELP sgpj_db_slow_queries_total Comandos acima de SLOW_QUERY_MS.")
+            linhas.append("# TYPE sgpj_db_slow_queries_total counter")
+            linhas.append(f"sgpj_db_slow_queries_total {self.slow_queries}")
+        linhas.extend(extra_lines)
+        return "\n".join(linhas) + "\n"
+
+
+metrics = SQLMetrics()
+
+
+# --- MIDDLEWARE ---
+class SQLInstrumentationMiddleware:
+    """Middleware ASGI puro: também cobre o corpo de respostas em streaming (exportações)."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        estatisticas = RequestSQLStats()
+        token = _estatisticas_requisicao.set(estatisticas)
+        inicio = time.perf_counter()
+
+        async def send_com_timing(message):
+            if message["type"] == "http.response.start":
+                # Server-Timing aparece no DevTools do navegador (aba Network -> Timing)
+                valor = f'db;dur={estatisticas.db_seconds * 1000:.1f};desc="{estatisticas.statements} queries"'
+                message.setdefault("headers", [])
+                message["headers"] = list(message["headers"]) + [(b"server-timing", valor.encode("latin-1"))]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_com_timing)
+        finally:
+            _estatisticas_requisicao.reset(token)
+            decorrido = time.perf_counter() - inicio
+            # Rota "modelo" (/folders/{folder_id}) em vez do caminho concreto, para não explodir os rótulos
+            rota = scope.get("route")
+            nome_rota = getattr(rota, "path", None) or "unmatched"
+            metrics.observe_request(scope["method"], nome_rota, decorrido, estatisticas)
+            if request_logger.isEnabledFor(logging.DEBUG):
+                request_logger.debug(
+                    "%s %s: %d comandos, %.1f ms no banco, mais lento %.1f ms: %s",
+                    scope["method"], nome_rota, estatisticas.statements, estatisticas.db_seconds * 1000,
+                    estatisticas.slowest_seconds * 1000, (estatisticas.slowest_statement or "")[:300],
+                )
@@ -1,20 +1,41 @@
 # arquivo: backend/main.py
 
-from fastapi import FastAPI, Depends, HTTPException, status
-from sqlalchemy.orm import Session, selectinload
-from sqlalchemy import or_  # <-- Importação de 'or_' movida para o local correto
+import json
+from collections import Counter
+
+from fastapi import FastAPI, Depends, HTTPException, Query, Request, status
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import PlainTextResponse, StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
+from sqlalchemy import delete, func, select, text, update
 from typing import List, Optional
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel
+from pydantic import BaseModel, ValidationError
 from fastapi.security import OAuth2PasswordRequestForm
 from datetime import timedelta
+from decimal import Decimal
 
 # Importações locais do projeto
 from . import models, schemas, security
-from .database import get_db, engine
+from .aggregates import aggregate_key, apply_deltas, read_summary
+from .database import get_async_db, engine, async_engine, pool_status
+from .cache import TTLCache
+from .dialects import insert_ignore, upsert
+from .events import broker
+from .export import FORMATOS_EXPORTACAO, stream_export
+from .instrumentation import SQLInstrumentationMiddleware, metrics
+from .pagination import encode_cursor, decode_cursor, keyset_filter
+from .search import build_search
+from .serialization import FAST_SERIALIZATION
+from .utils import parse_valor_causa, normalize_digits, chunked
+from .versions import (
+    ESCOPO_PROCESSOS, escopo_pastas, bump_versions, cached_response,
+    reserve_change_seq, release_change_seq, visible_change_seq_limit,
+)
 
 # Lembre-se de deixar esta linha comentada para o desenvolvimento do dia-a-dia
-# 
+#
 models.Base.metadata.create_all(bind=engine)
 
 app = FastAPI()
@@ -28,186 +49,813 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+# Contagem e tempo de SQL por requisição, expostos em /metrics
+app.add_middleware(SQLInstrumentationMiddleware)
 
 # --- ENDPOINTS PARA PROCESSOS ---
+# Colunas públicas do processo (as de schemas.Processo, sem as colunas derivadas internas).
+# Usadas pela exportação e pelo caminho rápido de serialização, que buscam tuplas em vez de entidades.
+COLUNAS_PROCESSO = [
+    models.Processo.id,
+    models.Processo.numero_processo,
+    models.Processo.nome_reu,
+    models.Processo.cpf_cnpj_reu,
+    models.Processo.valor_causa,
+    models.Processo.status,
+]
+
+def _processo_dict(linha) -> dict:
+    return {coluna.key: getattr(linha, coluna.key) for coluna in COLUNAS_PROCESSO}
+
+def _colunas_processo(processo: schemas.ProcessoCreate) -> dict:
+    # As colunas derivadas são calculadas na ingestão, em todos os caminhos de escrita
+    return {
+        **processo.model_dump(),
+        "numero_processo_digits": normalize_digits(processo.numero_processo),
+        "valor_causa_num": parse_valor_causa(processo.valor_causa),
+    }
+
 @app.post("/processos/", response_model=schemas.Processo)
-def create_processo(processo: schemas.ProcessoCreate, db: Session = Depends(get_db)):
-    db_processo = db.query(models.Processo).filter(models.Processo.numero_processo == processo.numero_processo).first()
+async def create_processo(processo: schemas.ProcessoCreate, db: AsyncSession = Depends(get_async_db)):
+    db_processo = await db.scalar(
+        select(models.Processo.id).where(models.Processo.numero_processo == processo.numero_processo)
+    )
     if db_processo:
         raise HTTPException(status_code=400, detail="Processo já cadastrado")
-    db_processo = models.Processo(**processo.dict())
+    # A reserva da sequência é uma transação curta à parte; o contador não fica travado até o commit
+    seq = await reserve_change_seq(db)
+    db_processo = models.Processo(**_colunas_processo(processo), change_seq=seq)
     db.add(db_processo)
-    db.commit()
-    db.refresh(db_processo)
+    # O autoflush está desligado: grava o processo já, para as travas seguirem a ordem dados, agregados, versões
+    await db.flush()
+    await apply_deltas(db, Counter([aggregate_key(schemas.StatusEnum.PENDENTE.value, db_processo.valor_causa_num)]))
+    await release_change_seq(db, seq, ESCOPO_PROCESSOS)
+    await db.commit()
+    broker.publish("processos_created", {"ids": [db_processo.id]})
     return db_processo
 
-@app.get("/processos/", response_model=schemas.ProcessosResponse)
-def read_processos(
-    skip: int = 0, 
-    limit: int = 10, 
-    db: Session = Depends(get_db), 
-    current_user: models.User = Depends(security.get_current_user),
-    search: Optional[str] = None
+# --- INGESTÃO EM LOTE ---
+# Aceita um array JSON ou NDJSON (Content-Type: application/x-ndjson, um processo por linha)
+# e grava tudo numa única transação, com INSERTs multi-linha em vez de 4 comandos por processo.
+BULK_MAX_ITEMS = 5000
+BULK_CHUNK_SIZE = 1000
+POLITICAS_CONFLITO = ("ignore", "update")
+# Colunas sobrescritas pela política "update" (o número e o status nunca são alterados)
+COLUNAS_UPSERT = ["nome_reu", "cpf_cnpj_reu", "valor_causa", "valor_causa_num"]
+
+async def _ler_itens_bulk(request: Request) -> list:
+    content_type = request.headers.get("content-type", "")
+    if "ndjson" in content_type or "jsonl" in content_type:
+        linhas, resto = [], b""
+        async for pedaco in request.stream():
+            resto += pedaco
+            *completas, resto = resto.split(b"\n")
+            linhas.extend(completas)
+        linhas.append(resto)
+
+        itens = []
+        for linha in linhas:
+            if not linha.strip():
+                continue
+            try:
+                itens.append(json.loads(linha))
+            except ValueError:
+                # Linha inválida vira erro só daquele item, sem derrubar o lote
+                itens.append(ValueError("JSON inválido."))
+        return itens
+
+    try:
+        itens = json.loads(await request.body())
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Corpo da requisição não é um JSON válido.")
+    if not isinstance(itens, list):
+        raise HTTPException(status_code=400, detail="Envie um array JSON de processos ou NDJSON.")
+    return itens
+
+def _mensagem_validacao(erro: ValidationError) -> str:
+    return "; ".join(f"{'.'.join(str(p) for p in e['loc'])}: {e['msg']}" for e in erro.errors())
+
+@app.post("/processos/bulk", response_model=schemas.BulkIngestResponse)
+async def create_processos_bulk(
+    request: Request,
+    on_conflict: str = "ignore",
+    db: AsyncSession = Depends(get_async_db),
+    current_user: schemas.User = Depends(security.get_current_user)
 ):
-    query = db.query(models.Processo)
+    if on_conflict not in POLITICAS_CONFLITO:
+        raise HTTPException(status_code=400, detail=f"on_conflict inválido. Use um de: {', '.join(POLITICAS_CONFLITO)}.")
+
+    itens = await _ler_itens_bulk(request)
+    if len(itens) > BULK_MAX_ITEMS:
+        raise HTTPException(status_code=413, detail=f"Máximo de {BULK_MAX_ITEMS} processos por lote.")
+
+    resultados = [None] * len(itens)
+    validos = {}       # numero_processo -> (índice, colunas)
+    repetidos = []     # (índice, numero_processo) repetidos dentro do próprio lote
+    for index, item in enumerate(itens):
+        if isinstance(item, ValueError):
+            resultados[index] = schemas.BulkItemResult(index=index, status="error", detail=str(item))
+            continue
+        try:
+            processo = schemas.ProcessoCreate.model_validate(item)
+        except ValidationError as e:
+            resultados[index] = schemas.BulkItemResult(index=index, status="error", detail=_mensagem_validacao(e))
+            continue
+        if processo.numero_processo in validos:
+            repetidos.append((index, processo.numero_processo))
+            continue
+        validos[processo.numero_processo] = (index, _colunas_processo(processo))
 
+    numero_col, id_col = models.Processo.numero_processo, models.Processo.id
+    numeros = list(validos)
+
+    seq = None
+    if on_conflict == "update" and validos:
+        # A reserva faz commit: precisa vir antes do SELECT ... FOR UPDATE abaixo
+        seq = await reserve_change_seq(db)
+
+    existentes = {}
+    anteriores = {}    # numero_processo -> (status, valor_causa_num) antes do upsert
+    for lote in chunked(numeros, BULK_CHUNK_SIZE):
+        consulta = select(numero_col, id_col, models.Processo.status, models.Processo.valor_causa_num).where(numero_col.in_(lote))
+        if on_conflict == "update":
+            # Trava as linhas que o upsert vai sobrescrever, para o delta dos agregados sair exato
+            consulta = consulta.with_for_update()
+        for linha in await db.execute(consulta):
+            existentes[linha.numero_processo] = linha.id
+            anteriores[linha.numero_processo] = (linha.status, linha.valor_causa_num)
+
+    tabela = models.Processo.__table__
+    dialect_name = db.bind.dialect.name
+    if on_conflict == "update":
+        linhas = [colunas for _, colunas in validos.values()]
+        insercao = upsert(
+            tabela, dialect_name, ["numero_processo"], COLUNAS_UPSERT + ["change_seq"],
+            extra_set={"updated_at": func.now()},
+        )
+    else:
+        # INSERT IGNORE também cobre o caso de outro cliente inserir o mesmo número ao mesmo tempo
+        linhas = [colunas for numero, (_, colunas) in validos.items() if numero not in existentes]
+        insercao = insert_ignore(tabela, dialect_name)
+        if linhas:
+            seq = await reserve_change_seq(db)
+    linhas = [{**colunas, "change_seq": seq} for colunas in linhas]
+    for lote in chunked(linhas, BULK_CHUNK_SIZE):
+        await db.execute(insercao.values(lote))
+
+    novos = [numero for numero in numeros if numero not in existentes]
+    ids_novos = {}
+    for lote in chunked(novos, BULK_CHUNK_SIZE):
+        consulta = select(numero_col, id_col, models.Processo.change_seq).where(numero_col.in_(lote))
+        for linha in await db.execute(consulta):
+            if linha.change_seq == seq:
+                ids_novos[linha.numero_processo] = linha.id
+            else:
+                # Outro cliente inseriu o mesmo número entre a checagem e o INSERT IGNORE
+                existentes[linha.numero_processo] = linha.id
+
+    deltas = Counter()
+    for numero in ids_novos:
+        deltas[aggregate_key(schemas.StatusEnum.PENDENTE.value, validos[numero][1]["valor_causa_num"])] += 1
+    if on_conflict == "update":
+        # O upsert pode mudar o valor da causa (e a faixa); o status é preservado
+        for numero, (status_atual, valor_anterior) in anteriores.items():
+            deltas[aggregate_key(status_atual, valor_anterior)] -= 1
+            deltas[aggregate_key(status_atual, validos[numero][1]["valor_causa_num"])] += 1
+    await apply_deltas(db, deltas)
+    if seq is not None:
+        await release_change_seq(db, seq, ESCOPO_PROCESSOS)
+    await db.commit()
+
+    if ids_novos:
+        broker.publish("processos_created", {"ids": sorted(ids_novos.values())})
+    if on_conflict == "update" and existentes:
+        broker.publish("processos_updated", {"ids": sorted(existentes.values())})
+
+    status_existente = "updated" if on_conflict == "update" else "existing"
+    for numero, (index, _) in validos.items():
+        if numero in existentes:
+            resultados[index] = schemas.BulkItemResult(index=index, numero_processo=numero, status=status_existente, id=existentes[numero])
+        else:
+            resultados[index] = schemas.BulkItemResult(index=index, numero_processo=numero, status="created", id=ids_novos.get(numero))
+    for index, numero in repetidos:
+        resultados[index] = schemas.BulkItemResult(
+            index=index, numero_processo=numero, status="existing",
+            id=existentes.get(numero) or ids_novos.get(numero), detail="Repetido no mesmo lote."
+        )
+
+    contagem = {"created": 0, "existing": 0, "updated": 0, "error": 0}
+    for resultado in resultados:
+        contagem[resultado.status] += 1
+    return schemas.BulkIngestResponse(
+        created=contagem["created"],
+        existing=contagem["existing"],
+        updated=contagem["updated"],
+        errors=contagem["error"],
+        results=resultados,
+    )
+
+@app.post("/processos/exists", response_model=schemas.ProcessosExistsResponse)
+async def processos_exists(
+    consulta: schemas.ProcessosExistsRequest,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: schemas.User = Depends(security.get_current_user)
+):
+    """Quais destes números já estão no banco. Usado pelo robô (com o usuário ROBOT_API_USER)
+    para pular uma página de resultados inteira numa consulta."""
+    if len(consulta.numeros) > BULK_MAX_ITEMS:
+        raise HTTPException(status_code=413, detail=f"Máximo de {BULK_MAX_ITEMS} números por consulta.")
+    numero_col = models.Processo.numero_processo
+    numeros = list(dict.fromkeys(consulta.numeros))
+    existentes = set()
+    for lote in chunked(numeros, BULK_CHUNK_SIZE):
+        existentes.update((await db.scalars(select(numero_col).where(numero_col.in_(lote)))).all())
+    return schemas.ProcessosExistsResponse(existing=[numero for numero in numeros if numero in existentes])
+
+# --- PAGINAÇÃO POR CURSOR E CONTAGEM DE PROCESSOS ---
+# Tamanho máximo de página das listagens paginadas (processos e processos de uma pasta)
+MAX_PAGE_SIZE = 500
+
+# Colunas aceitas em `order_by`. Todas têm índice, então a busca por chave vira um range scan.
+ORDENACOES_PROCESSOS = {
+    "id": models.Processo.id,
+    "numero_processo": models.Processo.numero_processo,
+    "nome_reu": models.Processo.nome_reu,
+    "valor_causa": models.Processo.valor_causa_num,
+}
+
+# Modos de contagem do total:
+#   exact  -> COUNT(*) a cada chamada (comportamento original)
+#   cached -> COUNT(*) guardado por alguns segundos para os mesmos filtros
+#   approx -> estimativa das estatísticas do InnoDB (só sem filtros; senão usa "cached")
+#   none   -> não conta
+MODOS_CONTAGEM = ("exact", "cached", "approx", "none")
+_contagens_cache = TTLCache(maxsize=256, ttl=30)
+
+async def _contar_processos(db: AsyncSession, filtros: list, count_mode: str, chave_filtros: tuple, sem_filtros: bool):
+    consulta_total = select(func.count()).select_from(models.Processo).where(*filtros)
+    if count_mode == "none":
+        return None, False
+    if count_mode == "exact":
+        return await db.scalar(consulta_total), False
+
+    if count_mode == "approx" and sem_filtros and db.bind.dialect.name == "mysql":
+        estimativa = await db.scalar(text(
+            "SELECT TABLE_ROWS FROM information_schema.TABLES "
+            "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = :tabela"
+        ), {"tabela": models.Processo.__tablename__})
+        if estimativa is not None:
+            return int(estimativa), True
+
+    total = _contagens_cache.get(chave_filtros)
+    if total is None:
+        total = await db.scalar(consulta_total)
+        _contagens_cache.set(chave_filtros, total)
+    return total, True
+
+def _filtros_processos(dialect_name: str, search: Optional[str], status_filtro: Optional[schemas.StatusEnum], min_valor: Optional[Decimal], max_valor: Optional[Decimal]):
+    """Filtros comuns da listagem, da alteração de status em lote e da exportação. Retorna (filtros, relevância)."""
+    filtros = []
+
+    relevancia = None
     if search:
-        query = query.filter(
-            or_(
-                models.Processo.nome_reu.ilike(f"%{search}%"),
-                models.Processo.numero_processo.ilike(f"%{search}%")
-            )
+        filtro_busca, relevancia = build_search(search, dialect_name)
+        if filtro_busca is not None:
+            filtros.append(filtro_busca)
+
+    if status_filtro is not None:
+        filtros.append(models.Processo.status == status_filtro.value)
+
+    # Faixas de valor (inclusivas) usam o índice de valor_causa_num
+    if min_valor is not None:
+        filtros.append(models.Processo.valor_causa_num >= min_valor)
+    if max_valor is not None:
+        filtros.append(models.Processo.valor_causa_num <= max_valor)
+
+    return filtros, relevancia
+
+@app.get("/processos/", response_model=schemas.ProcessosResponse)
+async def read_processos(
+    request: Request,
+    skip: int = Query(0, ge=0),
+    limit: int = Query(10, ge=1, le=MAX_PAGE_SIZE),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: schemas.User = Depends(security.get_current_user),
+    search: Optional[str] = None,
+    after: Optional[str] = None,
+    order_by: Optional[str] = None,
+    order: Optional[str] = None,
+    count: str = "exact",
+    min_valor: Optional[Decimal] = None,
+    max_valor: Optional[Decimal] = None,
+    status_filtro: Optional[schemas.StatusEnum] = Query(None, alias="status")
+):
+    # Com busca por nome, a ordem padrão é a relevância (mais relevantes primeiro)
+    if order_by is None:
+        order_by = "relevance" if search else "id"
+    if order is None:
+        order = "desc" if order_by == "relevance" else "asc"
+
+    if order_by not in ORDENACOES_PROCESSOS and order_by != "relevance":
+        raise HTTPException(status_code=400, detail=f"order_by inválido. Use um de: {', '.join(ORDENACOES_PROCESSOS)}, relevance.")
+    if order not in ("asc", "desc"):
+        raise HTTPException(status_code=400, detail="order deve ser 'asc' ou 'desc'.")
+    if count not in MODOS_CONTAGEM:
+        raise HTTPException(status_code=400, detail=f"count inválido. Use um de: {', '.join(MODOS_CONTAGEM)}.")
+
+    async def montar():
+        filtros, relevancia = _filtros_processos(db.bind.dialect.name, search, status_filtro, min_valor, max_valor)
+
+        chave_filtros = (search, status_filtro, min_valor, max_valor)
+        total_count, total_is_estimate = await _contar_processos(
+            db, filtros, count, chave_filtros=chave_filtros,
+            sem_filtros=not search and status_filtro is None and min_valor is None and max_valor is None
         )
 
-    total_count = query.count()
-    
-    processos_na_pagina = query.options(
-        selectinload(models.Processo.folder_associations)
-    ).offset(skip).limit(limit).all()
-    
-    return {"total_count": total_count, "data": processos_na_pagina}
+        if order_by == "relevance":
+            # Sem FULLTEXT (busca por número ou termo curto) a relevância cai na ordem por id
+            coluna = relevancia if relevancia is not None else models.Processo.id
+        else:
+            coluna = ORDENACOES_PROCESSOS[order_by]
+        descending = order == "desc"
+
+        # O valor ordenado vem junto (valor_ordem) para montar o cursor, inclusive quando é a relevância.
+        # No caminho rápido buscamos só as colunas (tuplas), sem montar entidades ORM.
+        entidade = COLUNAS_PROCESSO if FAST_SERIALIZATION else [models.Processo]
+        consulta = select(*entidade, coluna.label("valor_ordem")).where(*filtros)
+
+        if after:
+            # Modo cursor: continua a partir da última linha da página anterior, sem OFFSET.
+            try:
+                ultimo_valor, ultimo_id = decode_cursor(after)
+                if ultimo_valor is not None:
+                    ultimo_valor = coluna.type.python_type(ultimo_valor)
+            except (ValueError, ArithmeticError):
+                raise HTTPException(status_code=400, detail="Cursor inválido.")
+            consulta = consulta.where(keyset_filter(coluna, models.Processo.id, ultimo_valor, ultimo_id, descending))
+        elif skip:
+            consulta = consulta.offset(skip)
+
+        if coluna is models.Processo.id:
+            ordenacao = [coluna.desc() if descending else coluna.asc()]
+        else:
+            ordenacao = [coluna.desc(), models.Processo.id.desc()] if descending else [coluna.asc(), models.Processo.id.asc()]
+
+        # Buscamos uma linha a mais para saber se existe próxima página.
+        linhas = (await db.execute(consulta.order_by(*ordenacao).limit(limit + 1))).all()
+        if FAST_SERIALIZATION:
+            processos_na_pagina = [_processo_dict(linha) for linha in linhas[:limit]]
+        else:
+            processos_na_pagina = [linha.Processo for linha in linhas[:limit]]
+
+        next_cursor = None
+        if len(linhas) > limit:
+            ultimo = linhas[limit - 1]
+            ultimo_id = ultimo.id if FAST_SERIALIZATION else ultimo.Processo.id
+            next_cursor = encode_cursor([ultimo.valor_ordem, ultimo_id])
+
+        return {
+            "total_count": total_count,
+            "total_is_estimate": total_is_estimate,
+            "next_cursor": next_cursor,
+            "data": processos_na_pagina,
+        }
+
+    return await cached_response(request, db, [ESCOPO_PROCESSOS], schemas.ProcessosResponse, montar)
+
+# --- EXPORTAÇÃO (CSV / NDJSON) ---
+def _resposta_exportacao(consulta, formato: str, nome_arquivo: str) -> StreamingResponse:
+    if formato not in FORMATOS_EXPORTACAO:
+        raise HTTPException(status_code=400, detail=f"format inválido. Use um de: {', '.join(FORMATOS_EXPORTACAO)}.")
+    return StreamingResponse(
+        stream_export(consulta, formato),
+        media_type=FORMATOS_EXPORTACAO[formato],
+        headers={"Content-Disposition": f'attachment; filename="{nome_arquivo}.{formato}"'},
+    )
+
+@app.get("/processos/export")
+async def export_processos(
+    formato: str = Query("csv", alias="format"),
+    current_user: schemas.User = Depends(security.get_current_user),
+    search: Optional[str] = None,
+    status_filtro: Optional[schemas.StatusEnum] = Query(None, alias="status"),
+    min_valor: Optional[Decimal] = None,
+    max_valor: Optional[Decimal] = None
+):
+    filtros, _ = _filtros_processos(async_engine.dialect.name, search, status_filtro, min_valor, max_valor)
+    consulta = select(*COLUNAS_PROCESSO).where(*filtros).order_by(models.Processo.id)
+    return _resposta_exportacao(consulta, formato, "processos")
+
+# --- EVENTOS EM TEMPO REAL (SSE) ---
+@app.post("/processos/stream/token", response_model=schemas.StreamToken)
+async def create_stream_token(current_user: schemas.User = Depends(security.get_current_user)):
+    # O frontend pede um token novo a cada (re)conexão do EventSource; o token de acesso nunca vai na URL
+    return schemas.StreamToken(token=security.create_stream_token(current_user), expires_in=security.STREAM_TOKEN_EXPIRE_SECONDS)
+
+@app.get("/processos/stream")
+async def stream_processos(user_id: int = Depends(security.get_stream_user_id)):
+    # Cada escrita publica um evento compacto (ids) depois do commit. O token de stream já traz
+    # o id do usuário: esta rota não abre sessão do banco, então uma conexão longa nunca
+    # ocupa uma vaga do pool
+    return StreamingResponse(
+        (linha.encode("utf-8") async for linha in broker.stream(user_id)),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+# --- PAINEL: CONTAGENS POR STATUS E FAIXA DE VALOR ---
+@app.get("/processos/summary", response_model=schemas.ProcessosSummary)
+async def read_processos_summary(
+    request: Request,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: schemas.User = Depends(security.get_current_user)
+):
+    # Lê a tabela de agregados (poucas linhas), mantida pelas escritas na mesma transação
+    async def montar():
+        return await read_summary(db)
+
+    return await cached_response(request, db, [ESCOPO_PROCESSOS], schemas.ProcessosSummary, montar)
+
+# --- SINCRONIZAÇÃO INCREMENTAL ---
+CHANGES_MAX_LIMIT = 5000
+
+@app.get("/processos/changes", response_model=schemas.ProcessosChangesResponse)
+async def read_processos_changes(
+    since: Optional[str] = None,
+    limit: int = Query(1000, ge=1, le=CHANGES_MAX_LIMIT),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: schemas.User = Depends(security.get_current_user)
+):
+    # Sem `since` é a sincronização completa. O cliente guarda next_token e repete a
+    # chamada enquanto has_more for True; depois, só chegam as linhas com change_seq maior.
+    desde = -1
+    if since:
+        try:
+            (desde,) = decode_cursor(since)
+            desde = int(desde)
+        except (ValueError, TypeError):
+            raise HTTPException(status_code=400, detail="Token de sincronização inválido.")
+
+    Processo, Associacao, Lapide = models.Processo, models.FolderProcessAssociation, models.FolderAssociationTombstone
+    pastas_do_usuario = select(models.Folder.id).where(models.Folder.owner_id == current_user.id)
+    filtro_associacoes = [Associacao.folder_id.in_(pastas_do_usuario)]
+    filtro_lapides = [Lapide.folder_id.in_(pastas_do_usuario)]
+    fontes = [(Processo.change_seq, []), (Associacao.change_seq, filtro_associacoes), (Lapide.change_seq, filtro_lapides)]
+
+    # Sequências de escritas ainda em andamento (e as maiores que elas) ficam para a próxima chamada
+    reservada = await visible_change_seq_limit(db)
+
+    # Primeiro só as sequências (lidas do índice), para decidir até onde vai esta página.
+    # Uma transação grava a mesma sequência em todas as suas linhas: a página leva sempre
+    # o grupo inteiro da última sequência, senão o token pularia parte dele.
+    sequencias = []
+    for coluna, filtros in fontes:
+        teto = [] if reservada is None else [coluna < reservada]
+        sequencias.extend(await db.scalars(
+            select(coluna).where(coluna > desde, *teto, *filtros).order_by(coluna).limit(limit + 1)
+        ))
+    sequencias.sort()
+    if not sequencias:
+        return schemas.ProcessosChangesResponse(
+            processos=[], folder_associations=[], removed_associations=[],
+            next_token=encode_cursor([desde]), has_more=False,
+        )
+    ate = sequencias[min(limit, len(sequencias)) - 1]
+
+    def _intervalo(coluna):
+        return coluna > desde, coluna <= ate
+
+    processos = await db.execute(
+        select(*COLUNAS_PROCESSO, Processo.change_seq).where(*_intervalo(Processo.change_seq))
+        .order_by(Processo.change_seq, Processo.id)
+    )
+    associacoes = await db.execute(
+        select(Associacao.folder_id, Associacao.processo_id, Associacao.observation, Associacao.change_seq)
+        .where(*_intervalo(Associacao.change_seq), *filtro_associacoes)
+        .order_by(Associacao.change_seq, Associacao.folder_id, Associacao.processo_id)
+    )
+    removidas = await db.execute(
+        select(Lapide.folder_id, Lapide.processo_id, Lapide.change_seq)
+        .where(*_intervalo(Lapide.change_seq), *filtro_lapides)
+        .order_by(Lapide.change_seq, Lapide.folder_id, Lapide.processo_id)
+    )
+    return schemas.ProcessosChangesResponse(
+        processos=[dict(linha._mapping) for linha in processos],
+        folder_associations=[dict(linha._mapping) for linha in associacoes],
+        removed_associations=[dict(linha._mapping) for linha in removidas],
+        next_token=encode_cursor([ate]),
+        has_more=sequencias[-1] > ate,
+    )
+
+@app.patch("/processos/status", response_model=schemas.BulkStatusResult)
+async def update_processos_status_bulk(
+    request: schemas.BulkStatusUpdate,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: schemas.User = Depends(security.get_current_user)
+):
+    # Dois modos: lista de pares {id, status} ou filtro + status de destino.
+    # Em ambos, um UPDATE ... WHERE id IN (...) por valor de status, numa única transação.
+    if (request.changes is None) == (request.filter is None):
+        raise HTTPException(status_code=400, detail="Envie exatamente um entre 'changes' e 'filter' (com 'status').")
+
+    ids_por_status = {}
+    if request.changes is not None:
+        if len(request.changes) > BULK_MAX_ITEMS:
+            raise HTTPException(status_code=413, detail=f"Máximo de {BULK_MAX_ITEMS} alterações por requisição.")
+        # Se o mesmo id vier repetido, vale a última alteração
+        destino_por_id = {mudanca.id: mudanca.status.value for mudanca in request.changes}
+        for processo_id, novo_status in destino_por_id.items():
+            ids_por_status.setdefault(novo_status, []).append(processo_id)
+    else:
+        if request.status is None:
+            raise HTTPException(status_code=400, detail="Informe o 'status' de destino para o filtro.")
+        filtro = request.filter
+        filtros, _ = _filtros_processos(db.bind.dialect.name, filtro.search, filtro.status, filtro.min_valor, filtro.max_valor)
+        ids = (await db.scalars(
+            select(models.Processo.id).where(*filtros, models.Processo.status != request.status.value)
+            .order_by(models.Processo.id).limit(BULK_MAX_ITEMS + 1)
+        )).all()
+        if len(ids) > BULK_MAX_ITEMS:
+            raise HTTPException(status_code=413, detail=f"O filtro alcança mais de {BULK_MAX_ITEMS} processos. Refine a busca.")
+        ids_por_status[request.status.value] = ids
+
+    # A reserva faz commit: precisa vir antes dos SELECT ... FOR UPDATE abaixo
+    seq = await reserve_change_seq(db) if any(ids_por_status.values()) else None
+    alterados = {}
+    deltas = Counter()
+    for novo_status, ids in ids_por_status.items():
+        for lote in chunked(ids, BULK_CHUNK_SIZE):
+            # Trava as linhas e descarta as que já estão no status de destino, para devolver só o que mudou
+            linhas = (await db.execute(
+                select(models.Processo.id, models.Processo.status, models.Processo.valor_causa_num)
+                .where(models.Processo.id.in_(lote), models.Processo.status != novo_status)
+                .with_for_update()
+            )).all()
+            if not linhas:
+                continue
+            mudam = [linha.id for linha in linhas]
+            for linha in linhas:
+                deltas[aggregate_key(linha.status, linha.valor_causa_num)] -= 1
+                deltas[aggregate_key(novo_status, linha.valor_causa_num)] += 1
+            await db.execute(
+                update(models.Processo).where(models.Processo.id.in_(mudam)).values(status=novo_status, change_seq=seq)
+                .execution_options(synchronize_session=False)
+            )
+            alterados.setdefault(novo_status, []).extend(mudam)
+    if alterados:
+        await apply_deltas(db, deltas)
+    if seq is not None:
+        await release_change_seq(db, seq, *([ESCOPO_PROCESSOS] if alterados else []))
+    await db.commit()
+
+    for novo_status, ids in alterados.items():
+        broker.publish("processos_status", {"status": novo_status, "ids": ids})
+    changed_ids = sorted(i for ids in alterados.values() for i in ids)
+    return schemas.BulkStatusResult(updated=len(changed_ids), changed_ids=changed_ids)
 
 @app.patch("/processos/{processo_id}/status", response_model=schemas.Processo)
-def update_processo_status(
-    processo_id: int, 
-    status_update: schemas.ProcessoStatusUpdate, 
-    db: Session = Depends(get_db), 
-    current_user: models.User = Depends(security.get_current_user)
+async def update_processo_status(
+    processo_id: int,
+    status_update: schemas.ProcessoStatusUpdate,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: schemas.User = Depends(security.get_current_user)
 ):
-    processo_db = db.query(models.Processo).filter(models.Processo.id == processo_id).first()
+    # A reserva faz commit, então vem antes da trava; o processo é travado para que o
+    # delta dos agregados parta do status atual de verdade
+    seq = await reserve_change_seq(db)
+    processo_db = await db.get(models.Processo, processo_id, with_for_update=True)
     if not processo_db:
+        await release_change_seq(db, seq)
+        await db.commit()
         raise HTTPException(status_code=404, detail="Processo não encontrado.")
 
-    db.query(models.Processo).filter(models.Processo.id == processo_id).update(
-        {"status": status_update.status.value}, synchronize_session="fetch"
-    )
-    db.commit()
-
-    updated_processo = db.query(models.Processo).filter(models.Processo.id == processo_id).first()
-    return updated_processo
+    if processo_db.status != status_update.status.value:
+        await apply_deltas(db, Counter({
+            aggregate_key(processo_db.status, processo_db.valor_causa_num): -1,
+            aggregate_key(status_update.status.value, processo_db.valor_causa_num): 1,
+        }))
+    processo_db.status = status_update.status.value
+    processo_db.change_seq = seq
+    await release_change_seq(db, seq, ESCOPO_PROCESSOS)
+    await db.commit()
+    broker.publish("processos_status", {"status": processo_db.status, "ids": [processo_db.id]})
+    return processo_db
 
 # --- ENDPOINTS PARA PASTAS (FOLDERS) ---
 @app.post("/folders/", response_model=schemas.Folder)
-def create_folder(folder: schemas.FolderCreate, db: Session = Depends(get_db), current_user: models.User = Depends(security.get_current_user)):
-    db_folder = db.query(models.Folder).filter(models.Folder.name == folder.name, models.Folder.owner_id == current_user.id).first()
+async def create_folder(folder: schemas.FolderCreate, db: AsyncSession = Depends(get_async_db), current_user: schemas.User = Depends(security.get_current_user)):
+    db_folder = await db.scalar(select(models.Folder.id).where(models.Folder.name == folder.name, models.Folder.owner_id == current_user.id))
     if db_folder:
         raise HTTPException(status_code=400, detail="Uma pasta com este nome já existe.")
-    new_folder = models.Folder(name=folder.name, owner=current_user)
+    new_folder = models.Folder(name=folder.name, owner_id=current_user.id)
     db.add(new_folder)
-    db.commit()
-    db.refresh(new_folder)
-    return new_folder
+    await bump_versions(db, escopo_pastas(current_user.id))
+    await db.commit()
+    broker.publish("folder_changed", {"folder_id": new_folder.id, "created": True}, user_id=current_user.id)
+    # Pasta recém-criada não tem processos; montamos a resposta sem carregar a relação
+    return schemas.Folder(id=new_folder.id, name=new_folder.name, owner_id=new_folder.owner_id, processo_associations=[])
+
+@app.get("/folders/", response_model=List[schemas.FolderSummary])
+async def read_folders(request: Request, db: AsyncSession = Depends(get_async_db), current_user: schemas.User = Depends(security.get_current_user)):
+    # Só o resumo (um GROUP BY); o conteúdo de cada pasta vem paginado de /folders/{id}
+    async def montar():
+        processos_count = func.count(models.FolderProcessAssociation.processo_id)
+        rows = await db.execute(
+            select(models.Folder.id, models.Folder.name, models.Folder.owner_id, models.Folder.updated_at, processos_count.label("processos_count"))
+            .outerjoin(models.FolderProcessAssociation, models.FolderProcessAssociation.folder_id == models.Folder.id)
+            .where(models.Folder.owner_id == current_user.id)
+            .group_by(models.Folder.id, models.Folder.name, models.Folder.owner_id, models.Folder.updated_at)
+            .order_by(models.Folder.id)
+        )
+        return [dict(row._mapping) for row in rows]
+
+    return await cached_response(request, db, [escopo_pastas(current_user.id)], List[schemas.FolderSummary], montar)
 
-@app.get("/folders/", response_model=List[schemas.Folder])
-def read_folders(db: Session = Depends(get_db), current_user: models.User = Depends(security.get_current_user)):
-    folders = db.query(models.Folder).options(
-        selectinload(models.Folder.processo_associations).selectinload(models.FolderProcessAssociation.processo)
-    ).filter(models.Folder.owner_id == current_user.id).all()
-    return folders
+async def _marcar_pasta_alterada(db: AsyncSession, folder_id: int, owner_id: int, seq: int):
+    # Atualiza o "última alteração" exibido na listagem e a versão das pastas do usuário
+    # (ETag/cache) e libera a reserva do change_seq; vai no mesmo commit da alteração.
+    await db.execute(update(models.Folder).where(models.Folder.id == folder_id).values(updated_at=func.now()))
+    await release_change_seq(db, seq, escopo_pastas(owner_id))
 
 @app.get("/folders/{folder_id}", response_model=schemas.FolderDetail)
-def read_folder(
-    folder_id: int, 
-    db: Session = Depends(get_db), 
-    current_user: models.User = Depends(security.get_current_user),
-    skip: int = 0,
-    limit: int = 10
+async def read_folder(
+    request: Request,
+    folder_id: int,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: schemas.User = Depends(security.get_current_user),
+    skip: int = Query(0, ge=0),
+    limit: int = Query(10, ge=1, le=MAX_PAGE_SIZE)
 ):
-    folder = db.query(models.Folder).filter(
-        models.Folder.id == folder_id,
-        models.Folder.owner_id == current_user.id
-    ).first()
+    async def montar():
+        folder = await db.scalar(select(models.Folder).where(
+            models.Folder.id == folder_id,
+            models.Folder.owner_id == current_user.id
+        ))
+
+        if folder is None:
+            raise HTTPException(status_code=404, detail="Pasta não encontrada ou não pertence ao usuário.")
+
+        total_processos_count = await db.scalar(
+            select(func.count()).select_from(models.FolderProcessAssociation).where(models.FolderProcessAssociation.folder_id == folder_id)
+        )
+
+        if FAST_SERIALIZATION:
+            linhas = await db.execute(
+                select(models.FolderProcessAssociation.observation, *COLUNAS_PROCESSO)
+                .join(models.Processo, models.Processo.id == models.FolderProcessAssociation.processo_id)
+                .where(models.FolderProcessAssociation.folder_id == folder_id)
+                .order_by(models.FolderProcessAssociation.processo_id).offset(skip).limit(limit)
+            )
+            associations_paginated = [{"observation": linha.observation, "processo": _processo_dict(linha)} for linha in linhas]
+        else:
+            associations_paginated = (await db.scalars(
+                select(models.FolderProcessAssociation).options(
+                    selectinload(models.FolderProcessAssociation.processo)
+                ).where(models.FolderProcessAssociation.folder_id == folder_id)
+                .order_by(models.FolderProcessAssociation.processo_id).offset(skip).limit(limit)
+            )).all()
 
+        return {
+            "id": folder.id,
+            "name": folder.name,
+            "owner_id": folder.owner_id,
+            "total_processos_count": total_processos_count,
+            "processo_associations": associations_paginated,
+        }
+
+    return await cached_response(request, db, [escopo_pastas(current_user.id), ESCOPO_PROCESSOS], schemas.FolderDetail, montar)
+
+@app.get("/folders/{folder_id}/export")
+async def export_folder(
+    folder_id: int,
+    formato: str = Query("csv", alias="format"),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: schemas.User = Depends(security.get_current_user)
+):
+    folder = await db.scalar(select(models.Folder.id).where(models.Folder.id == folder_id, models.Folder.owner_id == current_user.id))
     if folder is None:
         raise HTTPException(status_code=404, detail="Pasta não encontrada ou não pertence ao usuário.")
-    
-    total_processos_count = db.query(models.FolderProcessAssociation).filter_by(folder_id=folder_id).count()
 
-    associations_paginated = db.query(models.FolderProcessAssociation).options(
-        selectinload(models.FolderProcessAssociation.processo)
-    ).filter_by(folder_id=folder_id).offset(skip).limit(limit).all()
-
-    response_folder = schemas.FolderDetail(
-        id=folder.id,
-        name=folder.name,
-        owner_id=folder.owner_id,
-        total_processos_count=total_processos_count,
-        processo_associations=associations_paginated
+    consulta = (
+        select(*COLUNAS_PROCESSO, models.FolderProcessAssociation.observation)
+        .join(models.FolderProcessAssociation, models.FolderProcessAssociation.processo_id == models.Processo.id)
+        .where(models.FolderProcessAssociation.folder_id == folder_id)
+        .order_by(models.Processo.id)
     )
-    
-    return response_folder
+    return _resposta_exportacao(consulta, formato, f"pasta_{folder_id}")
 
 class AddProcessosRequest(BaseModel):
     processo_ids: List[int]
 
-@app.post("/folders/{folder_id}/add_processos/", response_model=schemas.Folder)
-def add_processos_to_folder(folder_id: int, request: AddProcessosRequest, db: Session = Depends(get_db), current_user: models.User = Depends(security.get_current_user)):
-    folder = db.query(models.Folder).filter(models.Folder.id == folder_id, models.Folder.owner_id == current_user.id).first()
+@app.post("/folders/{folder_id}/add_processos/", response_model=schemas.AddProcessosResult)
+async def add_processos_to_folder(folder_id: int, request: AddProcessosRequest, db: AsyncSession = Depends(get_async_db), current_user: schemas.User = Depends(security.get_current_user)):
+    folder = await db.scalar(select(models.Folder.id).where(models.Folder.id == folder_id, models.Folder.owner_id == current_user.id))
     if not folder:
         raise HTTPException(status_code=404, detail="Pasta não encontrada ou não pertence ao usuário.")
-    
-    for processo_id in request.processo_ids:
-        processo_to_add = db.query(models.Processo).filter(models.Processo.id == processo_id).first()
-        if not processo_to_add:
-            raise HTTPException(status_code=404, detail=f"Processo com ID {processo_id} não encontrado.")
-        
-        existing_assoc = db.query(models.FolderProcessAssociation).filter_by(folder_id=folder_id, processo_id=processo_id).first()
-        if not existing_assoc:
-            new_assoc = models.FolderProcessAssociation(folder_id=folder_id, processo_id=processo_id)
-            db.add(new_assoc)
-    
-    db.commit()
-    db.refresh(folder)
-    return folder
+
+    # Operação por conjunto: um IN para validar os ids e um INSERT multi-linha,
+    # em vez de dois SELECTs por processo selecionado na tela
+    ids_pedidos = list(dict.fromkeys(request.processo_ids))
+    encontrados = set()
+    for lote in chunked(ids_pedidos, BULK_CHUNK_SIZE):
+        encontrados.update(await db.scalars(select(models.Processo.id).where(models.Processo.id.in_(lote))))
+    faltando = [processo_id for processo_id in ids_pedidos if processo_id not in encontrados]
+
+    Associacao = models.FolderProcessAssociation
+    ids_validos = [processo_id for processo_id in ids_pedidos if processo_id in encontrados]
+    presentes = set()
+    for lote in chunked(ids_validos, BULK_CHUNK_SIZE):
+        presentes.update(await db.scalars(
+            select(Associacao.processo_id).where(Associacao.folder_id == folder_id, Associacao.processo_id.in_(lote))
+        ))
+    novos = [processo_id for processo_id in ids_validos if processo_id not in presentes]
+
+    insercao = insert_ignore(Associacao.__table__, db.bind.dialect.name)
+    adicionados = 0
+    seq = await reserve_change_seq(db) if novos else None
+    for lote in chunked(novos, BULK_CHUNK_SIZE):
+        # INSERT IGNORE ainda cobre quem adicionou o mesmo processo ao mesmo tempo
+        adicionados += (await db.execute(
+            insercao.values([{"folder_id": folder_id, "processo_id": p, "change_seq": seq} for p in lote])
+        )).rowcount
+    if adicionados:
+        await _marcar_pasta_alterada(db, folder_id, current_user.id, seq)
+        lapides = models.FolderAssociationTombstone
+        for lote in chunked(novos, BULK_CHUNK_SIZE):
+            # O processo voltou para a pasta: a remoção anterior deixa de valer
+            await db.execute(delete(lapides).where(lapides.folder_id == folder_id, lapides.processo_id.in_(lote)))
+    elif seq is not None:
+        await release_change_seq(db, seq)
+    await db.commit()
+    if adicionados:
+        broker.publish("folder_changed", {"folder_id": folder_id, "added": adicionados}, user_id=current_user.id)
+
+    return schemas.AddProcessosResult(
+        added=adicionados,
+        already_present=len(ids_validos) - adicionados,
+        missing_ids=faltando,
+    )
 
 class ObservationUpdateRequest(BaseModel):
     observation: str
 
 @app.patch("/folders/{folder_id}/processos/{processo_id}", response_model=schemas.FolderProcessAssociationSchema)
-def update_observation(folder_id: int, processo_id: int, request: ObservationUpdateRequest, db: Session = Depends(get_db), current_user: models.User = Depends(security.get_current_user)):
-    assoc = db.query(models.FolderProcessAssociation).join(models.Folder).filter(
+async def update_observation(folder_id: int, processo_id: int, request: ObservationUpdateRequest, db: AsyncSession = Depends(get_async_db), current_user: schemas.User = Depends(security.get_current_user)):
+    assoc = await db.scalar(select(models.FolderProcessAssociation).join(models.Folder).options(
+        selectinload(models.FolderProcessAssociation.processo)
+    ).where(
         models.FolderProcessAssociation.folder_id == folder_id,
         models.FolderProcessAssociation.processo_id == processo_id,
         models.Folder.owner_id == current_user.id
-    ).first()
+    ))
     if not assoc:
         raise HTTPException(status_code=404, detail="Associação entre pasta e processo não encontrada ou não pertence ao usuário.")
-    
+
+    seq = await reserve_change_seq(db)
     assoc.observation = request.observation
-    db.commit()
-    db.refresh(assoc)
+    assoc.change_seq = seq
+    await _marcar_pasta_alterada(db, folder_id, current_user.id, seq)
+    await db.commit()
+    broker.publish("folder_changed", {"folder_id": folder_id, "observation": processo_id}, user_id=current_user.id)
     return assoc
 
 @app.delete("/folders/{folder_id}/processos/{processo_id}", status_code=status.HTTP_204_NO_CONTENT)
-def remove_processo_from_folder(folder_id: int, processo_id: int, db: Session = Depends(get_db), current_user: models.User = Depends(security.get_current_user)):
-    assoc = db.query(models.FolderProcessAssociation).join(models.Folder).filter(
+async def remove_processo_from_folder(folder_id: int, processo_id: int, db: AsyncSession = Depends(get_async_db), current_user: schemas.User = Depends(security.get_current_user)):
+    assoc = await db.scalar(select(models.FolderProcessAssociation).join(models.Folder).where(
         models.FolderProcessAssociation.folder_id == folder_id,
         models.FolderProcessAssociation.processo_id == processo_id,
         models.Folder.owner_id == current_user.id
-    ).first()
+    ))
     if not assoc:
         raise HTTPException(status_code=404, detail="Associação entre pasta e processo não encontrada ou não pertence ao usuário.")
-    db.delete(assoc)
-    db.commit()
+    seq = await reserve_change_seq(db)
+    await db.delete(assoc)
+    await _marcar_pasta_alterada(db, folder_id, current_user.id, seq)
+    # Lápide para os clientes que sincronizam por /processos/changes
+    lapide = upsert(models.FolderAssociationTombstone.__table__, db.bind.dialect.name, ["folder_id", "processo_id"], ["change_seq"])
+    await db.execute(lapide.values(folder_id=folder_id, processo_id=processo_id, change_seq=seq))
+    await db.commit()
+    broker.publish("folder_changed", {"folder_id": folder_id, "removed": [processo_id]}, user_id=current_user.id)
     return
 
 # --- ENDPOINTS PARA USUÁRIOS E AUTENTICAÇÃO ---
+# O bcrypt é propositalmente lento (CPU); rodamos em thread para não travar o event loop.
 @app.post("/users/", response_model=schemas.User)
-def create_user(user: schemas.UserCreate, db: Session = Depends(get_db)):
-    db_user = db.query(models.User).filter(models.User.username == user.username).first()
+async def create_user(user: schemas.UserCreate, db: AsyncSession = Depends(get_async_db)):
+    db_user = await db.scalar(select(models.User).where(models.User.username == user.username))
     if db_user:
         raise HTTPException(status_code=400, detail="Usuário já registrado")
-    hashed_password = security.get_password_hash(user.password)
+    hashed_password = await run_in_threadpool(security.get_password_hash, user.password)
     db_user = models.User(username=user.username, hashed_password=hashed_password)
     db.add(db_user)
-    db.commit()
-    db.refresh(db_user)
+    await db.commit()
+    security.invalidate_cached_user(db_user.username)
     return db_user
 
 @app.post("/token")
-def login_for_access_token(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)):
-    user = db.query(models.User).filter(models.User.username == form_data.username).first()
-    if not user or not security.verify_password(form_data.password, user.hashed_password):
+async def login_for_access_token(form_data: OAuth2PasswordRequestForm = Depends(), db: AsyncSession = Depends(get_async_db)):
+    user = await db.scalar(select(models.User).where(models.User.username == form_data.username))
+    if not user or not await run_in_threadpool(security.verify_password, form_data.password, user.hashed_password):
         raise HTTPException(
             status_code=401,
             detail="Usuário ou senha incorretos",
@@ -217,4 +865,23 @@ def login_for_access_token(form_data: OAuth2PasswordRequestForm = Depends(), db:
     access_token = security.create_access_token(
         data={"sub": user.username}, expires_delta=access_token_expires
     )
-    return {"access_token": access_token, "token_type": "bearer"}
\ No newline at end of file
+    return {"access_token": access_token, "token_type": "bearer"}
+
+# --- ENDPOINTS DE MÉTRICAS ---
+# /metrics/pool é usado para dimensionar DB_POOL_SIZE / DB_MAX_OVERFLOW sob carga.
+@app.get("/metrics/pool")
+def read_pool_metrics():
+    return pool_status()
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def read_metrics():
+    # Formato de texto do Prometheus: histogramas por rota + estado dos pools de conexão
+    linhas_pool = []
+    for nome_metrica in ("checked_out", "overflow", "checkouts", "connects", "timeouts", "wait_ms_total"):
+        linhas_pool.append(f"# TYPE sgpj_db_pool_{nome_metrica} gauge")
+        for pool, estado in pool_status().items():
+            if nome_metrica in estado:
+                linhas_pool.append(f'sgpj_db_pool_{nome_metrica}{{pool="{pool}"}} {estado[nome_metrica]}')
+    linhas_pool.append("# TYPE sgpj_events_subscribers gauge")
+    linhas_pool.append(f"sgpj_events_subscribers {broker.subscribers}")
+    return metrics.render(linhas_pool)
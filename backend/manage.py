@@ -0,0 +1,140 @@
+# arquivo: backend/manage.py
+#
+# Comandos de manutenção do banco. Execute a partir da raiz do projeto:
+#   python -m backend.manage upgrade-schema   -> cria tabelas, colunas e índices que faltam
+#   python -m backend.manage backfill         -> preenche as colunas derivadas dos processos antigos
+#                                                e numera (change_seq) as linhas anteriores ao rastreio de mudanças
+#   python -m backend.manage rebuild-aggregates -> recalcula as contagens do painel (status x faixa de valor)
+
+import argparse
+
+import time
+
+from sqlalchemy import delete, func, insert, inspect, or_, select, tuple_, update
+from sqlalchemy.schema import CreateColumn
+
+from . import aggregates, models
+from .database import engine, SessionLocal
+from .utils import parse_valor_causa, normalize_digits
+
+BATCH_SIZE = 1000
+
+
+def upgrade_schema():
+    # O create_all só cria tabelas novas; colunas e índices adicionados depois
+    # em tabelas já existentes precisam de ALTER TABLE / CREATE INDEX.
+    models.Base.metadata.create_all(bind=engine)
+    with engine.begin() as conn:
+        inspector = inspect(conn)
+        for table in models.Base.metadata.sorted_tables:
+            existing_columns = {c["name"] for c in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name not in existing_columns:
+                    column_ddl = CreateColumn(column).compile(dialect=conn.dialect)
+                    conn.exec_driver_sql(f"ALTER TABLE {table.name} ADD COLUMN {column_ddl}")
+                    print(f"  [SCHEMA] Coluna {table.name}.{column.name} adicionada.")
+
+            existing_indexes = {i["name"] for i in inspector.get_indexes(table.name)}
+            for index in table.indexes:
+                # Índices FULLTEXT só existem no MariaDB/MySQL
+                if index.dialect_options["mysql"]["prefix"] and conn.dialect.name != "mysql":
+                    continue
+                if index.name not in existing_indexes:
+                    index.create(bind=conn)
+                    print(f"  [SCHEMA] Índice {index.name} criado.")
+
+
+def backfill():
+    # Percorre a tabela por id (keyset), em lotes, para não travar o banco com um UPDATE gigante
+    db = SessionLocal()
+    try:
+        last_id, total = 0, 0
+        while True:
+            rows = db.execute(
+                select(models.Processo.id, models.Processo.numero_processo, models.Processo.valor_causa)
+                .where(
+                    models.Processo.id > last_id,
+                    or_(
+                        models.Processo.valor_causa_num.is_(None),
+                        models.Processo.numero_processo_digits.is_(None),
+                    ),
+                )
+                .order_by(models.Processo.id)
+                .limit(BATCH_SIZE)
+            ).all()
+            if not rows:
+                break
+            changes = [
+                {
+                    "id": row.id,
+                    "valor_causa_num": parse_valor_causa(row.valor_causa),
+                    "numero_processo_digits": normalize_digits(row.numero_processo),
+                }
+                for row in rows
+            ]
+            db.execute(update(models.Processo), changes)
+            db.commit()
+            total += len(changes)
+            last_id = rows[-1].id
+        print(f"  [BACKFILL] {total} processos atualizados.")
+        backfill_change_seq(db)
+    finally:
+        db.close()
+
+
+def _reservar_sequencia(db) -> int:
+    # Mesma reserva usada pela API (versions.reserve_change_seq): o id autoincremento é a
+    # sequência, e a reserva em aberto segura GET /processos/changes até o commit do lote
+    seq = db.execute(insert(models.ChangeSeqReservation).values(created_at=time.time())).inserted_primary_key[0]
+    db.commit()
+    return seq
+
+
+def backfill_change_seq(db):
+    # Linhas anteriores ao rastreio têm change_seq 0. Cada lote recebe uma sequência própria:
+    # GET /processos/changes entrega uma sequência inteira por página, então um único grupo
+    # com a tabela toda tornaria a sincronização completa uma resposta só.
+    Associacao = models.FolderProcessAssociation
+    tabelas = [
+        ("processos", models.Processo.change_seq, [models.Processo.id]),
+        ("associações", Associacao.change_seq, [Associacao.folder_id, Associacao.processo_id]),
+    ]
+    for nome, coluna, chave in tabelas:
+        total = 0
+        while True:
+            rows = db.execute(select(*chave).where(coluna == 0).limit(BATCH_SIZE)).all()
+            if not rows:
+                break
+            seq = _reservar_sequencia(db)
+            db.execute(
+                update(coluna.table).where(tuple_(*chave).in_([tuple(row) for row in rows])).values(change_seq=seq)
+            )
+            db.execute(delete(models.ChangeSeqReservation).where(models.ChangeSeqReservation.seq == seq))
+            db.commit()
+            total += len(rows)
+        print(f"  [BACKFILL] change_seq preenchido em {total} {nome}.")
+
+
+def rebuild_aggregates():
+    # Uma transação só: DELETE + INSERT ... SELECT com GROUP BY sobre processos
+    with engine.begin() as conn:
+        aggregates.rebuild(conn)
+        total = conn.scalar(select(func.coalesce(func.sum(models.ProcessoAggregate.total), 0)))
+    print(f"  [AGREGADOS] Contagens recalculadas para {total} processos.")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Manutenção do banco de dados do SGPJ.")
+    parser.add_argument("command", choices=["upgrade-schema", "backfill", "rebuild-aggregates"])
+    args = parser.parse_args()
+
+    if args.command == "upgrade-schema":
+        upgrade_schema()
+    elif args.command == "backfill":
+        backfill()
+    elif args.command == "rebuild-aggregates":
+        rebuild_aggregates()
+
+
+if __name__ == "__main__":
+    main()
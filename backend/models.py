@@ -3,7 +3,7 @@
 from sqlalchemy import Column, Integer, String, Table, ForeignKey, Text
 from sqlalchemy.orm import relationship
 from .database import Base
-from sqlalchemy import Column, Integer, String, Table, ForeignKey, Text, Enum
+from sqlalchemy import Column, Integer, BigInteger, String, Table, ForeignKey, Text, Enum, Numeric, Index, DateTime, Float, func
 
 # --- GRANDE MUDANÇA: O Objeto de Associação ---
 # A nossa antiga "tabela-ponte" agora é um MODELO COMPLETO.
@@ -14,6 +14,8 @@ class FolderProcessAssociation(Base):
     processo_id = Column(ForeignKey('processos.id'), primary_key=True)
     # --- A NOVA COLUNA! ---
     observation = Column(Text, nullable=True) # Usamos Text para anotações longas
+    # Sequência da última mudança (inclusão ou observação); ver ChangeVersion / GET /processos/changes
+    change_seq = Column(BigInteger, nullable=False, default=0, server_default="0", index=True)
 
     # Relações para que possamos navegar a partir deste objeto
     folder = relationship("Folder", back_populates="processo_associations")
@@ -32,18 +34,33 @@ class User(Base):
 
 class Processo(Base):
     __tablename__ = "processos"
+    __table_args__ = (
+        # Índice FULLTEXT para a busca por nome do réu (MATCH ... AGAINST). Só existe no MariaDB/MySQL.
+        Index("ix_processos_nome_reu_fulltext", "nome_reu", mysql_prefix="FULLTEXT").ddl_if(dialect="mysql"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     numero_processo = Column(String(255), unique=True, index=True)
+    # Só os dígitos do número do processo, para busca por prefixo usando o índice B-tree
+    numero_processo_digits = Column(String(64), index=True, nullable=True)
     nome_reu = Column(String(255), index=True)
     cpf_cnpj_reu = Column(String(255))
     valor_causa = Column(String(50))
+    # Valor da causa já convertido para número, preenchido na ingestão.
+    # Indexado para que as faixas de valor e a ordenação por valor sejam range scans no banco.
+    valor_causa_num = Column(Numeric(15, 2), index=True, nullable=True)
 
     # --- NOVA COLUNA DE STATUS ---
     # Usamos um Enum para garantir que apenas estes três valores sejam aceitos.
     # O valor padrão para todo novo processo será "PENDENTE".
     status = Column(Enum("PENDENTE", "APROVADO", "REJEITADO", name="status_enum"), default="PENDENTE", nullable=False)
 
+    # --- RASTREIO DE MUDANÇAS (sincronização incremental) ---
+    # change_seq é o id de uma reserva (ChangeSeqReservation), feita antes da escrita e gravado
+    # na mesma transação dela. Linhas anteriores ao rastreio ficam com 0 e só aparecem na sincronização completa.
+    change_seq = Column(BigInteger, nullable=False, default=0, server_default="0", index=True)
+    updated_at = Column(DateTime, default=func.now(), onupdate=func.now(), nullable=True)
+
     # A relação com as pastas continua a mesma
     folder_associations = relationship("FolderProcessAssociation", back_populates="processo")
 
@@ -54,7 +71,45 @@ class Folder(Base):
     name = Column(String(255), index=True)
     owner_id = Column(Integer, ForeignKey("users.id"))
     owner = relationship("User", back_populates="folders")
+    # Última alteração da pasta (criação, processos adicionados/removidos, observações).
+    # Preenchida pela aplicação; pastas antigas ficam com NULL até a próxima alteração.
+    updated_at = Column(DateTime, default=func.now(), nullable=True)
     
     # --- MUDANÇA SUTIL ---
     # A relação agora aponta para o nosso novo objeto de associação
-    processo_associations = relationship("FolderProcessAssociation", back_populates="folder")
\ No newline at end of file
+    processo_associations = relationship("FolderProcessAssociation", back_populates="folder")
+
+# Contadores de versão por escopo ("processos", "folders:user:<id>").
+# Toda escrita incrementa o escopo afetado na mesma transação; as listagens usam
+# as versões para gerar ETags e chavear o cache de respostas serializadas.
+class ChangeVersion(Base):
+    __tablename__ = "change_versions"
+    scope = Column(String(100), primary_key=True)
+    version = Column(Integer, nullable=False, default=0)
+
+# change_seq já reservados por escritas que ainda não fizeram commit (ver versions.reserve_change_seq).
+# O id autoincremento da reserva é a própria sequência. A escrita apaga a sua linha no mesmo
+# commit dos dados; GET /processos/changes não entrega nenhuma sequência a partir da menor
+# reserva em aberto.
+class ChangeSeqReservation(Base):
+    __tablename__ = "change_seq_reservations"
+    # AUTOINCREMENT no SQLite: sem ele o id de uma reserva apagada seria reaproveitado
+    __table_args__ = {"sqlite_autoincrement": True}
+    seq = Column(BigInteger().with_variant(Integer, "sqlite"), primary_key=True, autoincrement=True)
+    created_at = Column(Float, nullable=False, index=True)
+
+# "Lápides" das associações pasta-processo removidas: a linha da associação some, mas o
+# cliente que sincroniza por GET /processos/changes precisa saber que ela deixou de existir.
+# No máximo uma por par; é apagada se o processo voltar para a pasta.
+class FolderAssociationTombstone(Base):
+    __tablename__ = "folder_association_tombstones"
+    folder_id = Column(ForeignKey("folders.id"), primary_key=True)
+    processo_id = Column(ForeignKey("processos.id"), primary_key=True)
+    change_seq = Column(BigInteger, nullable=False, index=True)
+
+# Contagem de processos por (status, faixa de valor), mantida pelas escritas (ver aggregates.py)
+class ProcessoAggregate(Base):
+    __tablename__ = "processo_aggregates"
+    status = Column(String(20), primary_key=True)
+    faixa = Column(String(20), primary_key=True)
+    total = Column(BigInteger, nullable=False, default=0)
@@ -0,0 +1,55 @@
+# arquivo: backend/pagination.py
+
+import base64
+import json
+
+from sqlalchemy import and_, or_
+
+
+# --- CURSORES OPACOS ---
+# O cliente recebe apenas uma string base64; o conteúdo (último valor ordenado + id)
+# é um detalhe interno da API e pode mudar sem quebrar o frontend.
+def encode_cursor(values: list) -> str:
+    raw = json.dumps(values, separators=(",", ":"), default=str).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> list:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+    except (ValueError, UnicodeError):
+        raise ValueError("Cursor inválido.")
+    if not isinstance(values, list):
+        raise ValueError("Cursor inválido.")
+    return values
+
+
+# --- PREDICADO DE BUSCA POR CHAVE (KEYSET / SEEK) ---
+# Em vez de OFFSET (que lê e descarta todas as linhas anteriores), continuamos a partir
+# da última linha entregue: (coluna, id) > (último valor, último id).
+# Escrevemos a comparação por extenso (OR/AND) porque o MariaDB usa o índice da coluna
+# nessa forma, e tratamos NULL como o menor valor, igual à ordenação do próprio banco.
+def keyset_filter(column, id_column, last_value, last_id, descending=False):
+    if column is id_column:
+        return id_column < last_id if descending else id_column > last_id
+
+    if last_value is None:
+        if descending:
+            # NULLs ficam no fim da ordem decrescente: só restam outros NULLs
+            return and_(column.is_(None), id_column < last_id)
+        return or_(
+            and_(column.is_(None), id_column > last_id),
+            column.isnot(None),
+        )
+
+    if descending:
+        return or_(
+            column < last_value,
+            and_(column == last_value, id_column < last_id),
+            column.is_(None),
+        )
+    return or_(
+        column > last_value,
+        and_(column == last_value, id_column > last_id),
+    )
@@ -1,8 +1,10 @@
 # arquivo: backend/schemas.py
 
 import enum
+from datetime import datetime
+from decimal import Decimal
 from pydantic import BaseModel
-from typing import List, Optional
+from typing import Dict, List, Optional
 
 class StatusEnum(str, enum.Enum):
     PENDENTE = "PENDENTE"
@@ -31,6 +33,51 @@ class ProcessoInFolder(Processo):
 class ProcessoStatusUpdate(BaseModel):
     status: StatusEnum
 
+# --- SCHEMAS DE ALTERAÇÃO DE STATUS EM LOTE ---
+class ProcessoStatusChange(BaseModel):
+    id: int
+    status: StatusEnum
+
+# Mesmos filtros aceitos pela listagem de processos
+class ProcessoFilter(BaseModel):
+    search: Optional[str] = None
+    status: Optional[StatusEnum] = None
+    min_valor: Optional[Decimal] = None
+    max_valor: Optional[Decimal] = None
+
+class BulkStatusUpdate(BaseModel):
+    changes: Optional[List[ProcessoStatusChange]] = None
+    filter: Optional[ProcessoFilter] = None
+    # Status de destino quando a seleção é feita por filtro
+    status: Optional[StatusEnum] = None
+
+class BulkStatusResult(BaseModel):
+    updated: int
+    changed_ids: List[int]
+
+# --- SCHEMAS DE INGESTÃO EM LOTE ---
+class BulkItemResult(BaseModel):
+    index: int
+    numero_processo: Optional[str] = None
+    # "created" | "existing" | "updated" | "error"
+    status: str
+    id: Optional[int] = None
+    detail: Optional[str] = None
+
+class BulkIngestResponse(BaseModel):
+    created: int
+    existing: int
+    updated: int
+    errors: int
+    results: List[BulkItemResult]
+
+class ProcessosExistsRequest(BaseModel):
+    numeros: List[str]
+
+class ProcessosExistsResponse(BaseModel):
+    # Os números consultados que já existem, na ordem da consulta
+    existing: List[str]
+
 # --- SCHEMAS DE ASSOCIAÇÃO E PASTA ---
 class FolderProcessAssociationSchema(BaseModel):
     observation: Optional[str] = None
@@ -54,11 +101,66 @@ class Folder(FolderBase):
     class Config:
         from_attributes = True
 
+# Resumo leve para a listagem de pastas: sem as associações, só a contagem
+class FolderSummary(FolderBase):
+    id: int
+    owner_id: int
+    processos_count: int
+    updated_at: Optional[datetime] = None
+
 # --- NOVO SCHEMA ---
 # Este é um schema ESPECIAL, apenas para a resposta do endpoint de detalhes da pasta.
 class FolderDetail(Folder):
     total_processos_count: int
 
+# Resumo devolvido ao adicionar processos a uma pasta (em vez da pasta inteira re-serializada)
+class AddProcessosResult(BaseModel):
+    added: int
+    already_present: int
+    missing_ids: List[int]
+
+# --- SCHEMAS DE SINCRONIZAÇÃO INCREMENTAL ---
+class ProcessoChange(Processo):
+    change_seq: int
+
+class FolderAssociationChange(BaseModel):
+    folder_id: int
+    processo_id: int
+    observation: Optional[str] = None
+    change_seq: int
+
+class FolderAssociationRemoved(BaseModel):
+    folder_id: int
+    processo_id: int
+    change_seq: int
+
+class ProcessosChangesResponse(BaseModel):
+    processos: List[ProcessoChange]
+    folder_associations: List[FolderAssociationChange]
+    removed_associations: List[FolderAssociationRemoved]
+    # Token opaco para a próxima chamada (?since=...)
+    next_token: str
+    # True quando ainda há mudanças depois de next_token (chame de novo imediatamente)
+    has_more: bool
+
+# --- SCHEMAS DE EVENTOS EM TEMPO REAL ---
+class StreamToken(BaseModel):
+    token: str
+    expires_in: int
+
+# --- SCHEMAS DO PAINEL (CONTAGENS AGREGADAS) ---
+class AggregateCell(BaseModel):
+    status: str
+    faixa: str
+    total: int
+
+class ProcessosSummary(BaseModel):
+    total: int
+    by_status: Dict[str, int]
+    # Chaves: ate_100k, 100k_300k, 300k_500k, acima_500k, sem_valor
+    by_band: Dict[str, int]
+    cells: List[AggregateCell]
+
 # --- SCHEMAS DE USUÁRIO ---
 class UserBase(BaseModel):
     username: str
@@ -71,5 +173,10 @@ class User(UserBase):
 
 # --- SCHEMA DE RESPOSTA PARA A TABELA DE PROCESSOS ---
 class ProcessosResponse(BaseModel):
-    total_count: int
+    # total_count é None quando o cliente pede count=none
+    total_count: Optional[int] = None
+    # True quando o total veio do cache ou das estatísticas do banco (pode estar levemente defasado)
+    total_is_estimate: bool = False
+    # Cursor opaco para a próxima página (?after=...); None na última página
+    next_cursor: Optional[str] = None
     data: List[Processo]
\ No newline at end of file
@@ -0,0 +1,56 @@
+# arquivo: backend/search.py
+#
+# Busca de processos por nome do réu ou número do processo.
+# O antigo ilike('%termo%') não usa índice nenhum (o curinga inicial obriga um full scan).
+# Aqui separamos os dois casos:
+#   - termo só com dígitos/pontuação -> prefixo em numero_processo_digits (índice B-tree)
+#   - termo com letras               -> FULLTEXT no nome do réu (MATCH ... AGAINST), com relevância
+
+import re
+
+from sqlalchemy import Float, and_, or_, type_coerce
+
+from . import models
+from .utils import normalize_digits
+
+# Palavras menores que o innodb_ft_min_token_size (3) não entram no índice FULLTEXT
+FULLTEXT_MIN_TOKEN = 3
+
+
+def _escape_like(valor: str) -> str:
+    return valor.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+def build_search(term: str, dialect_name: str):
+    """Retorna (filtro, expressão de relevância ou None) para o termo buscado."""
+    term = term.strip()
+    if not re.search(r"[^\W\d_]", term):
+        # Sem letras: tratamos como número de processo (com ou sem pontos e traços)
+        digits = normalize_digits(term)
+        if not digits:
+            return None, None
+        return models.Processo.numero_processo_digits.like(f"{_escape_like(digits)}%", escape="\\"), None
+
+    palavras = re.findall(r"\w+", term.lower())
+    nome = models.Processo.nome_reu
+
+    if dialect_name == "mysql":
+        indexaveis = [p for p in palavras if len(p) >= FULLTEXT_MIN_TOKEN]
+        if indexaveis:
+            # Modo booleano: todas as palavras obrigatórias (+) e com prefixo (*),
+            # então "joao silv" encontra "JOAO DA SILVA"
+            consulta = " ".join(f"+{p}*" for p in indexaveis)
+            relevancia = type_coerce(nome.match(consulta), Float)
+            return nome.match(consulta), relevancia
+        # Termo curto demais para o FULLTEXT: prefixo do nome ainda usa o índice B-tree
+        return nome.like(f"{_escape_like(term)}%", escape="\\"), None
+
+    # Outros bancos (SQLite do benchmark/desenvolvimento): início de qualquer palavra do nome
+    condicoes = [
+        or_(
+            nome.like(f"{_escape_like(p)}%", escape="\\"),
+            nome.like(f"% {_escape_like(p)}%", escape="\\"),
+        )
+        for p in palavras
+    ]
+    return and_(*condicoes), None
@@ -1,22 +1,35 @@
 # arquivo: backend/security.py
 
+import os
 from datetime import datetime, timedelta, timezone
 from typing import Optional
 from passlib.context import CryptContext
 from jose import JWTError, jwt
-from fastapi import Depends, HTTPException, status
+from fastapi import Depends, HTTPException, Query, status
 from fastapi.security import OAuth2PasswordBearer
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 
 # --- AQUI ESTÁ A CORREÇÃO ---
-# Importamos os nossos módulos e a função get_db CENTRALIZADA de database.py
-from . import models
-from .database import get_db
+# Importamos os nossos módulos e a dependência get_async_db CENTRALIZADA de database.py
+from . import models, schemas
+from .cache import TTLCache
+from .database import get_async_db
 
 # Configuração de Segurança
 SECRET_KEY = "SUA_CHAVE_SECRETA_MUITO_DIFICIL"
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 30
+# Token do stream SSE: só serve para abrir /processos/stream e vale por pouco tempo, porque
+# vai na URL (o EventSource não envia cabeçalhos) e URLs ficam em logs e no histórico
+STREAM_TOKEN_EXPIRE_SECONDS = int(os.getenv("STREAM_TOKEN_EXPIRE_SECONDS", "60"))
+ESCOPO_STREAM = "stream"
+
+# Cache dos usuários autenticados (chave = "sub" do token). Evita um SELECT em users
+# a cada requisição protegida; o TTL limita por quanto tempo uma mudança no usuário pode demorar a valer.
+AUTH_USER_CACHE_TTL = float(os.getenv("AUTH_USER_CACHE_TTL", "60"))
+AUTH_USER_CACHE_SIZE = int(os.getenv("AUTH_USER_CACHE_SIZE", "1024"))
+_usuarios_cache = TTLCache(maxsize=AUTH_USER_CACHE_SIZE, ttl=AUTH_USER_CACHE_TTL)
 
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
@@ -39,7 +52,7 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
-def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)):
+async def get_current_user(token: str = Depends(oauth2_scheme), db: AsyncSession = Depends(get_async_db)):
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
@@ -48,12 +61,43 @@ def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
         username: str = payload.get("sub")
-        if username is None:
+        # Tokens com escopo (ex.: o do stream) não valem como token de acesso
+        if username is None or payload.get("scope") is not None:
             raise credentials_exception
     except JWTError:
         raise credentials_exception
     
-    user = db.query(models.User).filter(models.User.username == username).first()
+    # Guardamos um snapshot (schemas.User), e não o objeto ORM, para que ele possa ser
+    # compartilhado entre requisições e sessões sem ficar preso a nenhuma delas.
+    user = _usuarios_cache.get(username)
     if user is None:
-        raise credentials_exception
-    return user
\ No newline at end of file
+        db_user = await db.scalar(select(models.User).where(models.User.username == username))
+        if db_user is None:
+            raise credentials_exception
+        user = schemas.User.model_validate(db_user)
+        _usuarios_cache.set(username, user)
+    return user
+
+def create_stream_token(user: schemas.User) -> str:
+    # O id vai no token: abrir o stream não consulta o banco
+    return create_access_token(
+        {"sub": user.username, "uid": user.id, "scope": ESCOPO_STREAM},
+        expires_delta=timedelta(seconds=STREAM_TOKEN_EXPIRE_SECONDS),
+    )
+
+async def get_stream_user_id(token: str = Query(..., alias="token")) -> int:
+    """Valida o token de stream de ?token= e devolve o id do usuário."""
+    try:
+        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+    except JWTError:
+        payload = {}
+    if payload.get("scope") != ESCOPO_STREAM or not isinstance(payload.get("uid"), int):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Token de stream inválido ou expirado",
+        )
+    return payload["uid"]
+
+def invalidate_cached_user(username: str):
+    """Remove o usuário do cache; chame sempre que os dados de um usuário mudarem."""
+    _usuarios_cache.pop(username)
\ No newline at end of file
@@ -0,0 +1,35 @@
+# arquivo: backend/serialization.py
+#
+# Serialização das respostas das listagens.
+# Caminho padrão: TypeAdapter (compilado uma vez por schema) valida o retorno do endpoint,
+# inclusive objetos ORM, e gera o JSON — equivalente ao que o response_model faria.
+# Caminho rápido (FAST_SERIALIZATION=true): os endpoints buscam tuplas/mapeamentos em vez
+# de entidades ORM, já no formato do schema, e o JSON sai direto do orjson, sem validação.
+
+import os
+
+from pydantic import TypeAdapter
+
+try:
+    import orjson
+except ImportError:  # orjson é opcional: sem ele o caminho rápido usa o TypeAdapter
+    orjson = None
+
+FAST_SERIALIZATION = os.getenv("FAST_SERIALIZATION", "false").lower() in ("1", "true", "yes")
+
+_adapters = {}
+
+
+def type_adapter(response_model) -> TypeAdapter:
+    adapter = _adapters.get(response_model)
+    if adapter is None:
+        adapter = _adapters[response_model] = TypeAdapter(response_model)
+    return adapter
+
+
+def dump_json(response_model, dados) -> bytes:
+    if FAST_SERIALIZATION and orjson is not None:
+        return orjson.dumps(dados)
+    adapter = type_adapter(response_model)
+    # validate_python também converte objetos ORM (from_attributes), como o response_model faria
+    return adapter.dump_json(adapter.validate_python(dados, from_attributes=True))
@@ -0,0 +1,32 @@
+# arquivo: backend/utils.py
+
+import re
+from decimal import Decimal, InvalidOperation
+from typing import Optional
+
+# Captura o primeiro número no formato brasileiro: "1.234.567,89", "1234,5", "500"
+_VALOR_REGEX = re.compile(r"\d[\d.]*(?:,\d+)?")
+
+def parse_valor_causa(valor: Optional[str]) -> Optional[Decimal]:
+    """Converte o texto do valor da causa ("R$ 1.234,56") em Decimal. Retorna None se não houver número."""
+    if not valor:
+        return None
+    match = _VALOR_REGEX.search(valor)
+    if not match:
+        return None
+    numero = match.group(0).replace(".", "").replace(",", ".")
+    try:
+        return Decimal(numero).quantize(Decimal("0.01"))
+    except InvalidOperation:
+        return None
+
+
+def normalize_digits(texto: Optional[str]) -> str:
+    """Mantém apenas os dígitos de um texto (ex.: número do processo com pontos e traços)."""
+    return re.sub(r"\D", "", texto or "")
+
+
+def chunked(itens: list, tamanho: int):
+    """Divide uma lista em pedaços de no máximo `tamanho` itens (para IN (...) e INSERTs multi-linha)."""
+    for inicio in range(0, len(itens), tamanho):
+        yield itens[inicio:inicio + tamanho]
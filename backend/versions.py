@@ -0,0 +1,129 @@
+# arquivo: backend/versions.py
+#
+# ETags e cache de respostas para as listagens (GET /processos/, /folders/, /folders/{id}).
+# Cada escrita incrementa um contador de versão do escopo afetado (tabela de processos
+# ou pastas de um usuário). A ETag é derivada de (rota, parâmetros, versões): para
+# responder 304 basta ler os contadores, sem tocar nos dados das tabelas.
+
+import hashlib
+import itertools
+import os
+import time
+
+from fastapi import Request, Response
+from sqlalchemy import delete, func, insert, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from . import models
+from .cache import TTLCache
+from .dialects import upsert_add
+from .serialization import dump_json
+
+ESCOPO_PROCESSOS = "processos"
+# Uma reserva de change_seq mais velha que isto é de uma escrita que falhou sem liberá-la
+CHANGE_SEQ_RESERVATION_TTL = float(os.getenv("CHANGE_SEQ_RESERVATION_TTL", "60"))
+# A cada quantas reservas as vencidas são apagadas
+RESERVATION_PURGE_EVERY = 256
+_reservas_feitas = itertools.count(1)
+
+RESPONSE_CACHE_SIZE = int(os.getenv("RESPONSE_CACHE_SIZE", "512"))
+# As chaves já mudam a cada escrita; o TTL só limita quanto tempo uma resposta fria ocupa memória
+RESPONSE_CACHE_TTL = float(os.getenv("RESPONSE_CACHE_TTL", "300"))
+
+_respostas_cache = TTLCache(maxsize=RESPONSE_CACHE_SIZE, ttl=RESPONSE_CACHE_TTL)
+
+
+def escopo_pastas(user_id: int) -> str:
+    return f"folders:user:{user_id}"
+
+
+async def bump_versions(db: AsyncSession, *escopos: str):
+    """Incrementa as versões dos escopos. Deve ser chamada antes do commit da escrita."""
+    escopos = sorted(set(escopos))
+    tabela = models.ChangeVersion.__table__
+    # Um comando só: cria o contador que ainda não existe ou soma 1. A linha fica travada
+    # até o commit, então escritas concorrentes nunca "perdem" um incremento
+    await db.execute(
+        upsert_add(tabela, db.bind.dialect.name, ["scope"], ["version"]).values([{"scope": e, "version": 1} for e in escopos])
+    )
+
+
+async def reserve_change_seq(db: AsyncSession) -> int:
+    """Reserva o change_seq de uma escrita numa transação curta própria e devolve a sequência.
+
+    Chame antes de qualquer escrita ou SELECT ... FOR UPDATE da requisição (a reserva faz commit),
+    grave a sequência nas linhas alteradas e termine com release_change_seq no commit da escrita.
+    A sequência é o id autoincremento da reserva: custa um INSERT e o commit (mais um DELETE das
+    vencidas a cada RESERVATION_PURGE_EVERY reservas); release_change_seq soma o DELETE da reserva.
+    """
+    # O commit abaixo só pode encerrar leituras (ex.: autenticação), nunca escritas do chamador
+    if db.new or db.dirty or db.deleted:
+        raise RuntimeError("reserve_change_seq deve ser chamada antes das escritas da transação.")
+    resultado = await db.execute(insert(models.ChangeSeqReservation).values(created_at=time.time()))
+    seq = resultado.inserted_primary_key[0]
+    if next(_reservas_feitas) % RESERVATION_PURGE_EVERY == 0:
+        await db.execute(
+            delete(models.ChangeSeqReservation)
+            .where(models.ChangeSeqReservation.created_at < time.time() - CHANGE_SEQ_RESERVATION_TTL)
+        )
+    await db.commit()
+    return seq
+
+
+async def release_change_seq(db: AsyncSession, seq: int, *escopos: str):
+    """Libera a reserva e incrementa as versões dos escopos, no mesmo commit dos dados da escrita."""
+    await db.execute(delete(models.ChangeSeqReservation).where(models.ChangeSeqReservation.seq == seq))
+    if escopos:
+        await bump_versions(db, *escopos)
+
+
+async def visible_change_seq_limit(db: AsyncSession):
+    """Menor change_seq ainda reservado (nada a partir dele pode ser entregue), ou None.
+
+    Cada reserva é confirmada logo depois do INSERT que gerou a sua sequência, e cada escrita
+    só libera a sua no commit dos dados: enquanto uma escrita com sequência N não termina, quem já confirmou
+    N+1 fica retido, e um cliente que leu até N+1 nunca "pula" N. Reservas mais velhas que
+    CHANGE_SEQ_RESERVATION_TTL são de escritas que falharam sem liberar e são ignoradas.
+    """
+    return await db.scalar(
+        select(func.min(models.ChangeSeqReservation.seq))
+        .where(models.ChangeSeqReservation.created_at >= time.time() - CHANGE_SEQ_RESERVATION_TTL)
+    )
+
+
+async def get_versions(db: AsyncSession, escopos: list) -> dict:
+    linhas = await db.execute(
+        select(models.ChangeVersion.scope, models.ChangeVersion.version).where(models.ChangeVersion.scope.in_(escopos))
+    )
+    versoes = dict(linhas.all())
+    return {escopo: versoes.get(escopo, 0) for escopo in escopos}
+
+
+def _etag_confere(if_none_match: str, etag: str) -> bool:
+    if not if_none_match:
+        return False
+    candidatas = [c.strip() for c in if_none_match.split(",")]
+    # If-None-Match usa comparação fraca: W/"x" equivale a "x"
+    return "*" in candidatas or any(c.removeprefix("W/") == etag for c in candidatas)
+
+
+async def cached_response(request: Request, db: AsyncSession, escopos: list, response_model, montar) -> Response:
+    """Responde 304 se a ETag confere; senão usa o corpo em cache ou chama `montar()` e serializa."""
+    versoes = await get_versions(db, escopos)
+    chave = (
+        request.url.path,
+        tuple(sorted(request.query_params.multi_items())),
+        tuple(sorted(versoes.items())),
+    )
+    etag = '"' + hashlib.sha256(repr(chave).encode("utf-8")).hexdigest()[:32] + '"'
+    # no-cache: o navegador guarda a resposta, mas revalida sempre com If-None-Match
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+
+    if _etag_confere(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+
+    corpo = _respostas_cache.get(chave)
+    if corpo is None:
+        corpo = dump_json(response_model, await montar())
+        _respostas_cache.set(chave, corpo)
+    return Response(content=corpo, media_type="application/json", headers=headers)
@@ -0,0 +1,67 @@
+# arquivo: benchmarks/bench_auth.py
+#
+# Mede o custo de resolver o usuário autenticado (get_current_user) com e sem o cache,
+# contando as consultas SQL emitidas por chamada.
+#
+#   python -m benchmarks.bench_auth --database-url mysql+pymysql://root:@localhost:3307/leads_bench
+
+import argparse
+import asyncio
+import time
+
+from .common import DEFAULT_DATABASE_URL, dump_report, percentiles, use_database
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark da resolução do usuário autenticado.")
+    parser.add_argument("--database-url", default=DEFAULT_DATABASE_URL)
+    parser.add_argument("--calls", type=int, default=2000)
+    parser.add_argument("--output", help="Arquivo JSON para salvar o relatório")
+    args = parser.parse_args()
+
+    use_database(args.database_url)
+    from sqlalchemy import event
+    from backend import models, security
+    from backend.database import AsyncSessionLocal, SessionLocal, async_engine, engine
+
+    models.Base.metadata.create_all(bind=engine)
+    username = "bench_auth"
+    with SessionLocal() as db:
+        if not db.query(models.User).filter_by(username=username).first():
+            db.add(models.User(username=username, hashed_password=security.get_password_hash("bench")))
+            db.commit()
+    token = security.create_access_token({"sub": username})
+
+    # get_current_user é assíncrona e usa o engine assíncrono da API
+    consultas = {"n": 0}
+    @event.listens_for(async_engine.sync_engine, "before_cursor_execute")
+    def contar(*_):
+        consultas["n"] += 1
+
+    async def medir(limpar_cache: bool):
+        amostras = []
+        consultas["n"] = 0
+        for _ in range(args.calls):
+            if limpar_cache:
+                security.invalidate_cached_user(username)
+            async with AsyncSessionLocal() as db:
+                inicio = time.perf_counter()
+                await security.get_current_user(token=token, db=db)
+                amostras.append((time.perf_counter() - inicio) * 1000)
+        return {**percentiles(amostras), "queries_per_call": consultas["n"] / args.calls}
+
+    async def medir_tudo():
+        resultado = {"uncached": await medir(limpar_cache=True), "cached": await medir(limpar_cache=False)}
+        await async_engine.dispose()
+        return resultado
+
+    report = {
+        "database": engine.dialect.name,
+        "calls": args.calls,
+        **asyncio.run(medir_tudo()),
+    }
+    dump_report(report, args.output)
+
+
+if __name__ == "__main__":
+    main()
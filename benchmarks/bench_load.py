@@ -0,0 +1,103 @@
+# arquivo: benchmarks/bench_load.py
+#
+# Teste de carga HTTP contra uma ou mais instâncias da API já rodando, para comparar
+# implantações (ex.: a versão síncrona anterior e a assíncrona atual) com a mesma carga.
+#
+#   # versão síncrona (commit anterior à migração para asyncio) numa worktree separada:
+#   git worktree add /tmp/sgpj-sync <commit> && (cd /tmp/sgpj-sync && uvicorn backend.main:app --port 8001)
+#   uvicorn backend.main:app --port 8000
+#   python -m benchmarks.bench_load --target sync=http://127.0.0.1:8001 --target async=http://127.0.0.1:8000 \
+#       --concurrency 200 --duration 30
+#
+# Requer httpx (benchmarks/requirements.txt).
+
+import argparse
+import asyncio
+import itertools
+import time
+
+import httpx
+
+from .common import dump_report, percentiles
+
+USERNAME = "bench_load"
+PASSWORD = "bench_load"
+
+# Mistura de leitura típica da tela de processos e de pastas
+ENDPOINTS = [
+    ("processos_page", "/processos/?limit=50&order_by=valor_causa&order=desc&count=cached"),
+    ("processos_search", "/processos/?limit=50&search=silva&count=cached"),
+    ("folders", "/folders/"),
+]
+
+
+async def autenticar(client: httpx.AsyncClient) -> dict:
+    await client.post("/users/", json={"username": USERNAME, "password": PASSWORD})
+    response = await client.post("/token", data={"username": USERNAME, "password": PASSWORD})
+    response.raise_for_status()
+    return {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+
+async def rodar_carga(base_url: str, concurrency: int, duration: float) -> dict:
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=60) as client:
+        headers = await autenticar(client)
+        amostras = {nome: [] for nome, _ in ENDPOINTS}
+        erros = {nome: 0 for nome, _ in ENDPOINTS}
+        fim = time.perf_counter() + duration
+
+        async def worker(offset: int):
+            ciclo = itertools.islice(itertools.cycle(ENDPOINTS), offset, None)
+            for nome, caminho in ciclo:
+                if time.perf_counter() >= fim:
+                    return
+                inicio = time.perf_counter()
+                try:
+                    response = await client.get(caminho, headers=headers)
+                    ok = response.status_code == 200
+                except httpx.HTTPError:
+                    ok = False
+                if ok:
+                    amostras[nome].append((time.perf_counter() - inicio) * 1000)
+                else:
+                    erros[nome] += 1
+
+        inicio_total = time.perf_counter()
+        await asyncio.gather(*(worker(i) for i in range(concurrency)))
+        decorrido = time.perf_counter() - inicio_total
+
+    todas = [a for lista in amostras.values() for a in lista]
+    return {
+        "url": base_url,
+        "requests": len(todas),
+        "errors": sum(erros.values()),
+        "throughput_rps": round(len(todas) / decorrido, 2),
+        "latency": percentiles(todas) if todas else None,
+        "endpoints": {
+            nome: {"errors": erros[nome], **(percentiles(lista) if lista else {"n": 0})}
+            for nome, lista in amostras.items()
+        },
+    }
+
+
+async def main_async(args):
+    report = {"concurrency": args.concurrency, "duration_s": args.duration, "targets": {}}
+    for alvo in args.target:
+        nome, _, url = alvo.partition("=")
+        print(f"  [CARGA] {nome}: {url} ({args.concurrency} conexões por {args.duration}s)")
+        report["targets"][nome] = await rodar_carga(url, args.concurrency, args.duration)
+    dump_report(report, args.output)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Teste de carga HTTP comparando implantações da API.")
+    parser.add_argument("--target", action="append", required=True, help="nome=url, pode repetir")
+    parser.add_argument("--concurrency", type=int, default=100)
+    parser.add_argument("--duration", type=float, default=30)
+    parser.add_argument("--output", help="Arquivo JSON para salvar o relatório")
+    args = parser.parse_args()
+    asyncio.run(main_async(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+# arquivo: benchmarks/bench_search.py
+#
+# Compara a busca antiga (ilike '%termo%' em nome e número) com o novo caminho de busca
+# (FULLTEXT no nome + prefixo em numero_processo_digits) numa tabela de 1M de processos.
+#
+#   python -m benchmarks.bench_search --database-url mysql+pymysql://root:@localhost:3307/leads_bench
+#   python -m benchmarks.bench_search --rows 200000            (SQLite local, sem FULLTEXT)
+
+import argparse
+import random
+import time
+
+from sqlalchemy import or_, select
+
+from .common import DEFAULT_DATABASE_URL, NOMES, SOBRENOMES, dump_report, make_engine, percentiles, seed_processos, use_database
+
+PAGE_SIZE = 50
+
+
+def termos_de_busca(rng: random.Random, quantidade: int) -> list:
+    termos = []
+    for _ in range(quantidade):
+        tipo = rng.random()
+        if tipo < 0.4:
+            termos.append(rng.choice(SOBRENOMES)[: rng.randint(4, 7)].lower())
+        elif tipo < 0.7:
+            termos.append(f"{rng.choice(NOMES).lower()} {rng.choice(SOBRENOMES)[:4].lower()}")
+        else:
+            termos.append(f"{rng.randint(0, 999999):06d}")
+    return termos
+
+
+def consulta_antiga(termo):
+    from backend import models
+
+    return select(models.Processo.id).where(
+        or_(
+            models.Processo.nome_reu.ilike(f"%{termo}%"),
+            models.Processo.numero_processo.ilike(f"%{termo}%"),
+        )
+    ).order_by(models.Processo.id).limit(PAGE_SIZE)
+
+
+def consulta_nova(termo, dialect_name):
+    from backend import models
+    from backend.search import build_search
+
+    filtro, relevancia = build_search(termo, dialect_name)
+    ordem = relevancia.desc() if relevancia is not None else models.Processo.id
+    return select(models.Processo.id).where(filtro).order_by(ordem, models.Processo.id).limit(PAGE_SIZE)
+
+
+def medir(engine, consultas):
+    amostras = []
+    with engine.connect() as conn:
+        for consulta in consultas:
+            inicio = time.perf_counter()
+            conn.execute(consulta).all()
+            amostras.append((time.perf_counter() - inicio) * 1000)
+    return percentiles(amostras)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark da busca de processos.")
+    parser.add_argument("--database-url", default=DEFAULT_DATABASE_URL)
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="Arquivo JSON para salvar o relatório")
+    args = parser.parse_args()
+
+    use_database(args.database_url)
+    engine = make_engine(args.database_url)
+    seed_processos(engine, args.rows, seed=args.seed)
+    dialect_name = engine.dialect.name
+
+    termos = termos_de_busca(random.Random(args.seed), args.queries)
+    report = {
+        "database": dialect_name,
+        "rows": args.rows,
+        "queries": args.queries,
+        "page_size": PAGE_SIZE,
+        "legacy_ilike": medir(engine, [consulta_antiga(t) for t in termos]),
+        "indexed_search": medir(engine, [consulta_nova(t, dialect_name) for t in termos]),
+    }
+    if dialect_name != "mysql":
+        # Sem FULLTEXT, a busca por nome cai no LIKE '% termo%' de search.py, que não usa índice
+        # (só a busca por número, por prefixo, usa). A comparação justa é a do MariaDB.
+        report["note"] = (
+            f"{dialect_name}: sem FULLTEXT; a busca por nome usa LIKE '% termo%' (sem índice). "
+            "Só a busca por número usa índice aqui; indexed_search não representa o MariaDB."
+        )
+    dump_report(report, args.output)
+
+
+if __name__ == "__main__":
+    main()
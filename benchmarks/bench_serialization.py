@@ -0,0 +1,91 @@
+# arquivo: benchmarks/bench_serialization.py
+#
+# Mede o tempo de montar e serializar uma resposta de 10k processos (por padrão) em cada caminho:
+#   fastapi_response_model -> entidades ORM + serialize_response do FastAPI + JSONResponse (o caminho antigo)
+#   orm_type_adapter       -> entidades ORM + TypeAdapter (caminho padrão atual)
+#   rows_type_adapter      -> tuplas + TypeAdapter
+#   rows_orjson            -> tuplas + orjson (FAST_SERIALIZATION=true)
+# Busca e serialização são medidas separadamente; os tempos são por resposta de --rows linhas.
+#
+#   python -m benchmarks.bench_serialization --rows 10000 --repeat 30
+
+import argparse
+import asyncio
+import time
+
+from .common import DEFAULT_DATABASE_URL, dump_report, percentiles, seed_processos, use_database
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark da serialização das listagens de processos.")
+    parser.add_argument("--database-url", default=DEFAULT_DATABASE_URL)
+    parser.add_argument("--rows", type=int, default=10_000, help="Linhas por resposta")
+    parser.add_argument("--repeat", type=int, default=30)
+    parser.add_argument("--output", help="Arquivo JSON para salvar o relatório")
+    args = parser.parse_args()
+
+    use_database(args.database_url)
+    from fastapi.responses import JSONResponse
+    from fastapi.routing import serialize_response
+    from fastapi.utils import create_model_field
+    from sqlalchemy import select
+
+    from backend import models, schemas
+    from backend.database import SessionLocal, engine
+    from backend.main import COLUNAS_PROCESSO, _processo_dict
+    from backend.serialization import orjson, type_adapter
+
+    seed_processos(engine, args.rows)
+    adapter = type_adapter(schemas.ProcessosResponse)
+    campo = create_model_field(name="response", type_=schemas.ProcessosResponse, mode="serialization")
+
+    def resposta(data):
+        return {"total_count": args.rows, "total_is_estimate": False, "next_cursor": None, "data": data}
+
+    def buscar_entidades(db):
+        return [linha.Processo for linha in db.execute(select(models.Processo).order_by(models.Processo.id).limit(args.rows))]
+
+    def buscar_tuplas(db):
+        return [_processo_dict(linha) for linha in db.execute(select(*COLUNAS_PROCESSO).order_by(models.Processo.id).limit(args.rows))]
+
+    def via_fastapi(dados):
+        conteudo = asyncio.run(serialize_response(field=campo, response_content=dados))
+        return JSONResponse(conteudo).body
+
+    def via_adapter(dados):
+        return adapter.dump_json(adapter.validate_python(dados, from_attributes=True))
+
+    caminhos = {
+        "fastapi_response_model": (buscar_entidades, via_fastapi),
+        "orm_type_adapter": (buscar_entidades, via_adapter),
+        "rows_type_adapter": (buscar_tuplas, via_adapter),
+    }
+    if orjson is not None:
+        caminhos["rows_orjson"] = (buscar_tuplas, orjson.dumps)
+
+    report = {"database": engine.dialect.name, "rows_per_response": args.rows, "repeat": args.repeat, "paths": {}}
+    for nome, (buscar, serializar) in caminhos.items():
+        busca_ms, serializacao_ms, tamanho = [], [], 0
+        for _ in range(args.repeat):
+            # Sessão nova a cada repetição: sem identity map aquecido entre as medições
+            with SessionLocal() as db:
+                inicio = time.perf_counter()
+                dados = resposta(buscar(db))
+                meio = time.perf_counter()
+                corpo = serializar(dados)
+                fim = time.perf_counter()
+            busca_ms.append((meio - inicio) * 1000)
+            serializacao_ms.append((fim - meio) * 1000)
+            tamanho = len(corpo)
+        report["paths"][nome] = {
+            "fetch": percentiles(busca_ms),
+            "serialize": percentiles(serializacao_ms),
+            "body_bytes": tamanho,
+        }
+        print(f"  [{nome}] busca p50={report['paths'][nome]['fetch']['p50_ms']}ms "
+              f"serialização p50={report['paths'][nome]['serialize']['p50_ms']}ms")
+    dump_report(report, args.output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,181 @@
+# arquivo: benchmarks/common.py
+#
+# Utilitários compartilhados pelos benchmarks: criação do engine e geração de dados sintéticos.
+
+import json
+import os
+import random
+import statistics
+import time
+from decimal import Decimal
+
+from sqlalchemy import create_engine, func, insert, select
+from sqlalchemy.orm import Session
+
+# Importante: este módulo não importa o backend no topo. O backend lê DATABASE_URL na
+# importação, então os benchmarks que usam o engine da aplicação precisam definir a
+# variável (use_database) antes do primeiro import de backend.*.
+
+DEFAULT_DATABASE_URL = "sqlite:///benchmarks/bench.sqlite3"
+
+NOMES = [
+    "JOAO", "MARIA", "JOSE", "ANA", "CARLOS", "FRANCISCA", "PAULO", "ADRIANA", "LUCAS", "JULIANA",
+    "MARCOS", "PATRICIA", "PEDRO", "ALINE", "RAFAEL", "FERNANDA", "BRUNO", "CAMILA", "DIEGO", "LETICIA",
+]
+SOBRENOMES = [
+    "SILVA", "SANTOS", "OLIVEIRA", "SOUZA", "RODRIGUES", "FERREIRA", "ALVES", "PEREIRA", "LIMA", "GOMES",
+    "COSTA", "RIBEIRO", "MARTINS", "CARVALHO", "ALMEIDA", "LOPES", "SOARES", "FERNANDES", "VIEIRA", "BARBOSA",
+]
+EMPRESAS = ["COMERCIO", "TRANSPORTES", "CONSTRUTORA", "DISTRIBUIDORA", "SERVICOS", "ALIMENTOS", "LOGISTICA"]
+STATUS = ["PENDENTE", "PENDENTE", "PENDENTE", "APROVADO", "REJEITADO"]
+
+
+def use_database(url: str):
+    """Aponta o engine da aplicação (backend.database) para `url`. Chame antes de importar o backend."""
+    os.environ["DATABASE_URL"] = url
+
+
+def make_engine(url: str):
+    connect_args = {"check_same_thread": False} if url.startswith("sqlite") else {}
+    return create_engine(url, connect_args=connect_args)
+
+
+def fake_nome(rng: random.Random) -> str:
+    if rng.random() < 0.2:
+        return f"{rng.choice(EMPRESAS)} {rng.choice(SOBRENOMES)} LTDA"
+    return f"{rng.choice(NOMES)} {rng.choice(['', 'DA ', 'DE ', 'DOS '])}{rng.choice(SOBRENOMES)} {rng.choice(SOBRENOMES)}"
+
+
+def fake_valor(rng: random.Random):
+    if rng.random() < 0.05:
+        return "Não encontrado", None
+    valor = Decimal(rng.randint(1_000_00, 2_000_000_00)) / 100
+    inteiro, centavos = f"{valor:.2f}".split(".")
+    texto = f"R$ {int(inteiro):,}".replace(",", ".") + f",{centavos}"
+    return texto, valor
+
+
+def fake_processo(i: int, rng: random.Random) -> dict:
+    from backend.utils import normalize_digits
+
+    # Número no formato CNJ (NNNNNNN-DD.AAAA.J.TR.OOOO); o sequencial garante unicidade
+    numero = f"{i:07d}-{rng.randint(10, 99)}.{rng.randint(2015, 2024)}.8.26.{rng.randint(1, 9999):04d}"
+    valor_texto, valor_num = fake_valor(rng)
+    return {
+        "numero_processo": numero,
+        "numero_processo_digits": normalize_digits(numero),
+        "nome_reu": fake_nome(rng),
+        "cpf_cnpj_reu": f"{rng.randint(0, 99999999999):011d}",
+        "valor_causa": valor_texto,
+        "valor_causa_num": valor_num,
+        "status": rng.choice(STATUS),
+    }
+
+
+def seed_processos(engine, rows: int, batch: int = 10_000, seed: int = 42) -> int:
+    """Completa a tabela de processos até `rows` linhas. Retorna quantas foram inseridas."""
+    from backend import aggregates, models
+
+    models.Base.metadata.create_all(bind=engine)
+    with engine.connect() as conn:
+        existentes = conn.execute(select(func.count()).select_from(models.Processo)).scalar()
+
+    rng = random.Random(seed + existentes)
+    inicio = time.perf_counter()
+    for start in range(existentes, rows, batch):
+        lote = [fake_processo(i, rng) for i in range(start, min(start + batch, rows))]
+        with engine.begin() as conn:
+            conn.execute(insert(models.Processo), lote)
+        print(f"  [SEED] {start + len(lote)}/{rows} processos ({time.perf_counter() - inicio:.0f}s)")
+
+    # Os INSERTs diretos não passam pela API: agregados do painel e change_seq são preenchidos
+    # pelos mesmos caminhos de manage.py (rebuild-aggregates e backfill). Roda mesmo sem
+    # inserir nada, para corrigir bancos semeados antes disso.
+    with engine.begin() as conn:
+        aggregates.rebuild(conn)
+    _backfill_change_seq(engine)
+    return max(0, rows - existentes)
+
+
+def _backfill_change_seq(engine):
+    from backend.manage import backfill_change_seq
+
+    with Session(engine) as db:
+        backfill_change_seq(db)
+
+
+def percentiles(amostras_ms: list) -> dict:
+    ordenadas = sorted(amostras_ms)
+    def pct(p):
+        return round(ordenadas[min(len(ordenadas) - 1, int(len(ordenadas) * p))], 3)
+    return {
+        "n": len(ordenadas),
+        "mean_ms": round(statistics.fmean(ordenadas), 3),
+        "p50_ms": pct(0.50),
+        "p95_ms": pct(0.95),
+        "p99_ms": pct(0.99),
+        "max_ms": round(ordenadas[-1], 3),
+    }
+
+
+def dump_report(report: dict, output: str = None):
+    texto = json.dumps(report, indent=2, ensure_ascii=False, default=str)
+    if output:
+        with open(output, "w", encoding="utf-8") as f:
+            f.write(texto)
+    print(texto)
+
+
+BENCH_PASSWORD = "bench"
+
+
+def bench_username(i: int) -> str:
+    return f"bench_user_{i:04d}"
+
+
+def seed_users(engine, users: int) -> int:
+    """Garante `users` usuários bench_user_NNNN, todos com a senha BENCH_PASSWORD."""
+    from backend import models, security
+
+    models.Base.metadata.create_all(bind=engine)
+    nomes = [bench_username(i) for i in range(users)]
+    with engine.begin() as conn:
+        existentes = set(conn.execute(select(models.User.username).where(models.User.username.in_(nomes))).scalars())
+        faltando = [n for n in nomes if n not in existentes]
+        if faltando:
+            # Um único hash bcrypt serve para todos (mesma senha); gerar um por usuário levaria minutos
+            hashed = security.get_password_hash(BENCH_PASSWORD)
+            conn.execute(insert(models.User), [{"username": n, "hashed_password": hashed} for n in faltando])
+    return len(faltando)
+
+
+def seed_folders(engine, users: int, folders_per_user: int, folder_size: int, processos: int, seed: int = 42) -> int:
+    """Cria as pastas bench_NN de cada usuário. A primeira recebe `folder_size` processos;
+    as demais, um décimo disso (pastas grandes e pequenas convivendo, como em produção)."""
+    from backend import models
+
+    rng = random.Random(seed)
+    criadas = 0
+    with engine.begin() as conn:
+        donos = dict(conn.execute(
+            select(models.User.username, models.User.id).where(models.User.username.in_([bench_username(i) for i in range(users)]))
+        ).all())
+        for i in range(users):
+            owner_id = donos[bench_username(i)]
+            for n in range(folders_per_user):
+                nome = f"bench_{n:02d}"
+                if conn.execute(select(models.Folder.id).where(models.Folder.owner_id == owner_id, models.Folder.name == nome)).first():
+                    continue
+                folder_id = conn.execute(insert(models.Folder).values(name=nome, owner_id=owner_id)).inserted_primary_key[0]
+                tamanho = min(processos, folder_size if n == 0 else max(1, folder_size // 10))
+                ids = rng.sample(range(1, processos + 1), tamanho)
+                for inicio in range(0, len(ids), 10_000):
+                    conn.execute(
+                        insert(models.FolderProcessAssociation),
+                        [{"folder_id": folder_id, "processo_id": p} for p in ids[inicio:inicio + 10_000]],
+                    )
+                criadas += 1
+    if criadas:
+        # As associações novas também precisam de change_seq para /processos/changes
+        _backfill_change_seq(engine)
+    return criadas
@@ -16,6 +16,13 @@
     ListItemButton
     } from '@mui/material';
 
+    // Resumo exibido abaixo do nome: quantidade de processos e última alteração
+    const formatFolderSummary = (folder) => {
+    const count = `${folder.processos_count} processo(s)`;
+    if (!folder.updated_at) return count;
+    return `${count} · alterada em ${new Date(folder.updated_at).toLocaleString('pt-BR')}`;
+    };
+
     export default function PastasPage() {
     const [folders, setFolders] = useState([]);
     const [newFolderName, setNewFolderName] = useState('');
@@ -28,8 +35,8 @@
         setLoading(true);
         setError(null);
         try {
-        const cacheBuster = `?_=${new Date().getTime()}`;
-        const response = await axios.get(`http://127.0.0.1:8000/folders/${cacheBuster}`);
+        // Sem cache buster: a API responde com ETag e o navegador revalida (304 quando nada mudou)
+        const response = await axios.get(`http://127.0.0.1:8000/folders/`);
         setFolders(response.data);
         } catch (err) {
         setError('Falha ao carregar as pastas.');
@@ -115,7 +122,7 @@
                     to={`/pastas/${folder.id}`} 
                     divider
                 >
-                    <ListItemText primary={folder.name} secondary={`ID: ${folder.id}`} />
+                    <ListItemText primary={folder.name} secondary={formatFolderSummary(folder)} />
                 </ListItemButton>
                 ))}
             </List>
@@ -1,4 +1,4 @@
-    import React, { useState, useEffect, useMemo, useCallback } from 'react';
+    import React, { useState, useEffect, useRef, useCallback } from 'react';
     import axios from 'axios';
     import { useLocation } from 'react-router-dom';
     import { useDebounce } from 'use-debounce';
@@ -7,7 +7,7 @@
     Tabs, Tab, Table, TableBody, TableCell, TableContainer, TableHead, TableRow,
     TableSortLabel, TablePagination, Checkbox, Tooltip, IconButton,
     Dialog, DialogTitle, List, ListItem, ListItemButton, ListItemText,
-    Snackbar, InputAdornment, Select, MenuItem,
+    Snackbar, InputAdornment, Select, MenuItem, Button,
     Toolbar // Adicionado aqui
 } from '@mui/material';
 import { alpha } from '@mui/material/styles'; // E a função alpha importada de 'styles'
@@ -17,102 +17,172 @@ import AddTaskIcon from '@mui/icons-material/AddTask';
 import CheckCircleIcon from '@mui/icons-material/CheckCircle';
 import CancelIcon from '@mui/icons-material/Cancel';
 import HelpIcon from '@mui/icons-material/Help';
+import { useAuth } from '../context/AuthContext';
+
+    // Faixas de valor das abas. Os limites são inclusivos na API, por isso 299999.99 e 499999.99.
+    const FAIXAS_VALOR = [
+        {},
+        { min_valor: 100000, max_valor: 299999.99 },
+        { min_valor: 300000, max_valor: 499999.99 },
+        { min_valor: 500000 },
+    ];
+    // Rótulo de cada aba e a chave da faixa correspondente em GET /processos/summary
+    const ABAS = [
+        { label: 'Todos', faixa: null },
+        { label: 'R$ 100k - 300k', faixa: '100k_300k' },
+        { label: 'R$ 300k - 500k', faixa: '300k_500k' },
+        { label: 'Acima de 500k', faixa: 'acima_500k' },
+    ];
 
     export default function ProcessosPage() {
-    const [allProcessos, setAllProcessos] = useState([]);
+    const [processos, setProcessos] = useState([]);
+    const [totalCount, setTotalCount] = useState(0);
+    // Só a primeira carga mostra a tela de "Carregando..."; as trocas de página mantêm a tabela visível
     const [loading, setLoading] = useState(true);
     const [error, setError] = useState(null);
     const [activeTab, setActiveTab] = useState(0);
     const [searchTerm, setSearchTerm] = useState('');
     const [debouncedSearchTerm] = useDebounce(searchTerm, 300);
     const [sortConfig, setSortConfig] = useState({ key: 'valor_causa', direction: 'desc' });
-    const [page, setPage] = useState(0);
     const [rowsPerPage, setRowsPerPage] = useState(10);
     const [selected, setSelected] = useState([]);
     const [folders, setFolders] = useState([]);
     const [dialogOpen, setDialogOpen] = useState(false);
     const [snackbarInfo, setSnackbarInfo] = useState({ open: false, message: '' });
     const location = useLocation();
+    const { token } = useAuth();
+    // Processos novos/alterados anunciados pelo servidor (SSE) desde a última carga
+    const [pendingUpdates, setPendingUpdates] = useState(0);
+    // Contagens por faixa/status mantidas pelo backend (não dependem da página carregada)
+    const [summary, setSummary] = useState(null);
 
-    const fetchAllData = useCallback(async () => {
-        setLoading(true);
-        setError(null);
+    // A página volta para 0 sempre que a busca, a aba, a ordenação ou o tamanho da página mudam.
+    const filtersKey = JSON.stringify([debouncedSearchTerm, activeTab, sortConfig, rowsPerPage]);
+    const [pageState, setPageState] = useState({ key: filtersKey, page: 0 });
+    const page = pageState.key === filtersKey ? pageState.page : 0;
+    // cursors.list[n] é o valor de `after` para buscar a página n (a página 0 não tem cursor)
+    const cursorsRef = useRef({ key: filtersKey, list: [null] });
+    const lastRequestRef = useRef(0);
+
+    const fetchFolders = useCallback(async () => {
         try {
-        // Para a filtragem no frontend, precisamos de todos os dados.
-        // A paginação será feita no frontend.
-        const processosPromise = axios.get(`http://127.0.0.1:8000/processos/?limit=10000`);
-        const foldersPromise = axios.get(`http://127.0.0.1:8000/folders/`);
-        
-        const [processosResponse, foldersResponse] = await Promise.all([processosPromise, foldersPromise]);
-        
-        setAllProcessos(processosResponse.data.data);
+        const foldersResponse = await axios.get(`http://127.0.0.1:8000/folders/`);
         setFolders(foldersResponse.data);
         } catch (err) {
-        setError('Falha ao buscar os dados iniciais.');
-        } finally {
-        setLoading(false);
+        setError('Falha ao buscar as pastas.');
         }
     }, []);
 
-    useEffect(() => {
-        fetchAllData();
-    }, [fetchAllData, location]);
-
-    const parseValorCausa = (valor) => {
-        if (typeof valor !== 'string') return 0;
-        const cleanedValue = valor.replace(/R\$\s?/, '').replace(/\./g, '').replace(',', '.');
-        const numberValue = parseFloat(cleanedValue);
-        return isNaN(numberValue) ? 0 : numberValue;
-    };
-
-    const filteredAndSortedProcessos = useMemo(() => {
-        let filtered = allProcessos.filter(p => {
-            const valor = parseValorCausa(p.valor_causa);
-            switch (activeTab) {
-                case 1: return valor >= 100000 && valor < 300000;
-                case 2: return valor >= 300000 && valor < 500000;
-                case 3: return valor >= 500000;
-                default: return true;
-            }
-        });
+    const fetchSummary = useCallback(async () => {
+        try {
+        const response = await axios.get(`http://127.0.0.1:8000/processos/summary`);
+        setSummary(response.data);
+        } catch (err) {
+        // Sem o resumo as abas só ficam sem as contagens
+        setSummary(null);
+        }
+    }, []);
 
-        if (debouncedSearchTerm) {
-            filtered = filtered.filter(p =>
-                p.nome_reu.toLowerCase().includes(debouncedSearchTerm.toLowerCase()) ||
-                p.numero_processo.toLowerCase().includes(debouncedSearchTerm.toLowerCase())
-            );
+    // Busca apenas a página visível. Filtro, ordenação e paginação (por cursor) ficam no servidor.
+    const fetchProcessos = useCallback(async () => {
+        if (cursorsRef.current.key !== filtersKey) {
+        cursorsRef.current = { key: filtersKey, list: [null] };
         }
+        const requestId = ++lastRequestRef.current;
+        setError(null);
+        try {
+        const params = {
+            limit: rowsPerPage,
+            order_by: sortConfig.key,
+            order: sortConfig.direction,
+            count: 'cached',
+            ...FAIXAS_VALOR[activeTab],
+        };
+        if (debouncedSearchTerm) params.search = debouncedSearchTerm;
+        if (cursorsRef.current.list[page]) params.after = cursorsRef.current.list[page];
 
-        if (sortConfig.key !== null) {
-        filtered.sort((a, b) => {
-            const aValue = sortConfig.key === 'valor_causa' ? parseValorCausa(a[sortConfig.key]) : a[sortConfig.key];
-            const bValue = sortConfig.key === 'valor_causa' ? parseValorCausa(b[sortConfig.key]) : b[sortConfig.key];
-            
-            if (aValue < bValue) {
-            return sortConfig.direction === 'asc' ? -1 : 1;
-            }
-            if (aValue > bValue) {
-            return sortConfig.direction === 'asc' ? 1 : -1;
-            }
-            return 0;
-        });
+        const response = await axios.get(`http://127.0.0.1:8000/processos/`, { params });
+        // Ignora respostas de buscas antigas que chegaram depois da mais recente
+        if (requestId !== lastRequestRef.current) return;
+        setProcessos(response.data.data);
+        setTotalCount(response.data.total_count);
+        if (response.data.next_cursor) {
+            cursorsRef.current.list[page + 1] = response.data.next_cursor;
         }
-        
-        return filtered;
-    }, [allProcessos, activeTab, debouncedSearchTerm, sortConfig]);
-    
-    // Efeito para resetar a página quando a busca ou o filtro de aba mudam
+        } catch (err) {
+        if (requestId === lastRequestRef.current) setError('Falha ao buscar os processos.');
+        } finally {
+        if (requestId === lastRequestRef.current) setLoading(false);
+        }
+    }, [filtersKey, page, rowsPerPage, sortConfig, activeTab, debouncedSearchTerm]);
+
+    useEffect(() => {
+        fetchFolders();
+    }, [fetchFolders, location]);
+
     useEffect(() => {
-        setPage(0);
-    }, [debouncedSearchTerm, activeTab]);
+        fetchProcessos();
+    }, [fetchProcessos, location]);
 
+    useEffect(() => {
+        fetchSummary();
+    }, [fetchSummary, location]);
+
+    // Eventos em tempo real: mudanças de status entram direto na página visível;
+    // processos novos só são anunciados, e o usuário decide quando recarregar.
+    // A URL do stream leva um token curto, só de stream (pedido a cada conexão); o token
+    // de acesso nunca vai na URL. Como o token expira, a reconexão é feita aqui, com um token
+    // novo, e não pela reconexão automática do EventSource (que repetiria a URL antiga).
+    useEffect(() => {
+        if (!token) return undefined;
+        let source = null;
+        let reconexao = null;
+        let ativo = true;
+        const contarPendentes = (e) => setPendingUpdates((n) => n + (JSON.parse(e.data).ids || [null]).length);
+        const conectar = async () => {
+            try {
+                const { data } = await axios.post('http://127.0.0.1:8000/processos/stream/token');
+                if (!ativo) return;
+                source = new EventSource(`http://127.0.0.1:8000/processos/stream?token=${encodeURIComponent(data.token)}`);
+            } catch (error) {
+                if (ativo) reconexao = setTimeout(conectar, 5000);
+                return;
+            }
+            source.addEventListener('processos_created', contarPendentes);
+            source.addEventListener('processos_updated', contarPendentes);
+            source.addEventListener('resync', contarPendentes);
+            source.addEventListener('processos_status', (e) => {
+                const { status, ids } = JSON.parse(e.data);
+                const alterados = new Set(ids);
+                setProcessos((atuais) => atuais.map(p => alterados.has(p.id) ? { ...p, status } : p));
+            });
+            source.onerror = () => {
+                source.close();
+                if (ativo) reconexao = setTimeout(conectar, 3000);
+            };
+        };
+        conectar();
+        return () => {
+            ativo = false;
+            clearTimeout(reconexao);
+            if (source) source.close();
+        };
+    }, [token]);
+
+    const handleReloadPending = () => {
+        setPendingUpdates(0);
+        cursorsRef.current = { key: filtersKey, list: [null] };
+        setPageState({ key: filtersKey, page: 0 });
+        fetchProcessos();
+        fetchSummary();
+    };
 
     const handleTabChange = (event, newValue) => {
         setActiveTab(newValue);
     };
 
     const handleStatusChange = async (processoId, novoStatus) => {
-        setAllProcessos(allProcessos.map(p => 
+        setProcessos(processos.map(p => 
         p.id === processoId ? { ...p, status: novoStatus } : p
         ));
         try {
@@ -123,6 +193,20 @@ import HelpIcon from '@mui/icons-material/Help';
         }
     };
     
+    // Aprova/rejeita todos os selecionados numa única chamada
+    const handleBulkStatusChange = async (novoStatus) => {
+        try {
+        const changes = selected.map(id => ({ id, status: novoStatus }));
+        const response = await axios.patch('http://127.0.0.1:8000/processos/status', { changes });
+        const changedIds = new Set(response.data.changed_ids);
+        setProcessos(processos.map(p => changedIds.has(p.id) ? { ...p, status: novoStatus } : p));
+        setSnackbarInfo({ open: true, message: `${response.data.updated} processo(s) atualizado(s).` });
+        setSelected([]);
+        } catch (err) {
+        setSnackbarInfo({ open: true, message: 'Erro ao atualizar o status dos processos.' });
+        }
+    };
+
     const handleSortRequest = (key) => {
         let direction = 'asc';
         if (sortConfig.key === key && sortConfig.direction === 'asc') {
@@ -132,18 +216,17 @@ import HelpIcon from '@mui/icons-material/Help';
     };
 
     const handleChangePage = (event, newPage) => {
-        setPage(newPage);
+        setPageState({ key: filtersKey, page: newPage });
     };
 
     const handleChangeRowsPerPage = (event) => {
         setRowsPerPage(parseInt(event.target.value, 10));
-        setPage(0);
     };
 
     // Funções de seleção (handleClick, isSelected, handleSelectAllClick)...
     const handleSelectAllClick = (event) => {
         if (event.target.checked) {
-        const newSelecteds = filteredAndSortedProcessos.slice(page * rowsPerPage, page * rowsPerPage + rowsPerPage).map((n) => n.id);
+        const newSelecteds = processos.map((n) => n.id);
         setSelected(newSelecteds);
         return;
         }
@@ -167,8 +250,12 @@ import HelpIcon from '@mui/icons-material/Help';
     const handleCloseDialog = () => setDialogOpen(false);
     const handleAssignToFolder = async (folderId) => {
         try {
-        await axios.post(`http://127.0.0.1:8000/folders/${folderId}/add_processos/`, { processo_ids: selected });
-        setSnackbarInfo({ open: true, message: 'Processos adicionados à pasta com sucesso!' });
+        const response = await axios.post(`http://127.0.0.1:8000/folders/${folderId}/add_processos/`, { processo_ids: selected });
+        const { added, already_present, missing_ids } = response.data;
+        let message = `${added} processo(s) adicionado(s) à pasta.`;
+        if (already_present > 0) message += ` ${already_present} já estava(m) na pasta.`;
+        if (missing_ids.length > 0) message += ` ${missing_ids.length} não encontrado(s).`;
+        setSnackbarInfo({ open: true, message });
         setSelected([]);
         handleCloseDialog();
         } catch (err) {
@@ -182,7 +269,7 @@ import HelpIcon from '@mui/icons-material/Help';
     if (loading) { return ( <Box sx={{ display: 'flex', justifyContent: 'center', alignItems: 'center', height: '100vh' }}><CircularProgress /> <Typography variant="h6" sx={{ marginLeft: 2 }}>Carregando...</Typography></Box> ); }
     if (error) { return ( <Container sx={{ marginTop: 4 }}><Alert severity="error">{error}</Alert></Container> ); }
 
-    const paginatedProcessos = filteredAndSortedProcessos.slice(page * rowsPerPage, page * rowsPerPage + rowsPerPage);
+    const paginatedProcessos = processos;
     const numSelected = selected.length;
 
     return (
@@ -191,12 +278,17 @@ import HelpIcon from '@mui/icons-material/Help';
         <Paper sx={{ width: '100%', mb: 2 }}>
             <Box sx={{ borderBottom: 1, borderColor: 'divider' }}>
             <Tabs value={activeTab} onChange={handleTabChange} aria-label="Abas de valor dos processos">
-                <Tab label={`Todos (${filteredAndSortedProcessos.length})`} />
-                <Tab label="R$ 100k - 300k" />
-                <Tab label="R$ 300k - 500k" />
-                <Tab label="Acima de 500k" />
+                {ABAS.map((aba) => {
+                const contagem = summary ? (aba.faixa ? summary.by_band[aba.faixa] ?? 0 : summary.total) : null;
+                return <Tab key={aba.label} label={contagem === null ? aba.label : `${aba.label} (${contagem})`} />;
+                })}
             </Tabs>
             </Box>
+            {pendingUpdates > 0 && (
+            <Alert severity="info" sx={{ m: 2, mb: 0 }} action={<Button color="inherit" size="small" onClick={handleReloadPending}>Atualizar</Button>}>
+                {pendingUpdates} processo(s) novo(s) ou atualizado(s) desde a última carga.
+            </Alert>
+            )}
             <Box sx={{ p: 2 }}>
             <TextField
                 label="Buscar por Nome do Réu ou Número do Processo na aba atual..."
@@ -209,6 +301,8 @@ import HelpIcon from '@mui/icons-material/Help';
             {numSelected > 0 && (
             <Toolbar sx={{ pl: { sm: 2 }, pr: { xs: 1, sm: 1 }, bgcolor: (theme) => alpha(theme.palette.primary.main, theme.palette.action.activatedOpacity) }}>
                 <Typography sx={{ flex: '1 1 100%' }} color="inherit" variant="subtitle1" component="div">{numSelected} selecionado(s)</Typography>
+                <Tooltip title="Aprovar Selecionados"><IconButton onClick={() => handleBulkStatusChange('APROVADO')}><CheckCircleIcon /></IconButton></Tooltip>
+                <Tooltip title="Rejeitar Selecionados"><IconButton onClick={() => handleBulkStatusChange('REJEITADO')}><CancelIcon /></IconButton></Tooltip>
                 <Tooltip title="Adicionar à Pasta"><IconButton onClick={handleOpenDialog}><AddTaskIcon /></IconButton></Tooltip>
             </Toolbar>
             )}
@@ -275,7 +369,7 @@ import HelpIcon from '@mui/icons-material/Help';
             <TablePagination
             rowsPerPageOptions={[10, 25, 50, 100]}
             component="div"
-            count={filteredAndSortedProcessos.length}
+            count={totalCount ?? -1}
             rowsPerPage={rowsPerPage}
             page={page}
             onPageChange={handleChangePage}
@@ -0,0 +1,259 @@
+# Arquivo: robot/api_client.py
+# Descrição: Cliente assíncrono da API do backend para o robô.
+#   - Cada processo extraído vai primeiro para uma "caixa de saída" em disco (SQLite local);
+#     só sai de lá depois que a API confirmar o recebimento. Se o robô cair, o que ficou
+#     pendente é reenviado na próxima execução.
+#   - Um envio em segundo plano junta os pendentes em lotes para POST /processos/bulk,
+#     usando um único httpx.AsyncClient (conexões keep-alive reaproveitadas).
+#   - Falhas de rede, 429 e 5xx são repetidas com backoff exponencial (com jitter), sem
+#     travar o scraping: o scraper só grava na caixa de saída e segue navegando.
+#   - POST /processos/bulk e POST /processos/exists (checagem prévia de uma página de resultados)
+#     exigem login: o robô entra com ROBOT_API_USER / ROBOT_API_PASSWORD (um usuário comum da API)
+#     e entra de novo quando o token expira (401), sem perder o lote.
+#   - O SQLite da caixa de saída é usado numa thread própria (uma só, então os comandos
+#     nunca se cruzam): o INSERT + commit de cada processo não para o event loop.
+
+import asyncio
+import json
+import os
+import random
+import sqlite3
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import httpx
+
+API_BASE_URL = os.getenv("API_BASE_URL", "http://127.0.0.1:8000")
+OUTBOX_PATH = os.getenv("ROBOT_OUTBOX_PATH", os.path.join(os.path.dirname(__file__), "outbox.sqlite3"))
+# Um lote sai quando junta BATCH_SIZE processos ou depois de BATCH_MAX_WAIT segundos
+BATCH_SIZE = int(os.getenv("ROBOT_BATCH_SIZE", "50"))
+BATCH_MAX_WAIT = float(os.getenv("ROBOT_BATCH_MAX_WAIT", "2"))
+RETRY_BASE_DELAY = float(os.getenv("ROBOT_RETRY_BASE_DELAY", "1"))
+RETRY_MAX_DELAY = float(os.getenv("ROBOT_RETRY_MAX_DELAY", "60"))
+# Tempo máximo para esvaziar a caixa de saída ao encerrar; o que sobrar fica para a próxima execução
+CLOSE_TIMEOUT = float(os.getenv("ROBOT_CLOSE_TIMEOUT", "30"))
+
+
+class Outbox:
+    """Fila durável de processos a enviar (um por numero_processo)."""
+
+    def __init__(self, path=OUTBOX_PATH):
+        self._conn = sqlite3.connect(path)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS outbox ("
+            " id INTEGER PRIMARY KEY AUTOINCREMENT,"
+            " numero_processo TEXT NOT NULL UNIQUE,"
+            " payload TEXT NOT NULL,"
+            " created_at REAL NOT NULL)"
+        )
+        # Itens que a API recusou (erro de validação): guardados para análise, nunca reenviados
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS outbox_rejected ("
+            " numero_processo TEXT NOT NULL,"
+            " payload TEXT NOT NULL,"
+            " detail TEXT,"
+            " rejected_at REAL NOT NULL)"
+        )
+        self._conn.commit()
+
+    def add(self, payload):
+        """Grava o processo; devolve 1 se ele entrou na fila, 0 se só substituiu um pendente."""
+        numero, dados = payload["numero_processo"], json.dumps(payload, ensure_ascii=False)
+        novo = self._conn.execute(
+            "INSERT OR IGNORE INTO outbox (numero_processo, payload, created_at) VALUES (?, ?, ?)",
+            (numero, dados, time.time()),
+        ).rowcount
+        if not novo:
+            # O mesmo processo enviado de novo substitui o payload pendente
+            self._conn.execute("UPDATE outbox SET payload = ? WHERE numero_processo = ?", (dados, numero))
+        self._conn.commit()
+        return novo
+
+    def pending(self, limit):
+        linhas = self._conn.execute("SELECT id, payload FROM outbox ORDER BY id LIMIT ?", (limit,)).fetchall()
+        return [(outbox_id, json.loads(payload)) for outbox_id, payload in linhas]
+
+    def remove(self, ids):
+        removidos = self._conn.executemany("DELETE FROM outbox WHERE id = ?", [(i,) for i in ids]).rowcount
+        self._conn.commit()
+        return removidos
+
+    def reject(self, itens):
+        """Move [(id, payload, detalhe)] para outbox_rejected."""
+        agora = time.time()
+        self._conn.executemany(
+            "INSERT INTO outbox_rejected (numero_processo, payload, detail, rejected_at) VALUES (?, ?, ?, ?)",
+            [(payload["numero_processo"], json.dumps(payload, ensure_ascii=False), detalhe, agora) for _, payload, detalhe in itens],
+        )
+        removidos = self._conn.executemany("DELETE FROM outbox WHERE id = ?", [(i,) for i, _, _ in itens]).rowcount
+        self._conn.commit()
+        return removidos
+
+    def __len__(self):
+        return self._conn.execute("SELECT COUNT(*) FROM outbox").fetchone()[0]
+
+    def close(self):
+        self._conn.close()
+
+
+class ApiClient:
+    """Uso: async with ApiClient(on_result=...) as api: await api.submit(payload)
+
+    on_result(payload, status) é chamado para cada processo confirmado pela API, com o
+    status do item em /processos/bulk ("created", "existing" ou "error").
+    """
+
+    def __init__(self, on_result=None, base_url=API_BASE_URL, outbox_path=OUTBOX_PATH,
+                 api_user=None, api_password=None):
+        self._on_result = on_result
+        self._base_url = base_url
+        # Lidas aqui (e não no import) para valerem as variáveis carregadas do .env pelo scraper
+        api_user = api_user or os.getenv("ROBOT_API_USER")
+        api_password = api_password or os.getenv("ROBOT_API_PASSWORD")
+        self._credenciais = (api_user, api_password) if api_user and api_password else None
+        self._token = None
+        self._outbox_path = outbox_path
+        # Toda operação da caixa de saída roda nesta thread (a conexão SQLite nasce nela)
+        self._disco = ThreadPoolExecutor(max_workers=1, thread_name_prefix="outbox")
+        self._outbox = None
+        # Processos na caixa de saída, contados em memória (sem COUNT(*) a cada submit)
+        self._pendentes = 0
+        self._acordar = asyncio.Event()
+        self._encerrando = False
+        self._http = None
+        self._tarefa = None
+
+    async def __aenter__(self):
+        if not self._credenciais:
+            raise RuntimeError("ROBOT_API_USER/ROBOT_API_PASSWORD ausentes: a API exige login para receber processos.")
+        self._http = httpx.AsyncClient(
+            base_url=self._base_url,
+            timeout=httpx.Timeout(30, connect=5),
+            limits=httpx.Limits(max_connections=4, max_keepalive_connections=4),
+        )
+        self._outbox = await self._no_disco(Outbox, self._outbox_path)
+        self._pendentes = await self._no_disco(len, self._outbox)
+        if self._pendentes:
+            print(f"  [API] {self._pendentes} processo(s) pendentes da execução anterior serão reenviados.")
+            self._acordar.set()
+        self._tarefa = asyncio.create_task(self._enviar_em_segundo_plano())
+        return self
+
+    async def __aexit__(self, *exc_info):
+        self._encerrando = True
+        self._acordar.set()
+        try:
+            await asyncio.wait_for(self._tarefa, CLOSE_TIMEOUT)
+        except asyncio.TimeoutError:
+            pass
+        if self._pendentes:
+            print(f"  [API] {self._pendentes} processo(s) continuam na caixa de saída e serão enviados na próxima execução.")
+        await self._http.aclose()
+        await self._no_disco(self._outbox.close)
+        self._disco.shutdown(wait=True)
+
+    async def _no_disco(self, funcao, *args):
+        return await asyncio.get_running_loop().run_in_executor(self._disco, funcao, *args)
+
+    async def submit(self, payload):
+        """Grava o processo na caixa de saída (durável) e retorna; o envio acontece em segundo plano."""
+        # O await vem antes da soma: o envio em segundo plano também mexe no contador
+        novo = await self._no_disco(self._outbox.add, payload)
+        self._pendentes += novo
+        if self._pendentes >= BATCH_SIZE:
+            self._acordar.set()
+
+    async def _entrar(self):
+        usuario, senha = self._credenciais
+        response = await self._http.post("/token", data={"username": usuario, "password": senha}, timeout=10)
+        response.raise_for_status()
+        self._token = response.json()["access_token"]
+
+    async def _post_autenticado(self, url, **kwargs):
+        """POST com o token do robô; se o token expirou (401), entra de novo e repete uma vez."""
+        for tentativa in range(2):
+            if self._token is None:
+                await self._entrar()
+            response = await self._http.post(url, headers={"Authorization": f"Bearer {self._token}"}, **kwargs)
+            if response.status_code != 401 or tentativa == 1:
+                return response
+            self._token = None
+
+    async def existing(self, numeros):
+        """Quais destes números a API já tem (uma consulta); None se a API não respondeu."""
+        try:
+            response = await self._post_autenticado("/processos/exists", json={"numeros": list(numeros)}, timeout=10)
+            response.raise_for_status()
+            return set(response.json()["existing"])
+        except (httpx.HTTPError, KeyError, ValueError) as e:
+            print(f"  [API] [AVISO] Consulta de processos existentes falhou ({type(e).__name__}: {e}).")
+            return None
+
+    async def _enviar_em_segundo_plano(self):
+        while True:
+            if not self._encerrando:
+                try:
+                    await asyncio.wait_for(self._acordar.wait(), BATCH_MAX_WAIT)
+                except asyncio.TimeoutError:
+                    pass
+            self._acordar.clear()
+
+            try:
+                while True:
+                    lote = await self._no_disco(self._outbox.pending, BATCH_SIZE)
+                    if not lote:
+                        break
+                    if not await self._enviar_lote(lote):
+                        return
+            except Exception as e:
+                # Erro inesperado (ex.: resposta fora do formato): os itens continuam no disco
+                print(f"  [API] [ERRO] Falha no envio em segundo plano: {e}")
+                if not self._encerrando:
+                    await asyncio.sleep(RETRY_MAX_DELAY)
+            if self._encerrando:
+                return
+
+    async def _enviar_lote(self, lote):
+        """Envia um lote até a API responder. False se o robô estiver encerrando com a API fora do ar."""
+        tentativa = 0
+        while True:
+            try:
+                response = await self._post_autenticado("/processos/bulk", json=[payload for _, payload in lote])
+            except httpx.HTTPError as e:
+                erro = f"{type(e).__name__}: {e}"
+            else:
+                if response.status_code == 200:
+                    await self._aplicar_resultados(lote, response.json()["results"])
+                    return True
+                if response.status_code not in (401, 403, 429) and response.status_code < 500:
+                    # Recusa do lote inteiro (ex.: corpo inválido): repetir não adianta
+                    print(f"    -> ERRO API: {response.status_code} - {response.text}")
+                    recusados = await self._no_disco(self._outbox.reject, [(i, payload, response.text) for i, payload in lote])
+                    self._pendentes -= recusados
+                    return True
+                erro = f"HTTP {response.status_code}"
+
+            if self._encerrando:
+                print(f"    -> ERRO CONEXÃO API ({erro}). Os processos ficam na caixa de saída.")
+                return False
+            # Backoff exponencial com jitter, para várias instâncias não voltarem todas juntas
+            espera = min(RETRY_MAX_DELAY, RETRY_BASE_DELAY * 2 ** tentativa) * random.uniform(0.5, 1)
+            print(f"    -> ERRO CONEXÃO API ({erro}). Nova tentativa em {espera:.1f}s ({len(lote)} processo(s) guardados).")
+            await asyncio.sleep(espera)
+            tentativa += 1
+
+    async def _aplicar_resultados(self, lote, resultados):
+        confirmados, recusados = [], []
+        for (outbox_id, payload), resultado in zip(lote, resultados):
+            if resultado["status"] == "error":
+                print(f"    -> ERRO API no processo {payload['numero_processo']}: {resultado.get('detail')}")
+                recusados.append((outbox_id, payload, resultado.get("detail")))
+            else:
+                confirmados.append(outbox_id)
+            if self._on_result:
+                self._on_result(payload, resultado["status"])
+        removidos = await self._no_disco(self._outbox.remove, confirmados)
+        if recusados:
+            removidos += await self._no_disco(self._outbox.reject, recusados)
+        self._pendentes -= removidos
@@ -0,0 +1,188 @@
+# Arquivo: robot/crawl_state.py
+# Descrição: Estado da varredura em disco (SQLite local), para o robô retomar de onde parou.
+#   - oabs: a última página de resultados já percorrida de cada OAB e se ela terminou.
+#     Uma OAB terminada só é percorrida de novo depois de CRAWL_RECRAWL_AFTER horas.
+#   - processos: cada processo encontrado e o que aconteceu com ele. Os que ficaram na
+#     fila (ou falharam) quando o robô parou voltam para a fila na próxima execução.
+#     Os que esgotaram as tentativas ficam de fora até CRAWL_RECRAWL_AFTER horas depois
+#     da última falha; aí, se aparecerem numa nova varredura, são registrados de novo.
+#   - O SQLite é usado numa thread própria (uma só, como a caixa de saída do api_client):
+#     o commit de cada processo e página não para o event loop dos workers.
+#   Para recomeçar do zero, apague o arquivo (CRAWL_STATE_PATH).
+
+import asyncio
+import os
+import sqlite3
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+CRAWL_STATE_PATH = os.getenv("CRAWL_STATE_PATH", os.path.join(os.path.dirname(__file__), "crawl_state.sqlite3"))
+CRAWL_RECRAWL_AFTER = float(os.getenv("CRAWL_RECRAWL_AFTER", "24")) * 3600
+# Tentativas por processo (timeouts, erro na pasta digital) antes de desistir dele
+CRAWL_MAX_ATTEMPTS = int(os.getenv("CRAWL_MAX_ATTEMPTS", "3"))
+
+# Status de um processo
+QUEUED = "queued"        # na fila de detalhes (ou esperando a leitura do PDF)
+DONE = "done"            # enviado para a caixa de saída da API, ou ignorado pelas regras
+EXISTING = "existing"    # a API já tinha o processo: a pasta digital nem foi aberta
+FAILED = "failed"        # falhou; volta para a fila até CRAWL_MAX_ATTEMPTS tentativas
+
+
+class CrawlStateDb:
+    """Frontier durável da varredura (síncrono). Use pelo CrawlState, que o roda na thread própria."""
+
+    def __init__(self, path=CRAWL_STATE_PATH):
+        self._conn = sqlite3.connect(path)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS oabs ("
+            " oab TEXT PRIMARY KEY,"
+            " last_page INTEGER NOT NULL DEFAULT 0,"
+            " finished_at REAL,"
+            " updated_at REAL NOT NULL)"
+        )
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS processos ("
+            " numero_processo TEXT PRIMARY KEY,"
+            " oab TEXT NOT NULL,"
+            " label TEXT NOT NULL,"
+            " detail_url TEXT NOT NULL,"
+            " status TEXT NOT NULL,"
+            " attempts INTEGER NOT NULL DEFAULT 0,"
+            " updated_at REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS ix_processos_status ON processos (status)")
+        self._conn.commit()
+
+    # --- OABs ---
+    def start_oab(self, oab):
+        """Última página já percorrida da OAB (0 = do início), ou None se ela terminou há pouco."""
+        linha = self._conn.execute("SELECT last_page, finished_at FROM oabs WHERE oab = ?", (oab,)).fetchone()
+        if linha is None:
+            return 0
+        last_page, finished_at = linha
+        if finished_at is None:
+            return last_page
+        if time.time() - finished_at < CRAWL_RECRAWL_AFTER:
+            return None
+        # Terminada há tempo suficiente: nova varredura desde a primeira página
+        self._conn.execute("UPDATE oabs SET last_page = 0, finished_at = NULL, updated_at = ? WHERE oab = ?", (time.time(), oab))
+        self._conn.commit()
+        return 0
+
+    def page_done(self, oab, page_number):
+        self._conn.execute(
+            "INSERT INTO oabs (oab, last_page, updated_at) VALUES (?, ?, ?) "
+            "ON CONFLICT(oab) DO UPDATE SET last_page = excluded.last_page, updated_at = excluded.updated_at",
+            (oab, page_number, time.time()),
+        )
+        self._conn.commit()
+
+    def oab_done(self, oab):
+        agora = time.time()
+        self._conn.execute(
+            "INSERT INTO oabs (oab, finished_at, updated_at) VALUES (?, ?, ?) "
+            "ON CONFLICT(oab) DO UPDATE SET finished_at = excluded.finished_at, updated_at = excluded.updated_at",
+            (oab, agora, agora),
+        )
+        self._conn.commit()
+
+    # --- Processos ---
+    # Falhou CRAWL_MAX_ATTEMPTS vezes e a última foi há mais de CRAWL_RECRAWL_AFTER: pode ser registrado de novo
+    _DESISTENCIA_VENCIDA = "status = ? AND attempts >= ? AND updated_at < ?"
+
+    def _params_desistencia(self):
+        return (FAILED, CRAWL_MAX_ATTEMPTS, time.time() - CRAWL_RECRAWL_AFTER)
+
+    def known(self, numeros):
+        """Quais destes números já foram registrados (menos as desistências vencidas)."""
+        if not numeros:
+            return set()
+        marcadores = ",".join("?" * len(numeros))
+        linhas = self._conn.execute(
+            f"SELECT numero_processo FROM processos WHERE numero_processo IN ({marcadores}) "
+            f"AND NOT ({self._DESISTENCIA_VENCIDA})",
+            (*numeros, *self._params_desistencia()),
+        )
+        return {numero for numero, in linhas}
+
+    def claim(self, numero, oab, label, detail_url, status=QUEUED):
+        """Registra o processo; False se ele já estava registrado (outro worker, página ou execução).
+
+        Uma desistência vencida é registrada de novo, com as tentativas zeradas.
+        """
+        cursor = self._conn.execute(
+            "INSERT INTO processos (numero_processo, oab, label, detail_url, status, updated_at) "
+            "VALUES (?, ?, ?, ?, ?, ?) "
+            "ON CONFLICT(numero_processo) DO UPDATE SET oab = excluded.oab, label = excluded.label, "
+            "detail_url = excluded.detail_url, status = excluded.status, attempts = 0, updated_at = excluded.updated_at "
+            f"WHERE {self._DESISTENCIA_VENCIDA}",
+            (numero, oab, label, detail_url, status, time.time(), *self._params_desistencia()),
+        )
+        self._conn.commit()
+        return cursor.rowcount == 1
+
+    def mark(self, numero, status):
+        tentativa = 1 if status == FAILED else 0
+        self._conn.execute(
+            "UPDATE processos SET status = ?, attempts = attempts + ?, updated_at = ? WHERE numero_processo = ?",
+            (status, tentativa, time.time(), numero),
+        )
+        self._conn.commit()
+
+    def pending(self):
+        """Processos a retomar: [(numero, label, detail_url)] na ordem em que foram encontrados."""
+        return self._conn.execute(
+            "SELECT numero_processo, label, detail_url FROM processos "
+            "WHERE status = ? OR (status = ? AND attempts < ?) ORDER BY rowid",
+            (QUEUED, FAILED, CRAWL_MAX_ATTEMPTS),
+        ).fetchall()
+
+    def close(self):
+        self._conn.close()
+
+
+class CrawlState:
+    """Uso: async with CrawlState() as state: await state.claim(...)
+
+    Mesmos métodos do CrawlStateDb, aguardáveis. Cada comando roda na thread do estado, em
+    ordem: um claim continua atômico mesmo com vários workers chamando ao mesmo tempo.
+    """
+
+    def __init__(self, path=CRAWL_STATE_PATH):
+        self._path = path
+        # A conexão SQLite nasce nesta thread e só é usada nela
+        self._disco = ThreadPoolExecutor(max_workers=1, thread_name_prefix="crawl_state")
+        self._db = None
+
+    async def __aenter__(self):
+        self._db = await self._no_disco(CrawlStateDb, self._path)
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self._no_disco(self._db.close)
+        self._disco.shutdown(wait=True)
+
+    async def _no_disco(self, funcao, *args):
+        return await asyncio.get_running_loop().run_in_executor(self._disco, funcao, *args)
+
+    async def start_oab(self, oab):
+        return await self._no_disco(self._db.start_oab, oab)
+
+    async def page_done(self, oab, page_number):
+        await self._no_disco(self._db.page_done, oab, page_number)
+
+    async def oab_done(self, oab):
+        await self._no_disco(self._db.oab_done, oab)
+
+    async def known(self, numeros):
+        return await self._no_disco(self._db.known, numeros)
+
+    async def claim(self, numero, oab, label, detail_url, status=QUEUED):
+        return await self._no_disco(self._db.claim, numero, oab, label, detail_url, status)
+
+    async def mark(self, numero, status):
+        await self._no_disco(self._db.mark, numero, status)
+
+    async def pending(self):
+        return await self._no_disco(self._db.pending)
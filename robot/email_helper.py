@@ -1,59 +1,105 @@
 # Arquivo: robot/email_helper.py
 
+import asyncio
+import os
 import re
-import time
-from imap_tools import MailBox, A
+from datetime import datetime, timedelta, timezone
+from imap_tools import MailBox, MailBoxUnencrypted, A
 
-IMAP_SERVER = "imap.gmail.com"
+# Servidor configurável para testar contra um IMAP local (ex.: IMAP_HOST=localhost IMAP_PORT=1143 IMAP_SSL=false)
+IMAP_SERVER = os.getenv("IMAP_HOST", "imap.gmail.com")
+IMAP_PORT = int(os.getenv("IMAP_PORT", "993"))
+IMAP_SSL = os.getenv("IMAP_SSL", "true").lower() not in ("0", "false", "no")
 
-def fetch_verification_code(email_user, email_password, retries=6, delay=8):
+VERIFICATION_SUBJECT = "portal e-saj - validação de login"
+# Tempo máximo esperando o e-mail com o código
+CODE_TIMEOUT = float(os.getenv("VERIFICATION_CODE_TIMEOUT", "90"))
+# Tolerância para a diferença de relógio entre o robô e o servidor que envia o e-mail
+CLOCK_SKEW = timedelta(seconds=float(os.getenv("IMAP_CLOCK_SKEW", "30")))
+# Servidor sem IDLE: consultas com intervalos crescentes (em segundos); o último se repete
+POLL_INTERVALS = (1, 1, 2, 2, 3, 5)
+# Cada IDLE dura no máximo isso; depois a caixa é consultada de novo (cobre e-mails que
+# chegaram entre a consulta e o início do IDLE, e servidores que derrubam IDLE longo)
+IDLE_TIMEOUT = 10
+
+def _conectar(email_user, email_password, host, port, use_ssl):
+    mailbox = MailBox(host, port) if use_ssl else MailBoxUnencrypted(host, port)
+    return mailbox.login(email_user, email_password, 'INBOX')
+
+def _desconectar(mailbox):
+    try:
+        mailbox.logout()
+    except Exception:
+        pass
+
+def _buscar_codigo(mailbox, since):
+    """Procura o código no e-mail de validação mais recente que chegou depois de `since`."""
+    limite = since - CLOCK_SKEW
+    # O SINCE do IMAP só compara o dia (no fuso do servidor): pedimos um dia a mais
+    # e filtramos o horário aqui, pelo cabeçalho Date
+    criteria = A(seen=False, date_gte=(limite - timedelta(days=1)).date())
+    for msg in mailbox.fetch(criteria, charset='UTF8', reverse=True, mark_seen=False):
+        if VERIFICATION_SUBJECT not in msg.subject.lower():
+            continue
+        data = msg.date if msg.date.tzinfo else msg.date.replace(tzinfo=timezone.utc)
+        if data < limite:
+            # Código de um login anterior: não serve para este
+            continue
+        print(f"  [E-MAIL CORRETO ENCONTRADO!]")
+        match = re.search(r'\b\d{6}\b', msg.text)
+        if match:
+            mailbox.flag([msg.uid], '\\Seen', True)
+            print(f"  E-mail marcado como lido.")
+            return match.group(0)
+        print("  [ERRO]: E-mail válido encontrado, mas não foi possível extrair o código.")
+    return None
+
+async def fetch_verification_code(email_user, email_password, since=None, timeout=CODE_TIMEOUT,
+                                  host=IMAP_SERVER, port=IMAP_PORT, use_ssl=IMAP_SSL):
     """
-    Conecta-se à caixa de e-mail do Gmail, busca pelo último e-mail não lido que contenha o
-    assunto correto e extrai o código de 6 dígitos.
+    Espera o e-mail "Portal e-SAJ - Validação de login" que chegou depois de `since`
+    (o momento do clique em "Entrar") e devolve o código de 6 dígitos, ou None se ele
+    não chegar em `timeout` segundos. Usa IMAP IDLE quando o servidor suporta; senão,
+    consultas curtas com intervalos crescentes. O IMAP (bloqueante) roda em threads,
+    então o event loop do robô não para enquanto o código não chega.
     """
-    print("\n--- FASE: BUSCANDO CÓDIGO DE VERIFICAÇÃO NO GMAIL ---")
-    
+    print("\n--- FASE: BUSCANDO CÓDIGO DE VERIFICAÇÃO NO E-MAIL ---")
+
     if not email_user or not email_password:
         print("Erro: Credenciais de e-mail não foram fornecidas para a função.")
         return None
 
-    # Espera inicial aumentada para dar tempo do e-mail chegar
-    print(f"Aguardando 20 segundos iniciais para o e-mail chegar...")
-    time.sleep(20)
-
-    for i in range(retries):
-        try:
-            with MailBox(IMAP_SERVER).login(email_user, email_password, 'INBOX') as mailbox:
-                print(f"Tentativa {i+1}/{retries}: Conectado a {email_user}. Procurando e-mails não lidos...")
-                
-                criteria = A(seen=False)
-                
-                for msg in mailbox.fetch(criteria, charset='UTF8', reverse=True):
-                    print(f"  -> Verificando e-mail com assunto: '{msg.subject}'")
-                    
-                    if "portal e-saj - validação de login" in msg.subject.lower():
-                        print(f"  [E-MAIL CORRETO ENCONTRADO!]")
-                        match = re.search(r'\b\d{6}\b', msg.text)
-                        
-                        if match:
-                            code = match.group(0)
-                            print(f"  [CÓDIGO DE 6 DÍGITOS ENCONTRADO]: {code}")
-                            
-                            # --- CORREÇÃO APLICADA AQUI ---
-                            # Usando o método .flag() que é mais compatível
-                            mailbox.flag([msg.uid], '\\Seen', True)
-                            print(f"  E-mail marcado como lido.")
-                            
-                            return code
-                        else:
-                            print("  [ERRO]: E-mail válido encontrado, mas não foi possível extrair o código.")
-                    
-        except Exception as e:
-            print(f"Ocorreu um erro ao tentar processar o e-mail: {e}")
-
-        if i < retries - 1:
-            print(f"Código não encontrado nesta tentativa. Aguardando {delay} segundos...")
-            time.sleep(delay)
-            
-    print("Não foi possível encontrar o código de verificação após várias tentativas.")
-    return None
\ No newline at end of file
+    since = since or datetime.now(timezone.utc)
+    loop = asyncio.get_running_loop()
+    prazo = loop.time() + timeout
+
+    try:
+        mailbox = await asyncio.to_thread(_conectar, email_user, email_password, host, port, use_ssl)
+    except Exception as e:
+        print(f"Ocorreu um erro ao conectar à caixa de e-mail: {e}")
+        return None
+
+    try:
+        usa_idle = "IDLE" in mailbox.client.capabilities
+        print(f"Conectado a {email_user} ({'IMAP IDLE' if usa_idle else 'consulta periódica'}). Aguardando o código...")
+        intervalos = iter(POLL_INTERVALS)
+        while True:
+            code = await asyncio.to_thread(_buscar_codigo, mailbox, since)
+            if code:
+                print(f"  [CÓDIGO DE 6 DÍGITOS ENCONTRADO]: {code}")
+                return code
+            restante = prazo - loop.time()
+            if restante <= 0:
+                break
+            if usa_idle:
+                # Volta assim que o servidor avisar de um e-mail novo (ou no fim do IDLE_TIMEOUT)
+                await asyncio.to_thread(mailbox.idle.wait, min(restante, IDLE_TIMEOUT))
+            else:
+                await asyncio.sleep(min(restante, next(intervalos, POLL_INTERVALS[-1])))
+    except Exception as e:
+        print(f"Ocorreu um erro ao tentar processar o e-mail: {e}")
+    finally:
+        await asyncio.to_thread(_desconectar, mailbox)
+
+    print("Não foi possível encontrar o código de verificação dentro do prazo.")
+    return None
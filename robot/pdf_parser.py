@@ -1,13 +1,39 @@
-# Arquivo: robot/pdf_parser.py (VERSÃO 5.2 - CORREÇÃO DE IMPORT CIRCULAR)
+# Arquivo: robot/pdf_parser.py (VERSÃO 6.1 - LEITURA EM MEMÓRIA)
+# Changelog v6.0: O texto é lido página a página e a busca pelo réu roda a cada página,
+#                 parando assim que nome + CPF/CNPJ válido aparecem (o bloco do réu quase
+#                 sempre está na primeira ou segunda página). No máximo PDF_MAX_PAGES páginas
+#                 são lidas. O OCR tenta primeiro uma resolução baixa e só sobe se não achar
+#                 o réu, e reconhece várias páginas em paralelo.
+# Changelog v6.1: Recebe o conteúdo do PDF em memória (fitz.open(stream=...)): nada é gravado
+#                 em disco. PARSER_VERSION entra na chave do cache de resultados do pdf_pipeline.
+# Changelog v6.2: A leitura só para cedo com a Estratégia 1 (alta confiança). Um resultado da
+#                 Estratégia 2 numa página não pode vencer a Estratégia 1 numa página seguinte,
+#                 então nesse caso as páginas restantes são lidas e vale o texto completo.
 import fitz  # PyMuPDF
 import re
 import os
+from concurrent.futures import ThreadPoolExecutor
 from PIL import Image
 import pytesseract
 
 # Configuração do Tesseract (ajuste o caminho se necessário)
 # pytesseract.pytesseract.tesseract_cmd = r'C:\Program Files\Tesseract-OCR\tesseract.exe'
 
+# Mude sempre que a extração mudar: resultados de versões anteriores saem do cache
+PARSER_VERSION = "6.2"
+# Valor devolvido quando a leitura falha (não vai para o cache: a falha pode ser passageira)
+PDF_READ_ERROR = "Erro na leitura do PDF"
+
+# Páginas lidas no máximo (texto e OCR)
+PDF_MAX_PAGES = int(os.getenv("PDF_MAX_PAGES", "5"))
+# Resoluções do OCR, em ordem: a próxima só é tentada se a anterior não achou o réu
+OCR_DPI_LADDER = tuple(int(d) for d in os.getenv("OCR_DPI_LADDER", "150,300").split(","))
+# Páginas reconhecidas ao mesmo tempo. Cada página é um processo do tesseract, então isto
+# multiplica os PDF_WORKERS do pdf_pipeline: o total de núcleos ocupados é o produto dos dois.
+OCR_THREADS = int(os.getenv("OCR_THREADS", "2"))
+# Um tesseract por página já ocupa um núcleo; sem isto cada um abriria várias threads OpenMP
+os.environ.setdefault("OMP_THREAD_LIMIT", "1")
+
 # --- FUNÇÕES AUXILIARES DE VALIDAÇÃO ---
 def _is_cpf_valid(cpf: str) -> bool:
     cpf = ''.join(re.findall(r'\d', cpf))
@@ -32,22 +58,39 @@ def _is_cnpj_valid(cnpj: str) -> bool:
     return True
 # --- FIM DAS FUNÇÕES AUXILIARES ---
 
-def _extract_text_with_ocr(pdf_path: str) -> str:
+def _ocr_page(img):
+    # Para melhores resultados, instale o Tesseract com o idioma 'por' (Português)
+    return pytesseract.image_to_string(img, lang='eng')
+
+def _extract_with_ocr(doc, page_count):
+    """OCR das primeiras páginas, com saída antecipada; devolve (nome, id, texto normalizado)."""
     print("  [INFO] PDF sem texto detectado. Acionando modo OCR...")
-    full_text = ""
-    try:
-        doc = fitz.open(pdf_path)
-        for i, page in enumerate(doc):
-            print(f"    -> Lendo imagem da página {i+1} com OCR...")
-            pix = page.get_pixmap(dpi=300); img = Image.frombytes("RGB", [pix.width, pix.height], pix.samples)
-            # Para melhores resultados, instale o Tesseract com o idioma 'por' (Português)
-            full_text += pytesseract.image_to_string(img, lang='eng') + "\n"
-        doc.close()
-        print("  [SUCESSO] Extração via OCR concluída.")
-        return full_text
-    except Exception as e:
-        print(f"  [ERRO] Falha no processo de OCR: {e}")
-        return ""
+    defendant_name, defendant_id, normalized_text = None, None, ""
+    with ThreadPoolExecutor(max_workers=OCR_THREADS) as pool:
+        for dpi in OCR_DPI_LADDER:
+            page_texts = []
+            # Lotes de OCR_THREADS páginas: o lote é reconhecido em paralelo e a busca
+            # roda entre um lote e outro, para parar cedo sem rasterizar o resto
+            for batch_start in range(0, page_count, OCR_THREADS):
+                batch = range(batch_start, min(batch_start + OCR_THREADS, page_count))
+                print(f"    -> Lendo imagem das páginas {batch.start + 1}-{batch.stop} com OCR ({dpi} dpi)...")
+                images = []
+                for i in batch:
+                    # A renderização usa o documento (não é thread-safe): fica nesta thread
+                    pix = doc[i].get_pixmap(dpi=dpi)
+                    images.append(Image.frombytes("RGB", [pix.width, pix.height], pix.samples))
+                page_texts.extend(pool.map(_ocr_page, images))
+                normalized_text = _normalize("\n".join(page_texts))
+                defendant_name, defendant_id, estrategia = _find_defendant(normalized_text)
+                if estrategia == 1:
+                    print(f"  [SUCESSO] Réu encontrado via OCR ({dpi} dpi, {batch.stop} página(s)).")
+                    return defendant_name, defendant_id, normalized_text
+            if defendant_name and defendant_id:
+                # Só a Estratégia 2, com todas as páginas lidas nesta resolução
+                print(f"  [SUCESSO] Réu encontrado via OCR ({dpi} dpi, {page_count} página(s)).")
+                return defendant_name, defendant_id, normalized_text
+            print(f"  [INFO] Réu não encontrado via OCR a {dpi} dpi.")
+    return defendant_name, defendant_id, normalized_text
 
 def clean_name(name):
     """Limpa o nome extraído, removendo qualificações e texto residual."""
@@ -55,67 +98,90 @@ def clean_name(name):
     name = re.sub(r",.*", "", name).strip() # Remove tudo após a primeira vírgula
     return name.upper()
 
-def extract_data_from_petition(pdf_path):
-    print(f"\n--- LENDO ARQUIVO PDF (ESTRATÉGIA V5.2 - DUAS PASSAGENS): {pdf_path} ---")
+def _normalize(text):
+    return " ".join(text.lower().split())
+
+def _find_defendant(normalized_text, verbose=False):
+    """Aplica as duas estratégias ao texto; devolve (nome, id, estratégia) com o que encontrar.
+
+    A estratégia é 1 quando a regex de alta confiança achou nome e documento válido
+    (resultado definitivo), 2 quando algo veio do bloco contextual e None se nada foi achado.
+    """
+    defendant_name = None
+    defendant_id = None
+
+    # --- PRIMEIRA TENTATIVA (ALTA CONFIANÇA): Regex Contextual Completa ---
+    if verbose: print("  [INFO] Tentando Estratégia 1: Regex de Alta Confiança...")
+    high_confidence_pattern = re.search(
+        r'(?:em face de|ação de cobrança em)\s+(.*?),\s*.*?inscrita?\s+no\s+(?:cnpj|cpf).{0,5}\s+([\d.\-\/]+)',
+        normalized_text,
+        re.IGNORECASE
+    )
+
+    if high_confidence_pattern:
+        potential_name = high_confidence_pattern.group(1)
+        potential_id = high_confidence_pattern.group(2)
+
+        clean_id_str = ''.join(re.findall(r'\d', potential_id))
+        if _is_cpf_valid(clean_id_str) or _is_cnpj_valid(clean_id_str):
+            defendant_name = clean_name(potential_name)
+            defendant_id = clean_id_str
+            if verbose: print(f"  [SUCESSO] Dados encontrados via Estratégia 1.")
+            return defendant_name, defendant_id, 1
+
+    # --- SEGUNDA TENTATIVA (FALLBACK): Análise de Bloco Contextual ---
+    if not defendant_name or not defendant_id:
+        if verbose: print("  [INFO] Estratégia 1 falhou. Tentando Estratégia 2: Análise de Bloco Contextual...")
+        keywords = ["em face de", "contra", "requerido:", "requerida:"]
+        defendant_block = ""
+        for key in keywords:
+            start_pos = normalized_text.find(key)
+            if start_pos != -1:
+                start_pos += len(key)
+                defendant_block = normalized_text[start_pos : start_pos + 400]
+                if verbose: print(f"  [INFO] Bloco do réu identificado com a chave: '{key}'")
+                break
+
+        if defendant_block:
+            if not defendant_name:
+                match = re.search(r'^(.*?)(?:,)', defendant_block, re.IGNORECASE)
+                if match:
+                    defendant_name = clean_name(match.group(1)) or None
+
+            if not defendant_id:
+                id_candidates = re.findall(r'[\d.\-\/]{11,18}', defendant_block)
+                for candidate in id_candidates:
+                    clean_candidate = ''.join(re.findall(r'\d', candidate))
+                    if _is_cpf_valid(clean_candidate) or _is_cnpj_valid(clean_candidate):
+                        defendant_id = clean_candidate
+                        break
+
+    return defendant_name, defendant_id, (2 if defendant_name or defendant_id else None)
+
+def extract_data_from_petition(pdf_bytes, label="PDF"):
+    """Lê o conteúdo do PDF (bytes) e devolve {"defendant_name", "defendant_id"}."""
+    print(f"\n--- LENDO ARQUIVO PDF (ESTRATÉGIA V6.1 - LEITURA INCREMENTAL): {label} ({len(pdf_bytes)} bytes) ---")
     try:
-        doc = fitz.open(pdf_path)
-        full_text_plain = "".join(page.get_text() for page in doc)
-        doc.close()
-
-        if len(full_text_plain.strip()) < 200:
-            full_text_plain = _extract_text_with_ocr(pdf_path)
-            if not full_text_plain: raise Exception("Extração de texto e OCR falharam.")
-
-        normalized_text = " ".join(full_text_plain.lower().split())
-        
-        defendant_name = None
-        defendant_id = None
-
-        # --- PRIMEIRA TENTATIVA (ALTA CONFIANÇA): Regex Contextual Completa ---
-        print("  [INFO] Tentando Estratégia 1: Regex de Alta Confiança...")
-        high_confidence_pattern = re.search(
-            r'(?:em face de|ação de cobrança em)\s+(.*?),\s*.*?inscrita?\s+no\s+(?:cnpj|cpf).{0,5}\s+([\d.\-\/]+)',
-            normalized_text,
-            re.IGNORECASE
-        )
-
-        if high_confidence_pattern:
-            potential_name = high_confidence_pattern.group(1)
-            potential_id = high_confidence_pattern.group(2)
-            
-            clean_id_str = ''.join(re.findall(r'\d', potential_id))
-            if _is_cpf_valid(clean_id_str) or _is_cnpj_valid(clean_id_str):
-                defendant_name = clean_name(potential_name)
-                defendant_id = clean_id_str
-                print(f"  [SUCESSO] Dados encontrados via Estratégia 1.")
-
-        # --- SEGUNDA TENTATIVA (FALLBACK): Análise de Bloco Contextual ---
-        if not defendant_name or not defendant_id:
-            print("  [INFO] Estratégia 1 falhou. Tentando Estratégia 2: Análise de Bloco Contextual...")
-            keywords = ["em face de", "contra", "requerido:", "requerida:"]
-            defendant_block = ""
-            for key in keywords:
-                start_pos = normalized_text.find(key)
-                if start_pos != -1:
-                    start_pos += len(key)
-                    defendant_block = normalized_text[start_pos : start_pos + 400]
-                    print(f"  [INFO] Bloco do réu identificado com a chave: '{key}'")
+        with fitz.open(stream=pdf_bytes, filetype="pdf") as doc:
+            page_count = min(len(doc), PDF_MAX_PAGES)
+            defendant_name, defendant_id, normalized_text = None, None, ""
+            page_texts = []
+            for i in range(page_count):
+                page_texts.append(doc[i].get_text())
+                normalized_text = _normalize("".join(page_texts))
+                defendant_name, defendant_id, estrategia = _find_defendant(normalized_text)
+                if estrategia == 1:
+                    print(f"  [SUCESSO] Réu encontrado na página {i + 1}.")
                     break
-            
-            if defendant_block:
-                if not defendant_name:
-                    match = re.search(r'^(.*?)(?:,)', defendant_block, re.IGNORECASE)
-                    if match:
-                        defendant_name = clean_name(match.group(1))
-
-                if not defendant_id:
-                    id_candidates = re.findall(r'[\d.\-\/]{11,18}', defendant_block)
-                    for candidate in id_candidates:
-                        clean_candidate = ''.join(re.findall(r'\d', candidate))
-                        if _is_cpf_valid(clean_candidate) or _is_cnpj_valid(clean_candidate):
-                            defendant_id = clean_candidate
-                            break
-        
+            else:
+                full_text_plain = "".join(page_texts)
+                if len(full_text_plain.strip()) < 200:
+                    defendant_name, defendant_id, normalized_text = _extract_with_ocr(doc, page_count)
+                    if not normalized_text: raise Exception("Extração de texto e OCR falharam.")
+                if not defendant_name or not defendant_id:
+                    # Réu incompleto: repete a busca com o log das estratégias, para diagnóstico
+                    defendant_name, defendant_id, _ = _find_defendant(normalized_text, verbose=True)
+
         final_data = {
             "defendant_name": defendant_name if defendant_name else "Não encontrado",
             "defendant_id": defendant_id if defendant_id else "Não encontrado"
@@ -126,4 +192,4 @@ def extract_data_from_petition(pdf_path):
 
     except Exception as e:
         print(f"  [ERRO CRÍTICO] Ocorreu um erro ao ler o arquivo PDF: {e}")
-        return {"defendant_name": "Erro na leitura do PDF", "defendant_id": "Erro na leitura do PDF"}
\ No newline at end of file
+        return {"defendant_name": PDF_READ_ERROR, "defendant_id": PDF_READ_ERROR}
@@ -0,0 +1,145 @@
+# Arquivo: robot/pdf_pipeline.py
+# Descrição: Etapa de leitura das petições (PyMuPDF + OCR) fora do event loop do robô.
+#   - A extração roda num ProcessPoolExecutor: o OCR usa os núcleos da máquina enquanto os
+#     workers do navegador continuam navegando (a extração é CPU, a navegação é rede).
+#   - O scraper entrega o PDF com submit() e segue; quando a leitura termina, o callback
+#     recebe o resultado (ex.: monta o payload e manda para a caixa de saída da API).
+#   - No máximo PDF_MAX_PENDING PDFs ficam esperando/sendo lidos: passando disso, submit()
+#     espera uma vaga, o que segura os workers em vez de acumular PDFs sem limite.
+#   - O PDF chega em memória (bytes) e o resultado fica num cache em disco (SQLite local),
+#     pela chave SHA-256 do conteúdo + PARSER_VERSION: a mesma petição vista de novo (em
+#     outra OAB ou noutra execução) não passa por leitura nem OCR. O SQLite do cache é usado
+#     numa thread própria (uma só): um banco lento ou travado não para o event loop.
+
+import asyncio
+import hashlib
+import multiprocessing
+import os
+import sqlite3
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+from pdf_parser import PARSER_VERSION, PDF_READ_ERROR, extract_data_from_petition
+
+# Processos do pool de leitura (cada OCR ocupa um núcleo)
+PDF_WORKERS = int(os.getenv("PDF_WORKERS", str(max(1, (os.cpu_count() or 2) - 1))))
+# PDFs aguardando ou em leitura antes de submit() começar a segurar o scraper
+PDF_MAX_PENDING = int(os.getenv("PDF_MAX_PENDING", str(PDF_WORKERS * 2)))
+PDF_CACHE_PATH = os.getenv("PDF_CACHE_PATH", os.path.join(os.path.dirname(__file__), "pdf_cache.sqlite3"))
+
+
+class PdfCache:
+    """Resultados de extract_data_from_petition por (sha256 do PDF, versão do parser)."""
+
+    def __init__(self, path=PDF_CACHE_PATH):
+        self._conn = sqlite3.connect(path)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS pdf_cache ("
+            " sha256 TEXT NOT NULL,"
+            " parser_version TEXT NOT NULL,"
+            " defendant_name TEXT NOT NULL,"
+            " defendant_id TEXT NOT NULL,"
+            " created_at REAL NOT NULL,"
+            " PRIMARY KEY (sha256, parser_version))"
+        )
+        self._conn.commit()
+
+    def get(self, sha256):
+        linha = self._conn.execute(
+            "SELECT defendant_name, defendant_id FROM pdf_cache WHERE sha256 = ? AND parser_version = ?",
+            (sha256, PARSER_VERSION),
+        ).fetchone()
+        return {"defendant_name": linha[0], "defendant_id": linha[1]} if linha else None
+
+    def put(self, sha256, dados):
+        self._conn.execute(
+            "INSERT OR REPLACE INTO pdf_cache (sha256, parser_version, defendant_name, defendant_id, created_at) "
+            "VALUES (?, ?, ?, ?, ?)",
+            (sha256, PARSER_VERSION, dados["defendant_name"], dados["defendant_id"], time.time()),
+        )
+        self._conn.commit()
+
+    def close(self):
+        self._conn.close()
+
+
+class PdfPipeline:
+    """Uso: async with PdfPipeline() as pdfs: await pdfs.submit(pdf_bytes, on_result)
+
+    on_result(dados) é uma corrotina chamada no event loop com o dicionário de
+    extract_data_from_petition, ou None se a leitura falhou. Ao sair do `async with`,
+    espera todos os PDFs entregues terminarem (e seus callbacks) antes de fechar o pool.
+    """
+
+    def __init__(self, workers=PDF_WORKERS, max_pending=PDF_MAX_PENDING, cache_path=PDF_CACHE_PATH):
+        self._workers = workers
+        self._vagas = asyncio.Semaphore(max_pending)
+        self._tarefas = set()
+        self._cache_path = cache_path
+        # Toda operação do cache roda nesta thread (a conexão SQLite nasce nela)
+        self._disco = ThreadPoolExecutor(max_workers=1, thread_name_prefix="pdf_cache")
+        self._cache = None
+        self._pool = None
+
+    async def __aenter__(self):
+        self._cache = await self._no_disco(PdfCache, self._cache_path)
+        # spawn, não fork: o robô já tem threads (playwright, executores) e um fork com
+        # threads ativas pode herdar travas presas e deixar o processo de OCR parado
+        self._pool = ProcessPoolExecutor(max_workers=self._workers, mp_context=multiprocessing.get_context("spawn"))
+        return self
+
+    async def __aexit__(self, *exc_info):
+        if self._tarefas:
+            print(f"  [PDF] Aguardando {len(self._tarefas)} PDF(s) em leitura...")
+            await asyncio.gather(*self._tarefas, return_exceptions=True)
+        self._pool.shutdown(wait=True, cancel_futures=True)
+        await self._no_disco(self._cache.close)
+        self._disco.shutdown(wait=True)
+
+    async def _no_disco(self, funcao, *args):
+        return await asyncio.get_running_loop().run_in_executor(self._disco, funcao, *args)
+
+    async def submit(self, pdf_bytes, on_result, label="PDF"):
+        """Entrega o PDF para leitura e retorna; só espera se a fila de PDFs estiver cheia."""
+        sha256 = hashlib.sha256(pdf_bytes).hexdigest()
+        try:
+            dados = await self._no_disco(self._cache.get, sha256)
+        except Exception as e:
+            # Cache é só otimização: sem ele, o PDF é lido normalmente
+            print(f"  [PDF] [AVISO] Não foi possível consultar o cache para {label}: {e}")
+            dados = None
+        if dados:
+            print(f"  [PDF] {label}: resultado reaproveitado do cache (documento já lido).")
+            await self._entregar(dados, on_result, label)
+            return
+        await self._vagas.acquire()
+        tarefa = asyncio.create_task(self._ler(pdf_bytes, sha256, on_result, label))
+        self._tarefas.add(tarefa)
+        tarefa.add_done_callback(self._tarefas.discard)
+
+    async def _ler(self, pdf_bytes, sha256, on_result, label):
+        loop = asyncio.get_running_loop()
+        try:
+            try:
+                dados = await loop.run_in_executor(self._pool, extract_data_from_petition, pdf_bytes, label)
+            except Exception as e:
+                # Inclui BrokenProcessPool (processo de OCR morto): perde-se só este PDF
+                print(f"  [PDF] [ERRO] Falha na leitura de {label}: {e}")
+                dados = None
+        finally:
+            # A vaga é liberada quando o núcleo fica livre, não quando o callback termina
+            self._vagas.release()
+        if dados and dados["defendant_name"] != PDF_READ_ERROR:
+            try:
+                await self._no_disco(self._cache.put, sha256, dados)
+            except Exception as e:
+                # Cache é só otimização (ex.: disco cheio, banco travado): o resultado segue
+                print(f"  [PDF] [AVISO] Não foi possível gravar {label} no cache: {e}")
+        await self._entregar(dados, on_result, label)
+
+    async def _entregar(self, dados, on_result, label):
+        try:
+            await on_result(dados)
+        except Exception as e:
+            print(f"  [PDF] [ERRO] Falha ao tratar o resultado de {label}: {e}")
@@ -1,36 +1,102 @@
 # Arquivo: robot/scraper.py
-# Versão: Produção 1.7
+# Versão: Produção 2.2
 # Descrição: Robô orquestrador para extração de dados de processos no portal e-SAJ TJSP.
-# Changelog v1.7: Adicionada a camada final de resiliência. O robô agora captura
-#                 timeouts no clique de "Visualizar autos", evitando que a aplicação
-#                 trave em caso de "soft-blocking" do site.
+# Changelog v1.8: Modo concorrente. Depois de um único login, N workers (cada um com o seu
+#                 contexto de navegador, carregando a sessão autenticada) consomem uma fila
+#                 de OABs e de páginas de detalhe de processos. Um limitador global controla
+#                 quantas navegações acontecem ao mesmo tempo e o intervalo entre elas.
+# Changelog v1.9: Envio à API pelo api_client: caixa de saída em disco, lotes em
+#                 /processos/bulk e novas tentativas com backoff, sem bloquear os workers.
+# Changelog v2.0: A leitura da petição (PyMuPDF + OCR) roda no pdf_pipeline, num pool de
+#                 processos: o worker baixa o PDF, entrega e volta a navegar; o processo
+#                 vai para a API quando a leitura termina.
+# Changelog v2.1: A petição baixada é lida para a memória (sem peticao_*.pdf no disco) e o
+#                 pdf_pipeline reaproveita resultados de petições já lidas (cache por SHA-256).
+# Changelog v2.2: Estado da varredura em disco (crawl_state): OABs retomam da última página
+#                 percorrida e processos pendentes voltam para a fila depois de uma queda.
+#                 Cada página de resultados é conferida com a API numa consulta só
+#                 (POST /processos/exists) e os processos já salvos nem são abertos.
 
 import asyncio
+import functools
+import itertools
+import pathlib
 import os
 import re
 import random
-import requests
+from datetime import datetime, timezone
+from urllib.parse import urljoin
 from dotenv import load_dotenv
 from playwright.async_api import async_playwright, TimeoutError
+import crawl_state
+from api_client import ApiClient
 from email_helper import fetch_verification_code
-from pdf_parser import extract_data_from_petition
+from pdf_pipeline import PdfPipeline
+
+# Quantidade de workers (contextos de navegador) trabalhando em paralelo
+SCRAPER_WORKERS = int(os.getenv("SCRAPER_WORKERS", "3"))
+# Educação com o site, somando TODOS os workers: no máximo N navegações simultâneas
+# e um intervalo mínimo (em segundos) entre o início de duas navegações
+SCRAPER_MAX_IN_FLIGHT = int(os.getenv("SCRAPER_MAX_IN_FLIGHT", "2"))
+SCRAPER_MIN_INTERVAL = float(os.getenv("SCRAPER_MIN_INTERVAL", "1.5"))
+
+# Detalhes de processos já encontrados saem da fila antes de novas buscas por OAB,
+# para a fila não crescer sem limite enquanto as OABs são percorridas
+PRIORIDADE_PROCESSO = 0
+PRIORIDADE_OAB = 1
+
+
+class PolitenessLimiter:
+    """Limite global de navegações: concorrência máxima + intervalo mínimo entre inícios."""
+
+    def __init__(self, max_in_flight, min_interval):
+        self._semaforo = asyncio.Semaphore(max_in_flight)
+        self._intervalo = min_interval
+        self._proximo_inicio = 0.0
+
+    async def __aenter__(self):
+        await self._semaforo.acquire()
+        # Reserva o próximo horário livre sem await no meio: a reserva é atômica no event loop
+        agora = asyncio.get_running_loop().time()
+        inicio = max(agora, self._proximo_inicio)
+        self._proximo_inicio = inicio + self._intervalo
+        if inicio > agora:
+            await asyncio.sleep(inicio - agora)
+
+    async def __aexit__(self, *exc_info):
+        self._semaforo.release()
+
 
 class TjspScraper:
     LOGIN_URL = "https://esaj.tjsp.jus.br/cpopg/open.do"
-    
+
     def __init__(self, tjsp_user, tjsp_pass, email_user, email_pass):
         self.tjsp_user = tjsp_user
         self.tjsp_pass = tjsp_pass
         self.email_user = email_user
         self.email_pass = email_pass
+        # Estado compartilhado entre os workers. Só é lido/alterado em trechos sem await,
+        # então cada verificação + alteração é atômica no event loop (não precisa de lock).
         self.processed_contracts = 0
-        self.seen_process_numbers = set()
-        print("Robô TJSP v1.7 (Produção - Resiliência Total) inicializado.")
+        self._state = crawl_state.CrawlState()
+        self._limite = PolitenessLimiter(SCRAPER_MAX_IN_FLIGHT, SCRAPER_MIN_INTERVAL)
+        self._ordem_fila = itertools.count()
+        self._api = None
+        self._pdfs = None
+        print("Robô TJSP v2.2 (Produção - Workers Concorrentes) inicializado.")
 
     async def _random_delay(self, min_seconds=2, max_seconds=5):
         delay = random.uniform(min_seconds, max_seconds)
         await asyncio.sleep(delay)
 
+    async def _claim_process(self, process_number, oab_number, process_number_text, detail_url, status=crawl_state.QUEUED):
+        """Registra o processo no crawl_state; False se outro worker, página ou execução já o pegou."""
+        return await self._state.claim(process_number, oab_number, process_number_text, detail_url, status)
+
+    def _enqueue(self, fila, prioridade, item):
+        # O contador desempata itens de mesma prioridade (ordem de chegada) sem comparar os itens
+        fila.put_nowait((prioridade, next(self._ordem_fila), item))
+
     async def _login(self, page):
         print("--- FASE: LOGIN ---")
         await page.goto(self.LOGIN_URL)
@@ -38,13 +104,15 @@ class TjspScraper:
         await page.click('#headerNmUsuarioLogado')
         await page.type('#usernameForm', self.tjsp_user, delay=100)
         await page.type('#passwordForm', self.tjsp_pass, delay=120)
+        # Só e-mails de validação que chegarem depois deste clique valem para o 2FA
+        login_clicked_at = datetime.now(timezone.utc)
         await page.click('#pbEntrar')
         try:
             print("Verificando se a tela 2FA apareceu (aguardando até 7s)...")
             validation_locator = page.get_by_role("textbox", name="Ex.:")
             await validation_locator.wait_for(timeout=7000)
             print("!!! TELA DE VALIDAÇÃO DE LOGIN DETECTADA !!!")
-            auth_code = fetch_verification_code(self.email_user, self.email_pass)
+            auth_code = await fetch_verification_code(self.email_user, self.email_pass, since=login_clicked_at)
             if not auth_code: raise Exception("Não foi possível obter o código 2FA.")
             print(f"Preenchendo com o código: {auth_code}")
             await validation_locator.fill(auth_code)
@@ -57,184 +125,289 @@ class TjspScraper:
             await page.wait_for_url("**/cpopg/open.do**", timeout=15000)
 
     async def _process_digital_folder(self, digital_folder_page, process_number):
+        """Baixa a petição e devolve o conteúdo do PDF (a leitura fica com o pdf_pipeline)."""
         print(f"--- FASE: PROCESSANDO PASTA DIGITAL (DADOS DO RÉU) | PROCESSO {process_number} ---")
         try:
             await self._random_delay()
             petition_locator = digital_folder_page.get_by_text(re.compile(r"petição", re.IGNORECASE))
-            await petition_locator.first.click()
+            async with self._limite:
+                await petition_locator.first.click()
             print("  [INFO] Documento da Petição selecionado.")
             iframe = digital_folder_page.frame_locator("iframe[name=\"documento\"]")
             download_button = iframe.get_by_role("button", name="Baixar")
             async with digital_folder_page.expect_download() as download_info:
                 await self._random_delay(1, 2)
-                await download_button.click()
+                async with self._limite:
+                    await download_button.click()
             download = await download_info.value
-            pdf_path = os.path.join(os.path.dirname(__file__), f"peticao_{process_number}.pdf")
-            await download.save_as(pdf_path)
-            print(f"  [INFO] Download concluído. PDF salvo em: {pdf_path}")
-            extracted_data = extract_data_from_petition(pdf_path)
-            os.remove(pdf_path)
-            print(f"  [INFO] Arquivo PDF temporário removido.")
-            return extracted_data
+            # O Playwright guarda o download num arquivo temporário dele; lemos o conteúdo e
+            # apagamos na hora, em vez de esperar o contexto do worker fechar
+            pdf_bytes = await asyncio.to_thread(pathlib.Path(await download.path()).read_bytes)
+            await download.delete()
+            print(f"  [INFO] Download concluído ({len(pdf_bytes)} bytes).")
+            return pdf_bytes
         except Exception as e:
             print(f"  [ERRO] Ocorreu um erro ao processar a pasta digital: {e}")
             return None
         finally:
             await digital_folder_page.close()
 
-    async def run_sessions(self, oab_list, target_contracts=500):
-        async with async_playwright() as p:
+    async def _on_pdf_parsed(self, process_number, valor_causa_site, extracted_data_pdf):
+        # Chamado pelo pdf_pipeline quando a leitura da petição termina (ou vem do cache)
+        if extracted_data_pdf:
+            payload = {
+                "numero_processo": process_number,
+                "nome_reu": extracted_data_pdf.get("defendant_name", "Não encontrado"),
+                "cpf_cnpj_reu": extracted_data_pdf.get("defendant_id", "Não encontrado"),
+                "valor_causa": valor_causa_site
+            }
+            await self._save_processo(payload)
+            # Na caixa de saída (em disco) o processo já não se perde: está concluído
+            await self._state.mark(process_number, crawl_state.DONE)
+        else:
+            await self._state.mark(process_number, crawl_state.FAILED)
+
+    async def _save_processo(self, payload):
+        # Só grava na caixa de saída; o api_client envia em lote e chama _on_api_result
+        await self._api.submit(payload)
+        print(f"    -> Processo {payload['numero_processo']} na fila de envio para a API.")
+
+    def _on_api_result(self, payload, status):
+        if status == "created":
+            self.processed_contracts += 1
+            print(f"    -> SUCESSO: Processo {payload['numero_processo']} salvo no banco de dados!")
+        elif status == "existing":
+            print(f"    -> INFO: Processo {payload['numero_processo']} já existente no banco de dados.")
+        print(f"  [STATUS] Contratos processados: {self.processed_contracts}/{self._target_contracts}")
+
+    async def _search_oab(self, page, oab_number, fila, target_contracts):
+        """Percorre as páginas de resultado da OAB e enfileira os processos válidos."""
+        last_page = await self._state.start_oab(oab_number)
+        if last_page is None:
+            print(f"\n[INFO] OAB {oab_number} já foi percorrida recentemente. Pulando.")
+            return
+        print(f"\n--- INICIANDO BUSCA PARA A OAB: {oab_number} ---")
+        async with self._limite:
+            await page.goto(self.LOGIN_URL)
+        await page.wait_for_selector('select#cbPesquisa')
+        await page.select_option('select#cbPesquisa', 'NUMOAB')
+        print(f"  [INFO] Digitanto OAB: {oab_number}")
+        await page.locator('#campo_NUMOAB').type(oab_number, delay=random.randint(80, 200))
+
+        await self._random_delay(1, 2)
+        async with self._limite:
+            async with page.expect_navigation():
+                await page.click('#botaoConsultarProcessos')
+
+        try:
+            print(f"  [INFO] Aguardando o carregamento do primeiro resultado para a OAB {oab_number}...")
+            await page.locator('ul.unj-list-row').first.wait_for(timeout=15000)
+            print("  [INFO] Lista de resultados carregada com sucesso.")
+        except TimeoutError:
+            print(f"  [AVISO] A busca pela OAB {oab_number} não retornou nenhum resultado inicial. Pulando para a próxima OAB.")
+            await self._state.oab_done(oab_number)
+            return
+
+        page_number = 1
+        while self.processed_contracts < target_contracts:
+            next_page_button = page.locator('a[title="Próxima página"]')
+            if page_number <= last_page:
+                # Página já percorrida numa execução anterior: só avança
+                if await next_page_button.count() == 0:
+                    print("  [INFO] Fim dos resultados para esta OAB.")
+                    await self._state.oab_done(oab_number)
+                    break
+                print(f"  [INFO] Página {page_number} da OAB {oab_number} já percorrida. Avançando...")
+                async with self._limite:
+                    await next_page_button.first.click()
+                    await page.wait_for_load_state()
+                page_number += 1
+                continue
+
+            await self._random_delay(2, 4)
+            print(f"\n--- Analisando página {page_number} de resultados da OAB {oab_number} ---")
+
+            process_rows = await page.locator('ul.unj-list-row > li').all()
+            if not process_rows:
+                print("  [INFO] Nenhum processo encontrado nesta página específica. Finalizando busca para esta OAB.")
+                await self._state.oab_done(oab_number)
+                break
+
+            candidatos = []
+            for row in process_rows:
+                process_link_element = row.locator('a.linkProcesso')
+                process_number_text = await process_link_element.inner_text()
+                process_number = re.sub(r'[\s.-]', '', process_number_text)
+                classe_text = await row.locator('div.classeProcesso').inner_text()
+                assunto_text = await row.locator('div.assuntoPrincipalProcesso').inner_text()
+                if "procedimento comum cível" in classe_text.lower() and "contratos bancários" in assunto_text.lower():
+                    # O detalhe é aberto pela URL, por qualquer worker, sem voltar para esta lista
+                    detail_url = urljoin(page.url, await process_link_element.get_attribute('href'))
+                    candidatos.append((process_number, process_number_text.strip(), detail_url))
+            await self._enqueue_new(fila, oab_number, candidatos)
+            await self._state.page_done(oab_number, page_number)
+
+            if await next_page_button.count() > 0:
+                print("\n-> Indo para a próxima página de resultados...")
+                await self._random_delay(2, 4)
+                async with self._limite:
+                    await next_page_button.first.click()
+                    await page.wait_for_load_state()
+                page_number += 1
+            else:
+                print("  [INFO] Fim dos resultados para esta OAB.")
+                await self._state.oab_done(oab_number)
+                break
+
+    async def _enqueue_new(self, fila, oab_number, candidatos):
+        """Enfileira os processos da página que nem o crawl_state nem a API conhecem."""
+        conhecidos = await self._state.known([numero for numero, _, _ in candidatos])
+        novos = [c for c in candidatos if c[0] not in conhecidos]
+        # Uma consulta para a página inteira; sem resposta da API, todos seguem (o bulk
+        # responde "existing" depois, como antes)
+        existentes = (await self._api.existing([numero for numero, _, _ in novos]) if novos else None) or set()
+        enfileirados = 0
+        for process_number, process_number_text, detail_url in novos:
+            if process_number in existentes:
+                await self._claim_process(process_number, oab_number, process_number_text, detail_url, crawl_state.EXISTING)
+                continue
+            # A consulta acima teve await: outro worker pode ter registrado o processo nesse meio tempo
+            if not await self._claim_process(process_number, oab_number, process_number_text, detail_url):
+                continue
+            self._enqueue(fila, PRIORIDADE_PROCESSO, ("processo", (process_number, process_number_text, detail_url)))
+            enfileirados += 1
+        print(f"  [INFO] {len(candidatos)} processo(s) na página: {len(conhecidos)} já vistos, "
+              f"{len(existentes)} já salvos na API, {enfileirados} enviados para a fila de detalhes.")
+
+    async def _process_detail(self, page, process_number, process_number_text, detail_url, target_contracts):
+        await self._random_delay(1, 3)
+        print(f"\n-> Processando: {process_number_text}")
+        try:
+            async with self._limite:
+                await page.goto(detail_url, timeout=30000)
+        except TimeoutError:
+            print(f"  [ERRO CRÍTICO] Timeout ao navegar para o processo {process_number_text}. Ignorando este processo.")
+            await self._state.mark(process_number, crawl_state.FAILED)
+            return
+
+        page_content = await page.content()
+        if "extinto" in page_content.lower() or "cancelado" in page_content.lower():
+            print(f"  [INFO] Processo {process_number} está Extinto/Cancelado. Ignorando.")
+            await self._state.mark(process_number, crawl_state.DONE)
+            return
+
+        valor_causa_site = "Não encontrado"
+        try:
+            mais_locator = page.get_by_text("Mais Recolher")
+            if await mais_locator.is_visible(timeout=3000):
+                await mais_locator.click(); await page.wait_for_timeout(500)
+
+            label_valor = page.locator("span:text-is('Valor da ação')")
+            await label_valor.wait_for(timeout=3000)
+            valor_causa_site = await label_valor.locator("xpath=./following-sibling::div").inner_text()
+        except Exception:
+            pass
+
+        visualizar_autos_button = page.get_by_title("Pasta digital")
+        if not await visualizar_autos_button.is_visible():
+            await self._state.mark(process_number, crawl_state.DONE)
+            return
+
+        try:
+            print("  [AÇÃO] Clicando em 'Visualizar autos'...")
+            # Cada worker tem o seu contexto: o expect_page só enxerga a aba aberta por ele
+            async with page.context.expect_page(timeout=45000) as folder_page_info:
+                async with self._limite:
+                    await visualizar_autos_button.click()
+
+            digital_folder_page = await folder_page_info.value
+            await digital_folder_page.wait_for_load_state()
+
+            pdf_bytes = await self._process_digital_folder(digital_folder_page, process_number)
+
+            if pdf_bytes:
+                # Espera só se houver PDFs demais na fila de leitura; o OCR segue em paralelo
+                await self._pdfs.submit(
+                    pdf_bytes, functools.partial(self._on_pdf_parsed, process_number, valor_causa_site),
+                    label=f"petição {process_number}",
+                )
+            else:
+                await self._state.mark(process_number, crawl_state.FAILED)
+
+        except TimeoutError:
+            print(f"  [AVISO CRÍTICO] Timeout ao tentar abrir a Pasta Digital do processo {process_number_text}.")
+            print("  [INFO] O site pode estar sobrecarregado ou a sessão foi bloqueada. Ignorando este processo para continuar.")
+            await self._state.mark(process_number, crawl_state.FAILED)
+
+    async def _worker(self, worker_id, context, fila, target_contracts):
+        page = await context.new_page()
+        while True:
+            _, _, (tipo, dados) = await fila.get()
+            try:
+                if self.processed_contracts >= target_contracts:
+                    # Meta atingida: só esvazia a fila para o join() terminar
+                    continue
+                if tipo == "oab":
+                    print("\n... Pausa estratégica antes da próxima busca ...")
+                    await self._random_delay(4, 8)
+                    await self._search_oab(page, dados, fila, target_contracts)
+                else:
+                    await self._process_detail(page, *dados, target_contracts)
+            except Exception as e:
+                # Um erro num item não derruba o worker; a página é recriada se tiver sido fechada
+                print(f"  [W{worker_id}] [ERRO] Falha ao processar {tipo} {dados}: {e}")
+                if tipo == "processo":
+                    await self._state.mark(dados[0], crawl_state.FAILED)
+                if page.is_closed():
+                    page = await context.new_page()
+            finally:
+                fila.task_done()
+
+    async def run_sessions(self, oab_list, target_contracts=500, workers=SCRAPER_WORKERS):
+        self._target_contracts = target_contracts
+        # A contagem de processados chega quando a API confirma cada lote (alguns segundos depois).
+        # Ao sair, o pdf_pipeline termina os PDFs pendentes antes de a caixa de saída fechar.
+        async with self._state, ApiClient(on_result=self._on_api_result) as self._api, \
+                PdfPipeline() as self._pdfs, async_playwright() as p:
             browser = await p.chromium.launch(headless=True)
-            context = await browser.new_context()
-            page = await context.new_page()
+            login_context = await browser.new_context()
+            page = await login_context.new_page()
             await self._login(page)
+            # Cookies da sessão autenticada, copiados para o contexto de cada worker
+            storage_state = await login_context.storage_state()
+            await login_context.close()
 
+            fila = asyncio.PriorityQueue()
+            # Processos que ficaram pela metade na execução anterior entram antes das OABs
+            pendentes = await self._state.pending()
+            if pendentes:
+                print(f"[INFO] Retomando {len(pendentes)} processo(s) pendentes da execução anterior.")
+            for process_number, process_number_text, detail_url in pendentes:
+                await self._state.mark(process_number, crawl_state.QUEUED)
+                self._enqueue(fila, PRIORIDADE_PROCESSO, ("processo", (process_number, process_number_text, detail_url)))
             for oab_number in oab_list:
-                if self.processed_contracts >= target_contracts:
-                    print(f"\n[META ATINGIDA] Total de {target_contracts} contratos processados. Encerrando.")
-                    break
-                
-                print("\n... Pausa estratégica antes da próxima busca ...")
-                await self._random_delay(4, 8)
-                
-                print(f"\n--- INICIANDO BUSCA PARA A OAB: {oab_number} ---")
-                await page.goto(self.LOGIN_URL)
-                await page.wait_for_selector('select#cbPesquisa')
-                await page.select_option('select#cbPesquisa', 'NUMOAB')
-                print(f"  [INFO] Digitanto OAB: {oab_number}")
-                await page.locator('#campo_NUMOAB').type(oab_number, delay=random.randint(80, 200))
+                self._enqueue(fila, PRIORIDADE_OAB, ("oab", oab_number))
 
-                await self._random_delay(1, 2)
-                async with page.expect_navigation():
-                    await page.click('#botaoConsultarProcessos')
-
-                try:
-                    print(f"  [INFO] Aguardando o carregamento do primeiro resultado para a OAB {oab_number}...")
-                    await page.locator('ul.unj-list-row').first.wait_for(timeout=15000)
-                    print("  [INFO] Lista de resultados carregada com sucesso.")
-                except TimeoutError:
-                    print(f"  [AVISO] A busca pela OAB {oab_number} não retornou nenhum resultado inicial. Pulando para a próxima OAB.")
-                    continue 
-                
-                page_number = 1
-                oab_session_stable = True
-                
-                while oab_session_stable: 
-                    if self.processed_contracts >= target_contracts: break
-                    
-                    await self._random_delay(2, 4)
-                    print(f"\n--- Analisando página {page_number} de resultados da OAB {oab_number} ---")
-                    
-                    process_rows = await page.locator('ul.unj-list-row > li').all()
-                    if not process_rows:
-                        print("  [INFO] Nenhum processo encontrado nesta página específica. Finalizando busca para esta OAB.")
-                        break
-
-                    valid_processes_on_page = []
-                    for row in process_rows:
-                        process_link_element = row.locator('a.linkProcesso')
-                        process_number_text = await process_link_element.inner_text()
-                        process_number = re.sub(r'[\s.-]', '', process_number_text)
-                        classe_text = await row.locator('div.classeProcesso').inner_text()
-                        assunto_text = await row.locator('div.assuntoPrincipalProcesso').inner_text()
-                        if "procedimento comum cível" in classe_text.lower() and "contratos bancários" in assunto_text.lower():
-                            valid_processes_on_page.append((process_number, process_number_text.strip()))
-                            
-                    for process_number, process_number_text in valid_processes_on_page:
-                        if self.processed_contracts >= target_contracts: break
-                        if process_number in self.seen_process_numbers:
-                            print(f"  [INFO] Processo {process_number} já foi visto nesta sessão. Ignorando.")
-                            continue
-
-                        await self._random_delay(1, 3)
-                        print(f"\n-> Processando: {process_number_text}")
-                        self.seen_process_numbers.add(process_number)
-
-                        try:
-                            async with page.expect_navigation(timeout=30000):
-                                await page.get_by_text(process_number_text, exact=True).click()
-                        except TimeoutError:
-                            print(f"  [ERRO CRÍTICO] Timeout ao navegar para o processo {process_number_text}.")
-                            print("  [AÇÃO DE RECUPERAÇÃO] Abandonando a busca para a OAB ATUAL para garantir a estabilidade da sessão.")
-                            oab_session_stable = False
-                            break
-                        
-                        page_content = await page.content()
-                        if "extinto" in page_content.lower() or "cancelado" in page_content.lower():
-                            print(f"  [INFO] Processo {process_number} está Extinto/Cancelado. Ignorando.")
-                            await page.go_back(); await page.wait_for_load_state()
-                            continue
-                        
-                        valor_causa_site = "Não encontrado"
-                        try:
-                            mais_locator = page.get_by_text("Mais Recolher")
-                            if await mais_locator.is_visible(timeout=3000):
-                                await mais_locator.click(); await page.wait_for_timeout(500)
-                            
-                            label_valor = page.locator("span:text-is('Valor da ação')")
-                            await label_valor.wait_for(timeout=3000)
-                            valor_causa_site = await label_valor.locator("xpath=./following-sibling::div").inner_text()
-                        except Exception:
-                            pass 
-
-                        visualizar_autos_button = page.get_by_title("Pasta digital")
-                        if not await visualizar_autos_button.is_visible():
-                            await page.go_back(); await page.wait_for_load_state()
-                            continue
-
-                        try:
-                            print("  [AÇÃO] Clicando em 'Visualizar autos'...")
-                            async with page.context.expect_page(timeout=45000) as folder_page_info:
-                                await visualizar_autos_button.click()
-                            
-                            digital_folder_page = await folder_page_info.value
-                            await digital_folder_page.wait_for_load_state()
-                            
-                            extracted_data_pdf = await self._process_digital_folder(digital_folder_page, process_number)
-                            
-                            if extracted_data_pdf:
-                                payload = {
-                                    "numero_processo": process_number,
-                                    "nome_reu": extracted_data_pdf.get("defendant_name", "Não encontrado"),
-                                    "cpf_cnpj_reu": extracted_data_pdf.get("defendant_id", "Não encontrado"),
-                                    "valor_causa": valor_causa_site
-                                }
-                                try:
-                                    response = requests.post("http://127.0.0.1:8000/processos/", json=payload, timeout=15)
-                                    if response.status_code == 200:
-                                        self.processed_contracts += 1
-                                        print("    -> SUCESSO: Dados salvos no banco de dados!")
-                                    elif response.status_code == 400 and "Processo já cadastrado" in response.text:
-                                        print("    -> INFO: Processo já existente no banco de dados.")
-                                    else:
-                                        print(f"    -> ERRO API: {response.status_code} - {response.text}")
-                                except Exception as e:
-                                    print(f"    -> ERRO CONEXÃO API: {e}")
-                                print(f"  [STATUS] Contratos processados: {self.processed_contracts}/{target_contracts}")
-                        
-                        except TimeoutError:
-                            print(f"  [AVISO CRÍTICO] Timeout ao tentar abrir a Pasta Digital do processo {process_number_text}.")
-                            print("  [INFO] O site pode estar sobrecarregado ou a sessão foi bloqueada. Ignorando este processo para continuar.")
-                        
-                        print("<- Voltando para a lista de processos...")
-                        await page.go_back()
-                        await page.wait_for_load_state()
-                    
-                    if not oab_session_stable: break
-                    
-                    next_page_button = page.locator('a[title="Próxima página"]')
-                    if await next_page_button.count() > 0:
-                        print("\n-> Indo para a próxima página de resultados...")
-                        await self._random_delay(2, 4)
-                        await next_page_button.first.click()
-                        await page.wait_for_load_state()
-                        page_number += 1
-                    else:
-                        print("  [INFO] Fim dos resultados para esta OAB.")
-                        break
+            contexts = [await browser.new_context(storage_state=storage_state) for _ in range(workers)]
+            print(f"[INFO] {workers} worker(s) iniciados (até {SCRAPER_MAX_IN_FLIGHT} navegações simultâneas).")
+            tarefas = [
+                asyncio.create_task(self._worker(worker_id, context, fila, target_contracts))
+                for worker_id, context in enumerate(contexts, start=1)
+            ]
+            try:
+                # As buscas por OAB enfileiram os detalhes antes de concluir o próprio item,
+                # então o join() só retorna quando OABs e processos acabaram
+                await fila.join()
+            finally:
+                for tarefa in tarefas:
+                    tarefa.cancel()
+                await asyncio.gather(*tarefas, return_exceptions=True)
 
+            if self.processed_contracts >= target_contracts:
+                print(f"\n[META ATINGIDA] Total de {target_contracts} contratos processados. Encerrando.")
             print("\n[SESSÃO FINALIZADA] Todas as OABs foram processadas ou a meta de contratos foi atingida.")
-            await context.close()
+            for context in contexts:
+                await context.close()
             await browser.close()
 
 async def main():
@@ -248,16 +421,18 @@ async def main():
         tjsp_pass = os.getenv("TJSP_PASSWORD")
         email_user = os.getenv("EMAIL_USER")
         email_pass = os.getenv("EMAIL_PASSWORD")
+        api_user = os.getenv("ROBOT_API_USER")
+        api_pass = os.getenv("ROBOT_API_PASSWORD")
 
-        if not all([tjsp_user, tjsp_pass, email_user, email_pass]):
-            print("[ERRO CRÍTICO] Verifique se todas as credenciais (TJSP_USER, TJSP_PASSWORD, EMAIL_USER, EMAIL_PASSWORD) estão no arquivo .env")
+        if not all([tjsp_user, tjsp_pass, email_user, email_pass, api_user, api_pass]):
+            print("[ERRO CRÍTICO] Verifique se todas as credenciais (TJSP_USER, TJSP_PASSWORD, EMAIL_USER, EMAIL_PASSWORD, ROBOT_API_USER, ROBOT_API_PASSWORD) estão no arquivo .env")
             return
-        
+
         oab_file_path = os.path.join(os.path.dirname(__file__), 'oabs.txt')
         with open(oab_file_path, 'r') as f:
             oab_list_to_search = [line.strip() for line in f if line.strip()]
         print(f"{len(oab_list_to_search)} OABs carregadas do arquivo oabs.txt")
-        
+
         scraper = TjspScraper(tjsp_user, tjsp_pass, email_user, email_pass)
         await scraper.run_sessions(oab_list=oab_list_to_search, target_contracts=500)
 
@@ -270,4 +445,4 @@ if __name__ == "__main__":
     print("=============================================")
     print("== INICIANDO AUTOMAÇÃO JURIS-SISTEMA SCRAPER ==")
     print("=============================================")
-    asyncio.run(main())
\ No newline at end of file
+    asyncio.run(main())
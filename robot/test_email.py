@@ -1,7 +1,7 @@
 # Arquivo: robot/test_email.py
 import os
 from dotenv import load_dotenv
-from imap_tools import MailBox
+from imap_tools import MailBox, MailBoxUnencrypted
 
 print("Iniciando teste de conexão de e-mail...")
 
@@ -11,7 +11,8 @@ load_dotenv(dotenv_path=dotenv_path)
 
 EMAIL_USER = os.getenv("EMAIL_USER")
 EMAIL_PASSWORD = os.getenv("EMAIL_PASSWORD")
-IMAP_SERVER = "imap.gmail.com"
+# Mesmo servidor configurado para o robô (IMAP_HOST / IMAP_PORT / IMAP_SSL)
+from email_helper import IMAP_SERVER, IMAP_PORT, IMAP_SSL
 TARGET_FOLDER = "INBOX" # Pasta que você mencionou
 
 if not EMAIL_USER or not EMAIL_PASSWORD:
@@ -19,7 +20,8 @@ if not EMAIL_USER or not EMAIL_PASSWORD:
 else:
     try:
         # Tenta fazer login e selecionar a pasta 'ESAJ'
-        with MailBox(IMAP_SERVER).login(EMAIL_USER, EMAIL_PASSWORD, initial_folder=TARGET_FOLDER) as mailbox:
+        mailbox = MailBox(IMAP_SERVER, IMAP_PORT) if IMAP_SSL else MailBoxUnencrypted(IMAP_SERVER, IMAP_PORT)
+        with mailbox.login(EMAIL_USER, EMAIL_PASSWORD, initial_folder=TARGET_FOLDER) as mailbox:
             print(f"\n>>> SUCESSO: Conexão com o servidor de e-mail e acesso à pasta '{TARGET_FOLDER}' foram bem-sucedidos!")
     except Exception as e:
         print(f"\n>>> FALHA: Não foi possível conectar ao servidor de e-mail.")
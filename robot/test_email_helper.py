@@ -0,0 +1,126 @@
+# Arquivo: robot/test_email_helper.py
+# Testes de fetch_verification_code com uma caixa de e-mail falsa (sem rede, sem servidor IMAP).
+# Execute a partir da pasta robot/:  python -m unittest test_email_helper
+
+import asyncio
+import threading
+import time
+import unittest
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+from unittest import mock
+
+import email_helper
+
+ASSUNTO = "Portal e-SAJ - Validação de login"
+
+
+def mensagem(uid, codigo, data, assunto=ASSUNTO):
+    return SimpleNamespace(uid=uid, subject=assunto, date=data, text=f"Seu código de acesso é {codigo}.")
+
+
+class CaixaFalsa:
+    """Imita o MailBox do imap_tools no que o email_helper usa (fetch, flag, idle.wait, logout).
+
+    `ao_consultar(n)` é chamado antes da n-ésima consulta (1, 2, ...), para o teste entregar
+    e-mails num ponto exato do fluxo em vez de depender de tempo.
+    """
+
+    def __init__(self, mensagens=(), idle=True, ao_consultar=None):
+        self.mensagens = list(mensagens)
+        self.lidas = set()
+        self.consultas = 0
+        self.ao_consultar = ao_consultar
+        self.client = SimpleNamespace(capabilities=("IMAP4REV1", "IDLE") if idle else ("IMAP4REV1",))
+        self.idle = SimpleNamespace(wait=self._idle_wait)
+        self.idle_iniciado = threading.Event()
+        self._chegou = threading.Event()
+        self._trava = threading.Lock()
+
+    def entregar(self, msg):
+        with self._trava:
+            self.mensagens.append(msg)
+        self._chegou.set()
+
+    def fetch(self, criteria, charset=None, reverse=False, mark_seen=True):
+        self.consultas += 1
+        if self.ao_consultar:
+            self.ao_consultar(self.consultas)
+        with self._trava:
+            nao_lidas = [m for m in self.mensagens if m.uid not in self.lidas]
+        return list(reversed(nao_lidas)) if reverse else nao_lidas
+
+    def flag(self, uids, flag, value):
+        self.lidas.update(uids)
+
+    def _idle_wait(self, timeout):
+        self.idle_iniciado.set()
+        chegou = self._chegou.wait(timeout)
+        self._chegou.clear()
+        return ["EXISTS"] if chegou else []
+
+    def logout(self):
+        pass
+
+
+def buscar(caixa, since, timeout=5):
+    with mock.patch.object(email_helper, "_conectar", return_value=caixa):
+        inicio = time.monotonic()
+        codigo = asyncio.run(email_helper.fetch_verification_code("robo@teste", "senha", since=since, timeout=timeout))
+        return codigo, time.monotonic() - inicio
+
+
+class FetchVerificationCodeTest(unittest.TestCase):
+    def setUp(self):
+        self.agora = datetime.now(timezone.utc)
+        # Código do login anterior, ainda não lido: tem que ser ignorado
+        self.antigo = mensagem(1, "111111", self.agora - timedelta(minutes=10))
+
+    def test_idle_acorda_com_o_email_novo(self):
+        caixa = CaixaFalsa([self.antigo], idle=True)
+
+        def entregar_quando_ocioso():
+            caixa.idle_iniciado.wait(5)
+            caixa.entregar(mensagem(2, "222222", datetime.now(timezone.utc)))
+
+        threading.Thread(target=entregar_quando_ocioso, daemon=True).start()
+        codigo, decorrido = buscar(caixa, self.agora)
+
+        self.assertEqual(codigo, "222222")
+        # Voltou pelo aviso do IDLE, não pelo fim do IDLE_TIMEOUT
+        self.assertLess(decorrido, email_helper.IDLE_TIMEOUT / 2)
+        self.assertEqual(caixa.consultas, 2)
+        self.assertEqual(caixa.lidas, {2})
+
+    def test_consulta_periodica_sem_idle(self):
+        def ao_consultar(n):
+            if n == 3:
+                caixa.entregar(mensagem(2, "333333", datetime.now(timezone.utc)))
+
+        caixa = CaixaFalsa([self.antigo], idle=False, ao_consultar=ao_consultar)
+        with mock.patch.object(email_helper, "POLL_INTERVALS", (0.01,)):
+            codigo, _ = buscar(caixa, self.agora)
+
+        self.assertEqual(codigo, "333333")
+        self.assertEqual(caixa.consultas, 3)
+        self.assertEqual(caixa.lidas, {2})
+
+    def test_tolerancia_de_relogio(self):
+        # O servidor que envia o e-mail está alguns segundos atrasado: ainda vale
+        atrasado = mensagem(2, "444444", self.agora - email_helper.CLOCK_SKEW / 2)
+        codigo, _ = buscar(CaixaFalsa([self.antigo, atrasado], idle=True), self.agora)
+        self.assertEqual(codigo, "444444")
+
+    def test_email_anterior_ao_login_nao_serve(self):
+        fora_da_tolerancia = mensagem(2, "555555", self.agora - email_helper.CLOCK_SKEW * 2)
+        outro_assunto = mensagem(3, "666666", self.agora, assunto="Promoção")
+        caixa = CaixaFalsa([self.antigo, fora_da_tolerancia, outro_assunto], idle=False)
+        with mock.patch.object(email_helper, "POLL_INTERVALS", (0.01,)):
+            codigo, _ = buscar(caixa, self.agora, timeout=0.1)
+
+        self.assertIsNone(codigo)
+        self.assertEqual(caixa.lidas, set())
+
+
+if __name__ == "__main__":
+    unittest.main()